@@ -0,0 +1,5 @@
+"""
+Benchmark suite for the cerebrus hot paths.
+
+Run from the project root with ``python -m benchmarks.run_benchmarks``.
+"""
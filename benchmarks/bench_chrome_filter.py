@@ -0,0 +1,134 @@
+"""
+Measure what the screen-chrome filter removes from live OCR sessions.
+
+Generates synthetic screen sessions with browser and desktop chrome around
+the page (see corpus.generate_session) and runs every frame through the
+preprocessor as sent to Cerebras, once as captured and once after
+ChromeFilter. Reports the content tokens per frame and how often a frame's
+main content exactly matches an earlier frame's (exact hits) or shares at
+least --near of its words with one of the last --window frames
+(near-duplicate hits). A near-duplicate hit is only counted when the same
+two frames are near duplicates in the session without chrome too; hits
+that shared chrome words alone produced (a different page, so a wrong
+cached vibe) are reported as false hits. Also reports how much chrome the
+filter missed and how much page text it wrongly stripped.
+
+Usage:
+    python -m benchmarks.bench_chrome_filter
+    python -m benchmarks.bench_chrome_filter --sessions 10 --duration 1800 --ocr-error-rate 0.02
+"""
+
+import argparse
+from collections import deque
+from typing import Dict, List
+
+from cerebrus.chrome_filter import ChromeFilter
+from cerebrus.text_preprocessor import TextPreprocessor
+
+from .corpus import generate_session
+
+
+def content_sent(preprocessor: TextPreprocessor, text: str) -> str:
+    """The page content the compressor puts in its prompt for this text."""
+    main_content = preprocessor.process_text(text)['main_content']
+    if not main_content or len(main_content.strip()) < 5:
+        main_content = text[:800].strip()
+    return main_content
+
+
+def _similarity(a: set, b: set) -> float:
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+
+def hit_rates(contents: List[str], pages: List[set], near: float, window: int) -> Dict[str, float]:
+    """
+    Exact, near-duplicate and false near-duplicate hit rates of a session.
+    
+    Args:
+        contents: Content sent to Cerebras for every frame
+        pages: Word sets of the same frames without chrome
+        near: Word similarity of a near duplicate
+        window: Recent frames checked for near duplicates
+    
+    Returns:
+        Dictionary with exact, near and false rates per frame
+    """
+    seen = set()
+    recent = deque(maxlen=window)
+    exact = near_hits = false_hits = 0
+    for i, content in enumerate(contents):
+        words = set(content.lower().split())
+        if content in seen:
+            exact += 1
+            near_hits += 1
+        else:
+            best = max(recent, key=lambda other: _similarity(words, other[1]), default=None)
+            if best is not None and _similarity(words, best[1]) >= near:
+                if _similarity(pages[i], pages[best[0]]) >= near:
+                    near_hits += 1
+                else:
+                    false_hits += 1
+        seen.add(content)
+        recent.append((i, words))
+    return {'exact': exact / len(contents), 'near': near_hits / len(contents), 'false': false_hits / len(contents)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the screen-chrome filter on synthetic OCR sessions")
+    parser.add_argument("--sessions", type=int, default=5)
+    parser.add_argument("--duration", type=float, default=900.0, help="Session length (s)")
+    parser.add_argument("--sample-interval", type=float, default=3.0, help="OCR sample interval (s)")
+    parser.add_argument("--ocr-error-rate", type=float, default=0.01)
+    parser.add_argument("--near", type=float, default=0.8, help="Word Jaccard similarity of a near duplicate")
+    parser.add_argument("--window", type=int, default=20, help="Recent frames checked for near duplicates")
+    args = parser.parse_args()
+    
+    preprocessor = TextPreprocessor()
+    totals = {name: {'tokens': 0, 'exact': 0.0, 'near': 0.0, 'false': 0.0} for name in ('captured', 'filtered')}
+    frames = chrome_left = page_lost = page_lines = 0
+    
+    print(f"{'session':<10} {'frames':>7} {'tokens/frame':>20} {'exact hits':>16} {'near-dup hits':>16} {'false hits':>16}")
+    for seed in range(args.sessions):
+        session = dict(duration=args.duration, sample_interval=args.sample_interval, seed=seed,
+                       ocr_error_rate=args.ocr_error_rate)
+        captured, _ = generate_session(chrome=True, **session)
+        clean, _ = generate_session(**session)
+        
+        chrome_filter = ChromeFilter()
+        filtered = []
+        for (_, text), (_, page) in zip(captured, clean):
+            kept = chrome_filter.filter(text)
+            filtered.append(kept)
+            kept_lines, page_set = kept.split('\n'), set(page.split('\n'))
+            chrome_left += sum(1 for line in kept_lines if line not in page_set)
+            page_lost += len(page_set - set(kept_lines))
+            page_lines += len(page_set)
+        
+        pages = [set(content_sent(preprocessor, page).lower().split()) for _, page in clean]
+        row = {}
+        for name, texts in (('captured', [text for _, text in captured]), ('filtered', filtered)):
+            contents = [content_sent(preprocessor, text) for text in texts]
+            tokens = sum(len(content) // 4 for content in contents)
+            rates = hit_rates(contents, pages, args.near, args.window)
+            totals[name]['tokens'] += tokens
+            for rate in ('exact', 'near', 'false'):
+                totals[name][rate] += rates[rate] * len(texts)
+            row[name] = (tokens / len(texts), rates)
+        frames += len(captured)
+        
+        print(f"{seed:<10} {len(captured):>7} {row['captured'][0]:>9.0f} -> {row['filtered'][0]:>6.0f} "
+              f"{row['captured'][1]['exact']:>7.0%} -> {row['filtered'][1]['exact']:>4.0%} "
+              f"{row['captured'][1]['near']:>7.0%} -> {row['filtered'][1]['near']:>4.0%} "
+              f"{row['captured'][1]['false']:>7.0%} -> {row['filtered'][1]['false']:>4.0%}")
+    
+    before, after = totals['captured'], totals['filtered']
+    print(f"\nContent tokens sent to Cerebras: {before['tokens'] / frames:.0f} -> {after['tokens'] / frames:.0f} per frame "
+          f"({1 - after['tokens'] / before['tokens']:.0%} fewer)")
+    print(f"Exact hit rate: {before['exact'] / frames:.1%} -> {after['exact'] / frames:.1%}")
+    print(f"Near-duplicate hit rate: {before['near'] / frames:.1%} -> {after['near'] / frames:.1%}")
+    print(f"False near-duplicate hit rate: {before['false'] / frames:.1%} -> {after['false'] / frames:.1%}")
+    print(f"Chrome lines left per frame: {chrome_left / frames:.2f}; page lines stripped: {page_lost / page_lines:.2%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+End-to-end benchmark of the text-to-music pipeline against local fakes.
+
+Runs page texts through the fake Cerebras backend (streaming, with a
+per-token latency) and SunoAPI pointed at the local fake Suno server
+(audio played into the in-process null sink), once with the stages run
+strictly one after another as before (compress, then generate_and_play)
+and once through MusicPipeline, and reports the time from text to first
+audio plus the pipeline's per-stage latencies. Both flows poll the clip
+status at the same fixed interval and play the audio the same way
+(progressively, or after a full download with --full-download), so the
+difference comes from how the stages overlap.
+
+Usage:
+    python -m benchmarks.bench_pipeline
+    python -m benchmarks.bench_pipeline --runs 10 --ttft 0.3 --token-latency 0.01 --ready-after 2
+    python -m benchmarks.bench_pipeline --full-download
+"""
+
+import argparse
+import contextlib
+import io
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from cerebrus.cerebras_vibe_compressor import CerebrasVibeCompressor
+from cerebrus.pipeline import STAGES, MusicPipeline
+
+from .corpus import MODEL_RESPONSES, generate_corpus
+from .fake_backend import FakeCerebrasClient
+
+# The Suno client and its fake server are scripts in suno/, not a package
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'suno'))
+
+from audio_cache import AudioCache  # noqa: E402
+from fake_suno_server import FakeSunoServer  # noqa: E402
+from playback import NullSink  # noqa: E402
+from poll_schedule import FixedPollSchedule  # noqa: E402
+from suno import SunoAPI  # noqa: E402
+
+
+def make_compressor(args) -> CerebrasVibeCompressor:
+    client = FakeCerebrasClient([MODEL_RESPONSES[name] for name in ('clean', 'fenced', 'prose')],
+                                latency=args.ttft, token_latency=args.token_latency)
+    return CerebrasVibeCompressor(client=client, enable_logging=False)
+
+
+def make_suno(server: FakeSunoServer, cache_dir: str, args) -> SunoAPI:
+    return SunoAPI("fake-token", base_url=server.base_url, progressive=not args.full_download,
+                   poll_schedule=FixedPollSchedule(args.poll_interval), playback=NullSink(),
+                   audio_cache=AudioCache(cache_dir))
+
+
+def wait_for_downloads(suno: SunoAPI) -> None:
+    """Let background downloads finish writing to the cache before it is removed."""
+    for report in suno.stream_reports:
+        report['done'].wait()
+
+
+def run_sequential(server: FakeSunoServer, texts, cache_dir: str, args):
+    """Today's flow: every stage waits for the previous one to finish."""
+    compressor = make_compressor(args)
+    suno = make_suno(server, cache_dir, args)
+    latencies = []
+    for text in texts:
+        start = time.perf_counter()
+        result = compressor.compress(text)
+        _, playback = suno.generate_and_play(result.data['topics'], result.data['tags'], make_instrumental=True)
+        latencies.append(time.perf_counter() - start)
+        playback.wait()
+    wait_for_downloads(suno)
+    return latencies
+
+
+def run_pipeline(server: FakeSunoServer, texts, cache_dir: str, args):
+    pipeline = MusicPipeline(make_compressor(args), make_suno(server, cache_dir, args),
+                             progressive=not args.full_download, enable_logging=False)
+    latencies = []
+    for text in texts:
+        result = pipeline.run(text)
+        assert result.success, result.error_message
+        latencies.append(result.timings['end_to_end'])
+        result.playback.wait()
+    wait_for_downloads(pipeline.suno)
+    pipeline.close()
+    return latencies, pipeline.get_stats()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the overlapped text-to-music pipeline")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--ttft", type=float, default=0.2, help="Fake Cerebras time to first token (s)")
+    parser.add_argument("--token-latency", type=float, default=0.005, help="Fake Cerebras seconds per token")
+    parser.add_argument("--ready-after", type=float, default=0.5, help="Fake Suno seconds until streamable")
+    parser.add_argument("--poll-interval", type=float, default=0.1, help="Clip status poll interval (s)")
+    parser.add_argument("--size", type=int, default=1024 * 1024, help="Audio bytes per clip")
+    parser.add_argument("--rate", type=float, default=1024 * 1024, help="Audio transfer rate in bytes/s")
+    parser.add_argument("--full-download", action="store_true",
+                        help="Play after the whole clip is downloaded, in both flows")
+    args = parser.parse_args()
+    
+    logging.disable(logging.INFO)
+    texts = generate_corpus(pages_per_size=args.runs)['medium']
+    
+    with FakeSunoServer(ready_after=args.ready_after, audio_size=args.size, audio_rate=args.rate) as server:
+        with contextlib.redirect_stdout(io.StringIO()), tempfile.TemporaryDirectory(prefix="pipeline-bench-") as cache_dir:
+            sequential = run_sequential(server, texts, os.path.join(cache_dir, "sequential"), args)
+            pipelined, stats = run_pipeline(server, texts, os.path.join(cache_dir, "pipeline"), args)
+    
+    print(f"{args.runs} runs, Cerebras TTFT {args.ttft * 1000:.0f} ms, Suno ready after {args.ready_after:.1f} s, "
+          f"{args.size // 1024} KiB at {args.rate / 1024:.0f} KiB/s, "
+          f"{'full download' if args.full_download else 'progressive'} playback")
+    print(f"{'flow':<12} {'first audio p50':>16} {'mean':>10}")
+    for name, latencies in (("sequential", sequential), ("pipeline", pipelined)):
+        print(f"{name:<12} {statistics.median(latencies) * 1000:>13.0f} ms {statistics.mean(latencies) * 1000:>7.0f} ms")
+    
+    print(f"\npipeline stages ({stats['early_starts']}/{stats['runs']} generations started mid-stream)")
+    print(f"{'stage':<12} {'p50':>10} {'p95':>10}")
+    for stage in STAGES + ('overlap',):
+        stage_stats = stats['stages'][stage]
+        print(f"{stage:<12} {stage_stats['p50'] * 1000:>7.0f} ms {stage_stats['p95'] * 1000:>7.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
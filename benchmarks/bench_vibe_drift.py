@@ -0,0 +1,110 @@
+"""
+Replay live-screen sessions through the vibe drift detector.
+
+Counts the Cerebras and Suno calls each session costs today (every text
+committed by the UI's freeze window) and with VibeDriftDetector, and on
+synthetic sessions also how many real vibe changes the detector caught
+and how long after the change it regenerated.
+
+Recorded sessions are JSON lines of {"ts": <milliseconds>, "text": ...},
+the body the live OCR component posts to its endpoint.
+
+Usage:
+    python -m benchmarks.bench_vibe_drift
+    python -m benchmarks.bench_vibe_drift --sessions 20 --duration 1800
+    python -m benchmarks.bench_vibe_drift --ocr-error-rate 0   # unchanged samples repeat exactly
+    python -m benchmarks.bench_vibe_drift --recorded session1.jsonl session2.jsonl
+"""
+
+import argparse
+import json
+import statistics
+from typing import List, Tuple
+
+from cerebrus.vibe_drift import VibeDriftDetector, replay_session
+
+from .corpus import generate_session
+
+
+def load_session(path: str) -> List[Tuple[float, str]]:
+    """(seconds, text) samples of a recorded session, in time order."""
+    events = []
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                events.append((record['ts'] / 1000, record.get('text') or ''))
+    return sorted(events, key=lambda event: event[0])
+
+
+def caught_changes(regenerated_at: List[float], vibe_changes: List[float]) -> List[float]:
+    """Delay from each vibe change to the first regeneration before the next change."""
+    delays = []
+    for i, change in enumerate(vibe_changes):
+        until = vibe_changes[i + 1] if i + 1 < len(vibe_changes) else float('inf')
+        hits = [ts for ts in regenerated_at if change <= ts < until]
+        if hits:
+            delays.append(hits[0] - change)
+    return delays
+
+
+def make_detector(args) -> VibeDriftDetector:
+    return VibeDriftDetector(enter_threshold=args.enter, exit_threshold=args.exit,
+                             min_duration=args.min_duration, min_interval=args.freeze_window,
+                             half_life=args.half_life)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Count the generations the vibe drift detector avoids")
+    parser.add_argument("--recorded", nargs="+", metavar="JSONL", help="Recorded sessions to replay")
+    parser.add_argument("--sessions", type=int, default=10, help="Synthetic sessions")
+    parser.add_argument("--duration", type=float, default=900.0, help="Synthetic session length (s)")
+    parser.add_argument("--sample-interval", type=float, default=3.0, help="Synthetic OCR sample interval (s)")
+    parser.add_argument("--ocr-error-rate", type=float, default=0.01, help="Synthetic OCR misread rate")
+    parser.add_argument("--freeze-window", type=float, default=25.0)
+    parser.add_argument("--enter", type=float, default=0.3)
+    parser.add_argument("--exit", type=float, default=0.15)
+    parser.add_argument("--min-duration", type=float, default=6.0)
+    parser.add_argument("--half-life", type=float, default=6.0)
+    args = parser.parse_args()
+    
+    if args.recorded:
+        sessions = [(path, load_session(path), None) for path in args.recorded]
+    else:
+        sessions = []
+        for seed in range(args.sessions):
+            events, vibe_changes = generate_session(args.duration, args.sample_interval, seed=seed,
+                                                    ocr_error_rate=args.ocr_error_rate)
+            sessions.append((f"synthetic-{seed}", events, vibe_changes))
+    
+    print(f"{'session':<20} {'samples':>8} {'today':>6} {'drift':>6} {'avoided':>8} {'changes caught':>15}")
+    totals = {'baseline': 0, 'detector': 0, 'changes': 0, 'caught': 0}
+    delays = []
+    for name, events, vibe_changes in sessions:
+        result = replay_session(events, make_detector(args), args.freeze_window)
+        totals['baseline'] += result['baseline_calls']
+        totals['detector'] += result['detector_calls']
+        caught = ''
+        if vibe_changes is not None:
+            session_delays = caught_changes(result['regenerated_at'], vibe_changes)
+            delays.extend(session_delays)
+            totals['changes'] += len(vibe_changes)
+            totals['caught'] += len(session_delays)
+            caught = f"{len(session_delays)}/{len(vibe_changes)}"
+        print(f"{name[-20:]:<20} {result['samples']:>8} {result['baseline_calls']:>6} {result['detector_calls']:>6} "
+              f"{result['avoided_rate']:>7.0%} {caught:>15}")
+    
+    avoided = totals['baseline'] - totals['detector']
+    rate = avoided / totals['baseline'] if totals['baseline'] else 0.0
+    print(f"\nCerebras calls: {totals['baseline']} today, {totals['detector']} with drift detection "
+          f"({avoided} avoided, {rate:.0%})")
+    print(f"Suno generations: {totals['baseline']} today, {totals['detector']} with drift detection "
+          f"({avoided} avoided, {rate:.0%})")
+    if totals['changes']:
+        mean_delay = statistics.mean(delays) if delays else 0.0
+        print(f"Vibe changes caught: {totals['caught']}/{totals['changes']}, "
+              f"regenerated {mean_delay:.1f}s after the change on average")
+
+
+if __name__ == "__main__":
+    main()
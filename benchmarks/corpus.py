@@ -0,0 +1,214 @@
+"""
+Synthetic noisy-webpage corpus generator for benchmarks.
+
+Produces deterministic pages that mimic what OCR and page scraping hand to
+the Vibe Compressor: article sentences mixed with navigation bars, ads,
+HTML tags, entities and footer boilerplate.
+"""
+
+import random
+from typing import Dict, List, Optional, Tuple
+
+from cerebrus.text_preprocessor import TextPreprocessor
+
+
+# Named corpus sizes (approximate characters per page)
+CORPUS_SIZES = {
+    'small': 1_000,
+    'medium': 10_000,
+    'large': 100_000,
+}
+
+NOISE_LINES = [
+    "ADVERTISEMENT: Buy now and save 50%! Limited time offer!",
+    "Navigation: Home | About | Contact | Shop | Cart (0)",
+    "SIDEBAR: Related Articles",
+    "Subscribe to our newsletter for more updates!",
+    "FOOTER: Copyright 2024 | Privacy Policy | Terms of Service",
+    "Click here to read more about this story",
+    "Sponsored: $20 off your first order, shop now",
+    "Trending: most read stories this week",
+    "Follow us on social media for daily news",
+    "<div class=\"nav\"><a href=\"/login\">Login</a> &nbsp; <a href=\"/register\">Register</a></div>",
+]
+
+# Browser and desktop chrome around the page in screen captures; {n} is a
+# changing number (unread counts, the clock, battery)
+CHROME_TOP = [
+    "Inbox ({n}) - Gmail    Calendar - Week {n}    Spotify - Focus Flow    +",
+    "File  Edit  View  History  Bookmarks  Profiles  Tab  Window  Help",
+    "Getting Started  Work  Recipes  Weather  Banking  Reading List",
+]
+CHROME_BOTTOM = [
+    "Finder  Mail  Messages  Music  Terminal  Settings",
+    "Wi-Fi  Battery {n}%  Thu Oct {n}  {n}:{n} PM",
+]
+
+FILLER_WORDS = [
+    'the', 'new', 'latest', 'report', 'shows', 'that', 'many', 'people',
+    'are', 'now', 'looking', 'at', 'how', 'this', 'could', 'change',
+    'everyday', 'life', 'across', 'the', 'world', 'over', 'coming', 'years',
+]
+
+
+def _make_sentence(rng: random.Random, keywords: List[str], moods: List[str]) -> str:
+    """Build one article-like sentence seeded with topic and mood words."""
+    words = rng.sample(FILLER_WORDS, 8)
+    words.insert(rng.randrange(len(words)), rng.choice(keywords))
+    words.insert(rng.randrange(len(words)), rng.choice(keywords))
+    words.insert(rng.randrange(len(words)), rng.choice(moods))
+    sentence = ' '.join(words)
+    return sentence[0].upper() + sentence[1:] + rng.choice(['.', '.', '!', '?'])
+
+
+def generate_page(size: int, seed: int = 0, noise_ratio: float = 0.3,
+                  topic: Optional[str] = None, mood: Optional[str] = None) -> str:
+    """
+    Generate one synthetic noisy webpage.
+    
+    Args:
+        size: Approximate length of the page in characters
+        seed: Random seed so the corpus is reproducible
+        noise_ratio: Fraction of lines that are noise rather than content
+        topic: TextPreprocessor topic of the article (random if None)
+        mood: TextPreprocessor mood category of the article's mood words
+            (words of every mood if None)
+    
+    Returns:
+        Page text
+    """
+    rng = random.Random(seed)
+    topic = topic or rng.choice(list(TextPreprocessor.TOPIC_KEYWORDS))
+    keywords = TextPreprocessor.TOPIC_KEYWORDS[topic]
+    if mood:
+        moods = TextPreprocessor.MOOD_INDICATORS[mood]
+    else:
+        moods = [word for words in TextPreprocessor.MOOD_INDICATORS.values() for word in words]
+    
+    lines = []
+    length = 0
+    while length < size:
+        if rng.random() < noise_ratio:
+            line = rng.choice(NOISE_LINES)
+        else:
+            line = ' '.join(_make_sentence(rng, keywords, moods) for _ in range(rng.randint(1, 4)))
+        lines.append(line)
+        length += len(line) + 1
+    
+    return '\n'.join(lines)[:size]
+
+
+def generate_corpus(pages_per_size: int = 5, seed: int = 0) -> Dict[str, List[str]]:
+    """
+    Generate the benchmark corpus at every named size.
+    
+    Args:
+        pages_per_size: Number of pages to generate for each size
+        seed: Base random seed
+    
+    Returns:
+        Dictionary mapping size name to list of pages
+    """
+    return {
+        name: [generate_page(size, seed=seed + i) for i in range(pages_per_size)]
+        for name, size in CORPUS_SIZES.items()
+    }
+
+
+def _ocr_noise(rng: random.Random, text: str, error_rate: float) -> str:
+    """Simulate OCR misreads by replacing a fraction of letters."""
+    chars = list(text)
+    for i, ch in enumerate(chars):
+        if ch.isalpha() and rng.random() < error_rate:
+            chars[i] = rng.choice('ilo0rnmce')
+    return ''.join(chars)
+
+
+def _chrome(rng: random.Random, lines: List[str], t: float) -> List[str]:
+    """Chrome lines at time t (numbers change every minute or so)."""
+    return [line.replace('{n}', str(int(t // 60 + rng.randint(0, 1)) % 60 + 1)) for line in lines]
+
+
+def generate_session(duration: float = 900.0, sample_interval: float = 3.0, seed: int = 0,
+                     same_vibe_ratio: float = 0.5, window: int = 900,
+                     ocr_error_rate: float = 0.01,
+                     chrome: bool = False) -> Tuple[List[Tuple[float, str]], List[float]]:
+    """
+    Generate one synthetic live-screen session.
+    
+    The reader visits pages one after another (1-4 minutes each), scrolling
+    through each; the screen is sampled every sample_interval seconds and
+    each sample is the visible window of the page with OCR misreads. The
+    next page keeps the previous page's topic and mood with probability
+    same_vibe_ratio (another article of the same kind).
+    
+    Args:
+        duration: Session length in seconds
+        sample_interval: Seconds between OCR samples
+        seed: Random seed so sessions are reproducible
+        same_vibe_ratio: Probability that a new page has the same vibe
+        window: Characters visible on screen
+        ocr_error_rate: Fraction of letters misread
+        chrome: Surround every sample with browser and desktop chrome
+            (CHROME_TOP and CHROME_BOTTOM); the page text is the same as
+            without chrome
+    
+    Returns:
+        Tuple of ((seconds, text) samples, start times of the pages whose
+        vibe differs from the previous page's)
+    """
+    rng = random.Random(seed)
+    chrome_rng = random.Random(seed + 1)
+    topics = list(TextPreprocessor.TOPIC_KEYWORDS)
+    moods = list(TextPreprocessor.MOOD_INDICATORS)
+    
+    events: List[Tuple[float, str]] = []
+    vibe_changes: List[float] = []
+    vibe = None
+    t = 0.0
+    page_seed = seed * 1000
+    while t < duration:
+        if vibe is None or rng.random() >= same_vibe_ratio:
+            new_vibe = (rng.choice(topics), rng.choice(moods))
+            if vibe is not None and new_vibe != vibe:
+                vibe_changes.append(t)
+            vibe = new_vibe
+        page_seed += 1
+        page = generate_page(window * 6, seed=page_seed, topic=vibe[0], mood=vibe[1])
+        dwell = rng.uniform(60, 240)
+        end = min(duration, t + dwell)
+        offset = 0
+        while t < end:
+            text = _ocr_noise(rng, page[offset:offset + window], ocr_error_rate)
+            if chrome:
+                top = _ocr_noise(chrome_rng, '\n'.join(_chrome(chrome_rng, CHROME_TOP, t)), ocr_error_rate)
+                bottom = _ocr_noise(chrome_rng, '\n'.join(_chrome(chrome_rng, CHROME_BOTTOM, t)), ocr_error_rate)
+                text = f"{top}\n{text}\n{bottom}"
+            events.append((t, text))
+            if rng.random() < 0.5:
+                offset = min(len(page) - window, offset + rng.randint(50, 250))
+            t += sample_interval
+    return events, vibe_changes
+
+
+# Example responses as returned by the model, from clean to messy
+MODEL_RESPONSES = {
+    'clean': '{"topics": "A calm instrumental track for reading scientific content", '
+             '"tags": "instrumental, ambient, contemplative, piano, strings"}',
+    'fenced': '```json\n{"topics": "A gentle romantic instrumental piece", '
+              '"tags": "instrumental, romantic, soft, piano, strings"}\n```',
+    'prose': 'Here is the JSON:\n{"topics": "A professional instrumental background track", '
+             '"tags": "instrumental, professional, moderate, piano, subtle"}\nHope this helps!',
+    'truncated': '{"topics": "A calm instrumental track for reading scientific content", '
+                 '"tags": "instrumental, ambient, contempl',
+    'single_quotes': "{'topics': 'An upbeat instrumental track for coding', "
+                     "'tags': 'instrumental, electronic, upbeat',}",
+}
+
+
+if __name__ == "__main__":
+    corpus = generate_corpus(pages_per_size=1)
+    for name, pages in corpus.items():
+        print(f"{name}: {len(pages[0])} chars")
+        print(pages[0][:200])
+        print()
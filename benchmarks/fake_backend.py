@@ -0,0 +1,74 @@
+"""
+Fake Cerebras chat completions backend for benchmarks.
+
+Mimics the shape of ``client.chat.completions.create(...)`` responses so
+``CerebrasVibeCompressor.compress`` can run end to end without network I/O.
+With ``stream=True`` the response is yielded in delta chunks like the SDK's
+streaming responses, with the usage on the last chunk.
+"""
+
+import time
+from types import SimpleNamespace
+from typing import Dict, Iterator, List, Union
+
+
+class FakeCompletions:
+    """
+    Returns canned responses, optionally after a simulated latency.
+    
+    Responses may be a single list used for every model, or a dictionary
+    mapping model name to its own list (to exercise routing and escalation).
+    Latency is the time to the first token; token_latency is added per
+    chunk of chunk_chars characters (about one token), so streamed and
+    non-streamed calls of the same response take equally long overall.
+    """
+    
+    def __init__(self, responses: Union[List[str], Dict[str, List[str]]], latency: float = 0.0,
+                 token_latency: float = 0.0, chunk_chars: int = 4):
+        self.responses = responses
+        self.latency = latency
+        self.token_latency = token_latency
+        self.chunk_chars = chunk_chars
+        self.calls = 0
+        self.calls_by_model: Dict[str, int] = {}
+    
+    def create(self, messages, model, max_completion_tokens=None,
+               temperature=None, top_p=None, stream=False, **kwargs):
+        """Return the next canned response in the chat completions shape."""
+        if self.latency:
+            time.sleep(self.latency)
+        responses = self.responses[model] if isinstance(self.responses, dict) else self.responses
+        content = responses[self.calls % len(responses)]
+        self.calls += 1
+        self.calls_by_model[model] = self.calls_by_model.get(model, 0) + 1
+        prompt_chars = sum(len(m['content']) for m in messages)
+        usage = SimpleNamespace(total_tokens=prompt_chars // 4 + len(content) // 4)
+        pieces = [content[i:i + self.chunk_chars] for i in range(0, len(content), self.chunk_chars)]
+        if stream:
+            return self._stream(pieces, usage)
+        if self.token_latency:
+            time.sleep(self.token_latency * len(pieces))
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+            usage=usage,
+        )
+    
+    def _stream(self, pieces: List[str], usage) -> Iterator[SimpleNamespace]:
+        """Yield the response as delta chunks, then a final chunk with the usage."""
+        for piece in pieces:
+            if self.token_latency:
+                time.sleep(self.token_latency)
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=piece))], usage=None)
+        yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=None))], usage=usage)
+
+
+class FakeCerebrasClient:
+    """Drop-in stand-in for ``cerebras.cloud.sdk.Cerebras``."""
+    
+    def __init__(self, responses: Union[List[str], Dict[str, List[str]]], latency: float = 0.0,
+                 token_latency: float = 0.0, chunk_chars: int = 4):
+        self.chat = SimpleNamespace(completions=FakeCompletions(responses, latency, token_latency, chunk_chars))
+    
+    @property
+    def calls(self) -> int:
+        return self.chat.completions.calls
@@ -0,0 +1,348 @@
+"""
+Benchmark runner for the cerebrus hot paths.
+
+Times the text preprocessor, schema validator, model response parser and
+end-to-end compression (against a fake backend) over a synthetic corpus,
+then compares the results with a stored baseline.
+
+Usage:
+    python -m benchmarks.run_benchmarks                   # run and compare
+    python -m benchmarks.run_benchmarks --save-baseline   # refresh baseline
+    python -m benchmarks.run_benchmarks --quick --fail-on-regression
+
+Medians are compared, and a benchmark only counts as a regression when it
+is slower than the threshold widened by the run-to-run spread of both
+measurements (to at most 1.5x the threshold), and its samples pooled with
+those of its re-runs (--confirm) are still that slow.
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from cerebrus.cerebras_vibe_compressor import CerebrasVibeCompressor
+from cerebrus.schema_validator import VibeSchemaValidator
+from cerebrus.text_preprocessor import TextPreprocessor
+
+from .corpus import MODEL_RESPONSES, generate_corpus
+from .fake_backend import FakeCerebrasClient
+
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), 'baseline.json')
+
+# A benchmark is flagged when it is this much slower than the baseline
+DEFAULT_THRESHOLD = 1.25
+
+# Times a flagged benchmark is re-timed before it counts as a regression
+DEFAULT_CONFIRM = 2
+
+# Noise widens the threshold to at most this multiple of it
+MAX_WIDENING = 1.5
+
+
+def time_call(func: Callable[[], Any], repeat: int = 5, min_time: float = 0.05) -> Dict[str, float]:
+    """
+    Time a zero-argument callable.
+    
+    Each sample runs the callable in a loop for at least ``min_time`` seconds
+    and records the mean time per call.
+    
+    Args:
+        func: Callable to time
+        repeat: Number of samples
+        min_time: Minimum wall time per sample in seconds
+    
+    Returns:
+        Dictionary with best and median seconds per call, loops,
+        spread (max - min over median of the samples) and the samples
+    """
+    # Calibrate the loop count so each sample is long enough to measure
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+        loops *= 2
+    
+    samples = [elapsed / loops]
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(loops):
+            func()
+        samples.append((time.perf_counter() - start) / loops)
+    
+    return summarize(samples, loops)
+
+
+def summarize(samples: List[float], loops: int) -> Dict[str, Any]:
+    """Timing result (as returned by time_call) of per-call samples."""
+    median = statistics.median(samples)
+    return {
+        'best': min(samples),
+        'median': median,
+        'loops': loops,
+        'spread': (max(samples) - min(samples)) / median if median else 0.0,
+        'samples': samples,
+    }
+
+
+def build_benchmarks(corpus: Dict[str, List[str]]) -> Dict[str, Callable[[], Any]]:
+    """
+    Build the named benchmark callables.
+    
+    Args:
+        corpus: Corpus mapping size name to pages
+    
+    Returns:
+        Dictionary mapping benchmark name to a zero-argument callable
+    """
+    preprocessor = TextPreprocessor()
+    validator = VibeSchemaValidator()
+    compressor = CerebrasVibeCompressor(
+        enable_logging=False,
+        client=FakeCerebrasClient(list(MODEL_RESPONSES.values()))
+    )
+    # compress() logs every call and every repaired response; keep the output quiet
+    compressor.logger.setLevel(logging.ERROR)
+    
+    suno_data = json.loads(MODEL_RESPONSES['clean'])
+    legacy_data = {
+        "topic": "science article",
+        "mood": ["serious", "futuristic", "contemplative"],
+        "energy": 0.35,
+        "tempo": 82,
+        "palette": ["synth pad", "soft piano", "arpeggiator"],
+        "vocals": "instrumental"
+    }
+    
+    benchmarks = {}
+    
+    for size, pages in corpus.items():
+        cleaned = [preprocessor.remove_noise(page) for page in pages]
+        
+        benchmarks[f'remove_noise[{size}]'] = (
+            lambda pages=pages: [preprocessor.remove_noise(p) for p in pages])
+        benchmarks[f'extract_main_content[{size}]'] = (
+            lambda cleaned=cleaned: [preprocessor.extract_main_content(c) for c in cleaned])
+        benchmarks[f'analyze_keywords[{size}]'] = (
+            lambda cleaned=cleaned: [preprocessor.analyze_keywords(c) for c in cleaned])
+        benchmarks[f'process_text[{size}]'] = (
+            lambda pages=pages: [preprocessor.process_text(p) for p in pages])
+        benchmarks[f'compress[{size}]'] = (
+            lambda pages=pages: [compressor.compress(p) for p in pages])
+    
+    benchmarks['validate[suno]'] = lambda: validator.validate(suno_data)
+    benchmarks['validate[legacy]'] = lambda: validator.validate(legacy_data)
+    
+    benchmarks['normalize[suno]'] = lambda: validator.normalize(suno_data)
+    
+    for name, response in MODEL_RESPONSES.items():
+        benchmarks[f'parse_model_response[{name}]'] = (
+            lambda response=response: compressor._parse_model_response(response))
+    
+    return benchmarks
+
+
+def run(pages_per_size: int = 5, repeat: int = 5, min_time: float = 0.05,
+        only: Optional[str] = None,
+        names: Optional[List[str]] = None) -> Dict[str, Dict[str, float]]:
+    """
+    Run the benchmark suite.
+    
+    Args:
+        pages_per_size: Pages per corpus size
+        repeat: Samples per benchmark
+        min_time: Minimum wall time per sample in seconds
+        only: Optional substring filter on benchmark names
+        names: Optional exact benchmark names to run
+    
+    Returns:
+        Dictionary mapping benchmark name to timing results
+    """
+    corpus = generate_corpus(pages_per_size=pages_per_size)
+    results = {}
+    
+    for name, func in build_benchmarks(corpus).items():
+        if only and only not in name:
+            continue
+        if names is not None and name not in names:
+            continue
+        results[name] = time_call(func, repeat=repeat, min_time=min_time)
+        print(f"{name:<40} {results[name]['median'] * 1e3:10.3f} ms")
+    
+    return results
+
+
+def load_baseline(path: str = BASELINE_PATH) -> Optional[Dict[str, Any]]:
+    """Load the stored baseline, or None if it does not exist."""
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def save_baseline(results: Dict[str, Dict[str, float]], path: str = BASELINE_PATH) -> None:
+    """Store benchmark results as the new baseline."""
+    baseline = {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'results': {name: {key: value for key, value in result.items() if key != 'samples'}
+                    for name, result in results.items()},
+    }
+    with open(path, 'w') as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+def noise_threshold(current: Dict[str, float], base: Dict[str, float],
+                    threshold: float = DEFAULT_THRESHOLD) -> float:
+    """
+    Slowdown ratio a benchmark must exceed to be a regression: the
+    threshold, widened to twice the larger sample spread of the two runs
+    but never past MAX_WIDENING times the threshold, so a noisy benchmark
+    still catches a 2x slowdown.
+    """
+    spread = max(current.get('spread', 0.0), base.get('spread', 0.0))
+    return max(threshold, min(1.0 + 2.0 * spread, threshold * MAX_WIDENING))
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Any],
+            threshold: float = DEFAULT_THRESHOLD) -> List[Dict[str, Any]]:
+    """
+    Compare median results against a baseline.
+    
+    Args:
+        results: Current benchmark results
+        baseline: Stored baseline (as returned by load_baseline)
+        threshold: Slowdown ratio above which a benchmark is a regression
+            (widened by measurement noise, see noise_threshold)
+    
+    Returns:
+        List of comparison rows with name, baseline, current, ratio,
+        limit and status
+    """
+    rows = []
+    base_results = baseline.get('results', {})
+    
+    for name, current in results.items():
+        base = base_results.get(name)
+        if base is None:
+            rows.append({'name': name, 'baseline': None, 'current': current['median'],
+                         'ratio': None, 'limit': None, 'status': 'new', 'result': current})
+            continue
+        rows.append(judge(name, current, base, threshold))
+    
+    return rows
+
+
+def judge(name: str, current: Dict[str, Any], base: Dict[str, float],
+          threshold: float = DEFAULT_THRESHOLD) -> Dict[str, Any]:
+    """Comparison row of one benchmark's result against its baseline."""
+    limit = noise_threshold(current, base, threshold)
+    ratio = current['median'] / base['median'] if base['median'] else float('inf')
+    if ratio > limit:
+        status = 'REGRESSION'
+    elif ratio < 1 / limit:
+        status = 'improved'
+    else:
+        status = 'ok'
+    return {'name': name, 'baseline': base['median'], 'current': current['median'],
+            'ratio': ratio, 'limit': limit, 'status': status, 'result': current}
+
+
+def confirm_regressions(rows: List[Dict[str, Any]], baseline: Dict[str, Any], times: int,
+                        run_kwargs: Dict[str, Any], threshold: float = DEFAULT_THRESHOLD) -> List[Dict[str, Any]]:
+    """
+    Re-time flagged benchmarks and re-judge each on its samples pooled
+    over all runs (median and spread, and so the limit, recomputed), so a
+    single slow run does not make a regression.
+    
+    Args:
+        rows: Comparison rows (as returned by compare)
+        baseline: Stored baseline
+        times: Re-runs per flagged benchmark
+        run_kwargs: Keyword arguments for run (repeat, min_time)
+        threshold: Slowdown ratio above which a benchmark is a regression
+    
+    Returns:
+        The rows, with unconfirmed regressions re-judged
+    """
+    for _ in range(times):
+        flagged = [row['name'] for row in rows if row['status'] == 'REGRESSION']
+        if not flagged:
+            break
+        print(f"\nRe-timing {len(flagged)} flagged benchmark(s)")
+        rerun = run(names=flagged, **run_kwargs)
+        base_results = baseline.get('results', {})
+        for i, row in enumerate(rows):
+            if row['name'] not in rerun:
+                continue
+            first, again = row['result'], rerun[row['name']]
+            pooled = summarize(first['samples'] + again['samples'], again['loops'])
+            rows[i] = judge(row['name'], pooled, base_results[row['name']], threshold)
+    return rows
+
+
+def print_report(rows: List[Dict[str, Any]]) -> None:
+    """Print a comparison report table."""
+    print(f"\n{'benchmark':<40} {'baseline ms':>12} {'current ms':>12} {'ratio':>8} {'limit':>8}  status")
+    print('-' * 93)
+    for row in rows:
+        base = f"{row['baseline'] * 1e3:.3f}" if row['baseline'] is not None else '-'
+        ratio = f"{row['ratio']:.2f}x" if row['ratio'] is not None else '-'
+        limit = f"{row['limit']:.2f}x" if row['limit'] is not None else '-'
+        print(f"{row['name']:<40} {base:>12} {row['current'] * 1e3:>12.3f} {ratio:>8} {limit:>8}  {row['status']}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the cerebrus hot paths")
+    parser.add_argument('--save-baseline', action='store_true', help="Store results as the new baseline")
+    parser.add_argument('--baseline', default=BASELINE_PATH, help="Baseline file path")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help="Slowdown ratio that counts as a regression")
+    parser.add_argument('--confirm', type=int, default=DEFAULT_CONFIRM,
+                        help="Times a flagged benchmark is re-timed before it counts as a regression")
+    parser.add_argument('--fail-on-regression', action='store_true', help="Exit non-zero on regressions")
+    parser.add_argument('--quick', action='store_true', help="Fewer, shorter samples")
+    parser.add_argument('--only', help="Only run benchmarks whose name contains this string")
+    args = parser.parse_args(argv)
+    
+    # Same corpus in both modes so results stay comparable with the baseline
+    run_kwargs = {'repeat': 3, 'min_time': 0.02} if args.quick else {}
+    results = run(only=args.only, **run_kwargs)
+    
+    if args.save_baseline:
+        save_baseline(results, args.baseline)
+        print(f"\nBaseline saved to {args.baseline}")
+        return 0
+    
+    baseline = load_baseline(args.baseline)
+    if baseline is None:
+        print(f"\nNo baseline at {args.baseline}; run with --save-baseline to create one")
+        return 0
+    
+    rows = compare(results, baseline, args.threshold)
+    rows = confirm_regressions(rows, baseline, args.confirm, run_kwargs, args.threshold)
+    print_report(rows)
+    
+    regressions = [row for row in rows if row['status'] == 'REGRESSION']
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) above their limit (at least {args.threshold:.2f}x)")
+        if args.fail_on_regression:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
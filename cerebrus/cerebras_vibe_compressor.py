@@ -2,14 +2,15 @@
 Cerebras-powered Vibe Compressor using the Cerebras Cloud SDK.
 
 This module integrates the Cerebras API to provide AI-powered vibe compression
-with the qwen-3-235b-a22b-instruct-2507 model for optimal performance.
+with the qwen-3-235b-a22b-instruct-2507 model for optimal performance, routing
+short, unambiguous input to a smaller fast model when it is healthy.
 """
 
 import os
 import json
 import logging
 import time
-from typing import Dict, List, Any, Optional
+from typing import Callable, Dict, List, Any, Optional
 from dataclasses import dataclass
 
 try:
@@ -20,6 +21,8 @@ except ImportError:
 
 from .schema_validator import VibeSchemaValidator, ValidationResult
 from .text_preprocessor import TextPreprocessor
+from .tolerant_json import TolerantParseResult, parse_complete_members, parse_json_object
+from .model_router import ModelRouter, RouteDecision
 
 
 @dataclass
@@ -34,6 +37,33 @@ class CerebrasCompressionResult:
     token_count: Optional[int]
     model_response: Optional[str]
     tokens_used: Optional[int]
+    json_repaired: bool = False
+    canonical_key: Optional[str] = None
+    model: Optional[str] = None
+    escalated: bool = False
+    route_reason: Optional[str] = None
+    preprocess_time: Optional[float] = None
+
+
+@dataclass
+class _ModelAttempt:
+    """One model call and its parsed, normalized and validated output."""
+    model: str
+    model_response: Optional[str]
+    tokens_used: Optional[int]
+    latency: float
+    parsed: Optional[TolerantParseResult] = None
+    data: Optional[Dict[str, Any]] = None
+    json_output: Optional[str] = None
+    validation: Optional[ValidationResult] = None
+    canonical_key: Optional[str] = None
+    error: Optional[str] = None
+    fields_sent: bool = False
+    
+    @property
+    def ok(self) -> bool:
+        return self.data is not None and self.error is None \
+            and (self.validation is None or self.validation.is_valid)
 
 
 class CerebrasVibeCompressor:
@@ -44,25 +74,36 @@ class CerebrasVibeCompressor:
     for intelligent vibe extraction from webpage content.
     """
     
-    def __init__(self, api_key: Optional[str] = None, enable_logging: bool = True):
+    def __init__(self, api_key: Optional[str] = None, enable_logging: bool = True,
+                 client: Optional[Any] = None, router: Optional[ModelRouter] = None,
+                 enable_routing: bool = False):
         """
         Initialize the Cerebras vibe compressor.
         
         Args:
             api_key: Cerebras API key (if None, uses CEREBRAS_API_KEY env var)
             enable_logging: Whether to enable logging
+            client: Pre-built chat completions client (e.g. a fake backend for
+                benchmarks); skips the Cerebras SDK and API key checks
+            router: Model router to share between compressors (a new one is
+                created if None)
+            enable_routing: Whether to route short, unambiguous input to the
+                fast model (opt-in); if False every request uses self.model
         """
-        if Cerebras is None:
-            raise ImportError("cerebras-cloud-sdk package is required. Install with: pip install cerebras-cloud-sdk")
-        
-        # Setup API key
-        if api_key:
-            os.environ["CEREBRAS_API_KEY"] = api_key
-        elif not os.environ.get("CEREBRAS_API_KEY"):
-            raise ValueError("Cerebras API key must be provided or set in CEREBRAS_API_KEY environment variable")
-        
-        # Initialize Cerebras client
-        self.client = Cerebras(api_key=os.environ.get("CEREBRAS_API_KEY"))
+        if client is not None:
+            self.client = client
+        else:
+            if Cerebras is None:
+                raise ImportError("cerebras-cloud-sdk package is required. Install with: pip install cerebras-cloud-sdk")
+            
+            # Setup API key
+            if api_key:
+                os.environ["CEREBRAS_API_KEY"] = api_key
+            elif not os.environ.get("CEREBRAS_API_KEY"):
+                raise ValueError("Cerebras API key must be provided or set in CEREBRAS_API_KEY environment variable")
+            
+            # Initialize Cerebras client
+            self.client = Cerebras(api_key=os.environ.get("CEREBRAS_API_KEY"))
         
         # Initialize supporting components
         self.preprocessor = TextPreprocessor()
@@ -81,6 +122,11 @@ class CerebrasVibeCompressor:
         self.max_tokens = 100  # Keep low for concise output
         self.temperature = 0.1  # Low temperature for deterministic output
         self.top_p = 0.8
+        
+        # Per-request model routing (fast model with escalation to self.model)
+        if router is None and enable_routing:
+            router = ModelRouter(large_model=self.model)
+        self.router = router
     
     def _create_system_prompt(self) -> str:
         """Create the system prompt for the Cerebras model."""
@@ -125,43 +171,45 @@ Output strictly as JSON, no additional commentary."""
 
 Task: Summarize this into a strict JSON object following the schema. Output JSON only."""
     
-    def _parse_model_response(self, response: str) -> Optional[Dict[str, Any]]:
+    def _parse_model_response(self, response: str) -> TolerantParseResult:
         """
         Parse the model response to extract JSON.
         
+        Extracts the first JSON object and repairs truncated or malformed
+        output (see tolerant_json) instead of failing outright.
+        
         Args:
             response: Raw model response
             
         Returns:
-            Parsed JSON data or None if parsing fails
+            TolerantParseResult with parsed JSON data (None if parsing fails)
+            and whether a repair was needed
         """
-        try:
-            # Try to find JSON in the response
-            response = response.strip()
-            
-            # Look for JSON object boundaries
-            start_idx = response.find('{')
-            end_idx = response.rfind('}')
-            
-            if start_idx != -1 and end_idx != -1 and end_idx > start_idx:
-                json_str = response[start_idx:end_idx + 1]
-                return json.loads(json_str)
-            
-            # If no braces found, try parsing the whole response
-            return json.loads(response)
-            
-        except json.JSONDecodeError as e:
-            self.logger.error(f"Failed to parse JSON from model response: {e}")
+        parsed = parse_json_object(response.strip() if response else response)
+        
+        if parsed.data is None:
+            self.logger.error("Failed to parse JSON from model response")
             self.logger.debug(f"Raw response: {response}")
-            return None
+        elif parsed.repaired:
+            self.logger.warning(f"Repaired model response JSON: {', '.join(parsed.repairs)}")
+        
+        return parsed
     
-    def compress(self, text: str, validate_output: bool = True) -> CerebrasCompressionResult:
+    def compress(self, text: str, validate_output: bool = True,
+                 normalize_output: bool = True,
+                 on_fields: Optional[Callable[[Dict[str, Any]], None]] = None) -> CerebrasCompressionResult:
         """
         Compress webpage text using Cerebras AI.
         
         Args:
             text: Raw webpage text to compress
             validate_output: Whether to validate the output
+            normalize_output: Whether to repair and canonicalize the output
+                (canonical tag order, instrument vocabulary, length limits)
+            on_fields: Called once with the (normalized, valid) topics and
+                tags as soon as the streamed response contains them, before
+                the response is finished; the model is streamed when set.
+                Runs on the calling thread, so it must not block.
             
         Returns:
             CerebrasCompressionResult with success status and data
@@ -197,47 +245,53 @@ Task: Summarize this into a strict JSON object following the schema. Output JSON
                 )
             
             # Preprocess text to clean and extract main content
+            confidence = 0.0
+            preprocess_start = time.time()
             try:
                 processed = self.preprocessor.process_text(text)
                 main_content = processed['main_content']
+                confidence = ModelRouter.topic_confidence(processed['keyword_scores'])
                 
                 if not main_content or len(main_content.strip()) < 5:
                     # Fallback to basic cleaning
                     main_content = text[:800].strip()
+                    confidence = 0.0
                     
             except Exception as e:
                 self.logger.warning(f"Text preprocessing failed, using fallback: {e}")
                 main_content = text[:800].strip()
+            preprocess_time = time.time() - preprocess_start
             
             # Create prompts
             system_prompt = self._create_system_prompt()
             user_prompt = self._create_user_prompt(main_content)
             
-            # Call Cerebras API
-            self.logger.info("Calling Cerebras API for vibe compression")
-            
-            response = self.client.chat.completions.create(
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                model=self.model,
-                max_completion_tokens=self.max_tokens,
-                temperature=self.temperature,
-                top_p=self.top_p,
-                stream=False
-            )
+            # Pick the model for this request
+            if self.router is not None:
+                route = self.router.choose(len(main_content), confidence)
+            else:
+                route = RouteDecision(self.model, "routing disabled")
             
-            # Extract response content
-            model_response = response.choices[0].message.content
-            tokens_used = response.usage.total_tokens if hasattr(response, 'usage') else None
+            attempt = self._run_model(route.model, system_prompt, user_prompt, normalize_output, on_fields)
+            escalated = False
+            tokens_used = attempt.tokens_used
             
-            self.logger.info(f"Received response from Cerebras API (tokens: {tokens_used})")
+            # Escalate to the large model when the fast model's output is unusable
+            if not attempt.ok and route.model != self.model:
+                self.logger.warning(f"Escalating from {route.model} to {self.model}: "
+                                    f"{attempt.error or attempt.validation.errors}")
+                fields_sent = attempt.fields_sent
+                attempt = self._run_model(self.model, system_prompt, user_prompt, normalize_output,
+                                          None if fields_sent else on_fields)
+                attempt.fields_sent = attempt.fields_sent or fields_sent
+                escalated = True
+                if attempt.tokens_used is not None:
+                    tokens_used = (tokens_used or 0) + attempt.tokens_used
             
-            # Parse JSON from response
-            vibe_data = self._parse_model_response(model_response)
+            if attempt.error and attempt.parsed is None:
+                raise RuntimeError(attempt.error)
             
-            if not vibe_data:
+            if not attempt.data:
                 return CerebrasCompressionResult(
                     success=False,
                     data=None,
@@ -246,35 +300,60 @@ Task: Summarize this into a strict JSON object following the schema. Output JSON
                     error_message="Failed to parse JSON from model response",
                     processing_time=time.time() - start_time,
                     token_count=None,
-                    model_response=model_response,
-                    tokens_used=tokens_used
+                    model_response=attempt.model_response,
+                    tokens_used=tokens_used,
+                    json_repaired=attempt.parsed.repaired,
+                    model=attempt.model,
+                    escalated=escalated,
+                    route_reason=route.reason,
+                    preprocess_time=preprocess_time
                 )
             
-            # Generate compact JSON
-            json_output = json.dumps(vibe_data, separators=(',', ':'))
-            token_count = len(json_output.split())
+            if attempt.error:
+                # Normalization had to invent the vibe and no model was left to escalate to
+                return CerebrasCompressionResult(
+                    success=False,
+                    data=None,
+                    json_output=None,
+                    validation=attempt.validation if validate_output else None,
+                    error_message=attempt.error,
+                    processing_time=time.time() - start_time,
+                    token_count=None,
+                    model_response=attempt.model_response,
+                    tokens_used=tokens_used,
+                    json_repaired=attempt.parsed.repaired,
+                    model=attempt.model,
+                    escalated=escalated,
+                    route_reason=route.reason,
+                    preprocess_time=preprocess_time
+                )
             
-            # Validate if requested
-            validation = None
-            if validate_output:
-                validation = self.validator.validate(vibe_data)
-                if not validation.is_valid:
-                    self.logger.warning(f"Validation failed: {validation.errors}")
+            validation = attempt.validation if validate_output else None
+            if validation is not None and not validation.is_valid:
+                self.logger.warning(f"Validation failed: {validation.errors}")
             
+            token_count = len(attempt.json_output.split())
             processing_time = time.time() - start_time
             
-            self.logger.info(f"Compression successful in {processing_time:.3f}s, {token_count} output tokens")
+            self.logger.info(f"Compression successful in {processing_time:.3f}s, {token_count} output tokens "
+                             f"({attempt.model}{', escalated' if escalated else ''})")
             
             return CerebrasCompressionResult(
                 success=True,
-                data=vibe_data,
-                json_output=json_output,
+                data=attempt.data,
+                json_output=attempt.json_output,
                 validation=validation,
                 error_message=None,
                 processing_time=processing_time,
                 token_count=token_count,
-                model_response=model_response,
-                tokens_used=tokens_used
+                model_response=attempt.model_response,
+                tokens_used=tokens_used,
+                json_repaired=attempt.parsed.repaired,
+                canonical_key=attempt.canonical_key,
+                model=attempt.model,
+                escalated=escalated,
+                route_reason=route.reason,
+                preprocess_time=preprocess_time
             )
             
         except Exception as e:
@@ -294,13 +373,156 @@ Task: Summarize this into a strict JSON object following the schema. Output JSON
                 tokens_used=None
             )
     
-    def compress_batch(self, texts: List[str], validate_output: bool = True) -> List[CerebrasCompressionResult]:
+    def _run_model(self, model: str, system_prompt: str, user_prompt: str,
+                   normalize_output: bool,
+                   on_fields: Optional[Callable[[Dict[str, Any]], None]] = None) -> _ModelAttempt:
+        """
+        Call one model and parse, normalize and validate its output.
+        
+        The outcome is recorded with the router so its latency and error
+        statistics stay current.
+        
+        Args:
+            model: Model name
+            system_prompt: System prompt
+            user_prompt: User prompt
+            normalize_output: Whether to canonicalize the output
+            on_fields: Early fields callback (see compress); streams the
+                response when set
+            
+        Returns:
+            _ModelAttempt describing the call
+        """
+        self.logger.info(f"Calling Cerebras API for vibe compression ({model})")
+        call_start = time.time()
+        fields_sent = False
+        
+        try:
+            response = self.client.chat.completions.create(
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": user_prompt}
+                ],
+                model=model,
+                max_completion_tokens=self.max_tokens,
+                temperature=self.temperature,
+                top_p=self.top_p,
+                stream=on_fields is not None
+            )
+            if on_fields is not None:
+                model_response, tokens_used, fields_sent = self._read_stream(response, normalize_output, on_fields)
+        except Exception as e:
+            latency = time.time() - call_start
+            if self.router is not None:
+                self.router.record(model, latency, success=False)
+            return _ModelAttempt(model=model, model_response=None, tokens_used=None,
+                                 latency=latency, error=f"{model} request failed: {e}",
+                                 fields_sent=fields_sent)
+        
+        latency = time.time() - call_start
+        
+        # Extract response content
+        if on_fields is None:
+            model_response = response.choices[0].message.content
+            tokens_used = response.usage.total_tokens if hasattr(response, 'usage') else None
+        
+        self.logger.info(f"Received response from Cerebras API (tokens: {tokens_used})")
+        
+        attempt = _ModelAttempt(model=model, model_response=model_response,
+                                tokens_used=tokens_used, latency=latency, fields_sent=fields_sent)
+        
+        # Parse JSON from response
+        attempt.parsed = self._parse_model_response(model_response)
+        vibe_data = attempt.parsed.data
+        
+        if vibe_data:
+            # Canonicalize so identical vibes produce identical output
+            if normalize_output:
+                normalization = self.validator.normalize(vibe_data)
+                if normalization.repairs:
+                    self.logger.info(f"Normalized model output: {', '.join(normalization.repairs)}")
+                if normalization.substantive:
+                    # Valid after repair, but the content was made up: not a usable answer
+                    attempt.error = f"{model} output needed substantive repairs: {', '.join(normalization.repairs)}"
+                vibe_data = normalization.data
+                attempt.canonical_key = normalization.canonical_key
+            
+            # Generate compact JSON and validate it
+            attempt.data = vibe_data
+            attempt.json_output = json.dumps(vibe_data, separators=(',', ':'))
+            attempt.validation = self.validator.validate(vibe_data, json_str=attempt.json_output)
+        else:
+            attempt.error = "Failed to parse JSON from model response"
+        
+        if self.router is not None:
+            self.router.record(model, latency, success=attempt.ok)
+        
+        return attempt
+    
+    def _read_stream(self, stream, normalize_output: bool,
+                     on_fields: Callable[[Dict[str, Any]], None]) -> tuple:
+        """
+        Accumulate a streamed response, handing over topics and tags early.
+        
+        As soon as both fields are complete in the text received so far
+        (see parse_complete_members) they are normalized and validated like
+        the final output, and passed to on_fields if valid. Normalized
+        output only keeps these two fields, so they are what the finished
+        response will contain too.
+        
+        Args:
+            stream: Streaming chat completions response
+            normalize_output: Whether to canonicalize the fields
+            on_fields: Early fields callback
+        
+        Returns:
+            Tuple of (response text, total tokens or None, whether
+            on_fields was called)
+        """
+        parts = []
+        tokens_used = None
+        checked = False
+        fields_sent = False
+        
+        for chunk in stream:
+            usage = getattr(chunk, 'usage', None)
+            if usage is not None:
+                tokens_used = usage.total_tokens
+            if not chunk.choices or not chunk.choices[0].delta.content:
+                continue
+            content = chunk.choices[0].delta.content
+            parts.append(content)
+            
+            # A field can only have completed in a chunk with a closing quote
+            if checked or '"' not in content:
+                continue
+            members = parse_complete_members(''.join(parts))
+            if not self.validator.SUNO_FIELDS <= members.keys():
+                continue
+            checked = True
+            
+            fields = {field: members[field] for field in ('topics', 'tags')}
+            if normalize_output:
+                normalization = self.validator.normalize(fields)
+                if normalization.substantive:
+                    continue
+                fields = normalization.data
+            if self.validator.validate(fields).is_valid:
+                self.logger.info("Topics and tags complete in the stream, handing them over")
+                on_fields(fields)
+                fields_sent = True
+        
+        return ''.join(parts), tokens_used, fields_sent
+    
+    def compress_batch(self, texts: List[str], validate_output: bool = True,
+                       normalize_output: bool = True) -> List[CerebrasCompressionResult]:
         """
         Compress multiple texts using Cerebras AI.
         
         Args:
             texts: List of text strings to compress
             validate_output: Whether to validate outputs
+            normalize_output: Whether to canonicalize outputs
             
         Returns:
             List of CerebrasCompressionResults
@@ -310,7 +532,7 @@ Task: Summarize this into a strict JSON object following the schema. Output JSON
         for i, text in enumerate(texts):
             try:
                 self.logger.info(f"Processing batch item {i+1}/{len(texts)}")
-                result = self.compress(text, validate_output)
+                result = self.compress(text, validate_output, normalize_output)
                 results.append(result)
                 
                 # Small delay to avoid rate limiting
@@ -360,11 +582,17 @@ Task: Summarize this into a strict JSON object following the schema. Output JSON
         processing_times = [r.processing_time for r in successful if r.processing_time]
         
         # Topic distribution
-        topics = [r.data['topic'] for r in successful if r.data]
+        topics = [r.data.get('topics', r.data.get('topic')) for r in successful if r.data]
         topic_counts = {}
         for topic in topics:
             topic_counts[topic] = topic_counts.get(topic, 0) + 1
         
+        # Model routing
+        model_counts = {}
+        for r in successful:
+            if r.model:
+                model_counts[r.model] = model_counts.get(r.model, 0) + 1
+        
         return {
             'total': len(results),
             'successful': len(successful),
@@ -387,6 +615,10 @@ Task: Summarize this into a strict JSON object following the schema. Output JSON
                 'total_processing_time': sum(processing_times) if processing_times else 0
             },
             'topic_distribution': topic_counts,
+            'repaired_responses': sum(1 for r in successful if r.json_repaired),
+            'model_distribution': model_counts,
+            'escalations': sum(1 for r in results if r.escalated),
+            'model_stats': self.router.get_stats() if self.router else {},
             'common_errors': [r.error_message for r in failed]
         }
 
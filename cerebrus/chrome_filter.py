@@ -0,0 +1,252 @@
+"""
+Screen-chrome filter for live OCR text.
+
+OCR snapshots of a screen carry the same browser tabs, menus, taskbar and
+sidebars in every frame. TextPreprocessor.remove_noise only knows a fixed
+set of English webpage patterns, so this chrome reaches the model as part
+of the page text, costs tokens and (with clocks and unread counters)
+makes otherwise identical frames look different.
+
+ChromeFilter learns it per session instead. Every line of every frame is
+counted in a line-frequency index (lines are normalized first: case,
+whitespace and digits, so "10:42" and "10:43" are the same line, and a
+line that differs from an indexed one by an OCR misread or two counts as
+that line), with counts decaying frame by frame. A line is chrome once it
+keeps showing up while the screen around it changes: it must be in at
+least min_ratio of recent frames, and the lines on screen must have
+mostly changed since it was first seen (the line sets of the two frames
+are at most max_similarity alike). Text a reader simply stays on is never
+stripped, however long they stay. The index holds at most max_lines
+lines; the least seen are evicted first.
+"""
+
+import difflib
+import heapq
+import re
+import threading
+import zlib
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+
+# Lines in a frame sketch (bottom-k of the line hashes)
+SKETCH_SIZE = 32
+
+# Longest normalized line kept as an index key
+MAX_KEY_LENGTH = 160
+
+# Words shared by more indexed lines than this are not used to find near-identical lines
+MAX_POSTINGS = 64
+
+# Indexed lines compared character by character with an unseen line
+MAX_CANDIDATES = 3
+
+_DIGITS = re.compile(r'\d+')
+_WORD = re.compile(r'[a-z]{3,}')
+
+
+def line_key(line: str) -> str:
+    """Normalized form of a line: lowercase, digit runs as '#', single spaces."""
+    key = _DIGITS.sub('#', ' '.join(line.lower().split()))
+    return key.strip(' .,:;|-–—·•')[:MAX_KEY_LENGTH]
+
+
+def frame_sketch(keys: Iterable[str]) -> Tuple[int, ...]:
+    """Bottom-k sketch of the hashes of a frame's normalized lines."""
+    return tuple(heapq.nsmallest(SKETCH_SIZE, {zlib.crc32(key.encode()) for key in keys if key}))
+
+
+def sketch_similarity(a: Tuple[int, ...], b: Tuple[int, ...]) -> float:
+    """Estimated Jaccard similarity of two frames' line sets (1.0 if both are empty)."""
+    if not a and not b:
+        return 1.0
+    union = heapq.nsmallest(SKETCH_SIZE, set(a) | set(b))
+    shared = set(a) & set(b)
+    return sum(1 for h in union if h in shared) / len(union)
+
+
+class ChromeFilter:
+    """
+    Per-session index of repeated screen lines, stripping learned chrome.
+    
+    Thread-safe; use one filter per screen-capture session.
+    """
+    
+    def __init__(self,
+                 half_life: float = 100.0,
+                 min_ratio: float = 0.6,
+                 min_frames: int = 5,
+                 max_similarity: float = 0.5,
+                 min_line_similarity: float = 0.85,
+                 max_lines: int = 2000):
+        """
+        Initialize the filter.
+        
+        Args:
+            half_life: Frames after which a line's count has halved
+            min_ratio: Share of recent frames a chrome line appears in
+            min_frames: Decayed frame count a line needs before it can be
+                chrome
+            max_similarity: Highest similarity between the lines on screen
+                now and when a line was first seen for the line to count as
+                chrome (lower means the screen must have changed more)
+            min_line_similarity: Character similarity (difflib ratio) at
+                which an unseen line counts as a misread of an indexed one
+            max_lines: Lines kept in the index
+        """
+        self.decay = 0.5 ** (1.0 / half_life)
+        self.min_ratio = min_ratio
+        self.min_frames = min_frames
+        self.max_similarity = max_similarity
+        self.min_line_similarity = min_line_similarity
+        self.max_lines = max_lines
+        
+        # key -> [decayed count, last frame, sketch of the frame it was first seen in, chrome]
+        self.lines: Dict[str, list] = {}
+        self._postings: Dict[str, Set[str]] = {}  # word -> keys of indexed lines with it
+        self.frames = 0
+        self._recent_frames = 0.0  # decayed frame count
+        self._stats = {'frames': 0, 'lines': 0, 'stripped_lines': 0, 'chars_in': 0, 'chars_out': 0, 'evictions': 0}
+        self._lock = threading.Lock()
+    
+    def _count(self, entry: list) -> float:
+        """A line's count decayed to the current frame."""
+        return entry[0] * self.decay ** (self.frames - entry[1])
+    
+    def _match(self, key: str) -> Optional[str]:
+        """Indexed line a new line is a misread of, if any (call with the lock held)."""
+        shared: Dict[str, int] = {}
+        for word in set(_WORD.findall(key)):
+            keys = self._postings.get(word, ())
+            if len(keys) <= MAX_POSTINGS:
+                for candidate in keys:
+                    shared[candidate] = shared.get(candidate, 0) + 1
+        
+        best, best_similarity = None, self.min_line_similarity
+        matcher = difflib.SequenceMatcher(None, '', key, autojunk=False)
+        for candidate in heapq.nlargest(MAX_CANDIDATES, shared, key=shared.get):
+            matcher.set_seq1(candidate)
+            if matcher.real_quick_ratio() < best_similarity or matcher.quick_ratio() < best_similarity:
+                continue
+            similarity = matcher.ratio()
+            if similarity >= best_similarity:
+                best, best_similarity = candidate, similarity
+        return best
+    
+    def _index(self, key: str, sketch: Tuple[int, ...]) -> list:
+        """Add a line first seen in a frame with this sketch (call with the lock held)."""
+        for word in set(_WORD.findall(key)):
+            self._postings.setdefault(word, set()).add(key)
+        entry = self.lines[key] = [0.0, self.frames, sketch, False]
+        return entry
+    
+    def filter(self, text: str) -> str:
+        """
+        Learn from a frame and return it without its chrome lines.
+        
+        Args:
+            text: OCR text of one frame (lines separated by newlines)
+        
+        Returns:
+            The frame's text with learned chrome lines removed
+        """
+        raw_lines = text.split('\n') if text else []
+        
+        with self._lock:
+            self.frames += 1
+            self._recent_frames = self._recent_frames * self.decay + 1.0
+            
+            # Misreads of indexed lines count as those lines
+            keys = []
+            for line in raw_lines:
+                key = line_key(line)
+                if key and key not in self.lines:
+                    key = self._match(key) or key
+                keys.append(key)
+            sketch = frame_sketch(keys)
+            
+            kept = []
+            stripped = 0
+            seen = set()
+            for line, key in zip(raw_lines, keys):
+                if not key:
+                    kept.append(line)
+                    continue
+                if key in seen:
+                    # Repeated within the frame: counted once, chrome either way
+                    if self.lines[key][3]:
+                        stripped += 1
+                    else:
+                        kept.append(line)
+                    continue
+                seen.add(key)
+                
+                entry = self.lines.get(key)
+                if entry is None:
+                    entry = self._index(key, sketch)
+                entry[0] = self._count(entry) + 1.0
+                entry[1] = self.frames
+                
+                if not entry[3] and entry[0] >= self.min_frames \
+                        and entry[0] >= self.min_ratio * self._recent_frames \
+                        and sketch_similarity(sketch, entry[2]) <= self.max_similarity:
+                    entry[3] = True
+                if entry[3] and entry[0] >= self.min_ratio * self._recent_frames:
+                    stripped += 1
+                else:
+                    kept.append(line)
+            
+            if len(self.lines) > self.max_lines:
+                self._evict()
+            
+            result = '\n'.join(kept)
+            self._stats['frames'] += 1
+            self._stats['lines'] += len(raw_lines)
+            self._stats['stripped_lines'] += stripped
+            self._stats['chars_in'] += len(text or '')
+            self._stats['chars_out'] += len(result)
+        return result
+    
+    def _evict(self) -> None:
+        """Drop the least seen lines, down to 90% of max_lines."""
+        excess = len(self.lines) - int(self.max_lines * 0.9)
+        counts = ((self._count(entry), key) for key, entry in self.lines.items())
+        for _, key in heapq.nsmallest(excess, counts):
+            del self.lines[key]
+            for word in set(_WORD.findall(key)):
+                keys = self._postings[word]
+                keys.discard(key)
+                if not keys:
+                    del self._postings[word]
+        self._stats['evictions'] += excess
+    
+    def chrome_lines(self) -> List[str]:
+        """Normalized lines currently treated as chrome, most frequent first."""
+        with self._lock:
+            chrome = [(self._count(entry), key) for key, entry in self.lines.items()
+                      if entry[3] and self._count(entry) >= self.min_ratio * self._recent_frames]
+        return [key for _, key in sorted(chrome, reverse=True)]
+    
+    def reset(self) -> None:
+        """Forget everything learned (e.g. when capture restarts on another screen)."""
+        with self._lock:
+            self.lines.clear()
+            self._postings.clear()
+            self.frames = 0
+            self._recent_frames = 0.0
+    
+    def get_stats(self) -> Dict[str, float]:
+        """
+        Filter statistics.
+        
+        Returns:
+            Dictionary with frames, lines, stripped_lines, chars_in,
+            chars_out, evictions, indexed_lines, chrome_lines and
+            char_reduction (share of characters stripped)
+        """
+        chrome = len(self.chrome_lines())
+        with self._lock:
+            stats = dict(self._stats)
+            stats['indexed_lines'] = len(self.lines)
+        stats['chrome_lines'] = chrome
+        stats['char_reduction'] = 1 - stats['chars_out'] / stats['chars_in'] if stats['chars_in'] else 0.0
+        return stats
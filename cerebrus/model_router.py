@@ -0,0 +1,172 @@
+"""
+Latency-aware model routing for the Vibe Compressor.
+
+This module picks a Cerebras model per request: short, unambiguous text goes
+to a small fast model, everything else (and anything the small model gets
+wrong) goes to the large model. Live latency and error statistics per model
+steer traffic away from a model that is slow or failing.
+"""
+
+import threading
+from typing import Dict, Optional
+from dataclasses import dataclass
+
+
+@dataclass
+class ModelStats:
+    """Live statistics for one model (exponentially weighted)."""
+    requests: int = 0
+    failures: int = 0
+    avg_latency: Optional[float] = None
+    error_rate: float = 0.0
+
+
+@dataclass
+class RouteDecision:
+    """Model chosen for a request and why."""
+    model: str
+    reason: str
+
+
+class ModelRouter:
+    """
+    Routes compression requests between a fast and a large model.
+    
+    Thread-safe; one router can be shared across compressor instances.
+    """
+    
+    DEFAULT_FAST_MODEL = "llama3.1-8b"
+    DEFAULT_LARGE_MODEL = "qwen-3-235b-a22b-instruct-2507"
+    
+    def __init__(self,
+                 fast_model: str = DEFAULT_FAST_MODEL,
+                 large_model: str = DEFAULT_LARGE_MODEL,
+                 max_fast_chars: int = 600,
+                 min_confidence: float = 0.5,
+                 max_error_rate: float = 0.3,
+                 min_samples: int = 5,
+                 smoothing: float = 0.2,
+                 probe_interval: int = 10):
+        """
+        Initialize the router.
+        
+        Args:
+            fast_model: Small model for short, unambiguous input
+            large_model: Large model for everything else and escalations
+            max_fast_chars: Longest input (after preprocessing) sent to the fast model
+            min_confidence: Minimum preprocessor topic confidence for the fast model
+            max_error_rate: Fast model error rate above which it is bypassed
+            min_samples: Requests needed before error rates are trusted
+            smoothing: EWMA weight given to each new observation
+            probe_interval: While the fast model is bypassed for latency or
+                errors, every Nth eligible request still goes to it so its
+                statistics can recover
+        """
+        self.fast_model = fast_model
+        self.large_model = large_model
+        self.max_fast_chars = max_fast_chars
+        self.min_confidence = min_confidence
+        self.max_error_rate = max_error_rate
+        self.min_samples = min_samples
+        self.smoothing = smoothing
+        self.probe_interval = probe_interval
+        
+        self._stats: Dict[str, ModelStats] = {
+            fast_model: ModelStats(),
+            large_model: ModelStats(),
+        }
+        self._bypassed = 0
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def topic_confidence(keyword_scores: Dict[str, float]) -> float:
+        """
+        Estimate how unambiguous the dominant topic is.
+        
+        Args:
+            keyword_scores: Topic scores from TextPreprocessor.analyze_keywords
+        
+        Returns:
+            Margin of the best topic over the runner-up (0.0-1.0);
+            0.0 when no topic keywords were found
+        """
+        scores = sorted(keyword_scores.values(), reverse=True)
+        if not scores or scores[0] <= 0:
+            return 0.0
+        runner_up = scores[1] if len(scores) > 1 else 0.0
+        return (scores[0] - runner_up) / scores[0]
+    
+    def choose(self, text_length: int, confidence: float) -> RouteDecision:
+        """
+        Pick the model for a request.
+        
+        Args:
+            text_length: Length of the text that will be sent to the model
+            confidence: Preprocessor topic confidence (see topic_confidence)
+        
+        Returns:
+            RouteDecision with the model name and reason
+        """
+        if text_length > self.max_fast_chars:
+            return RouteDecision(self.large_model, "long input")
+        
+        if confidence < self.min_confidence:
+            return RouteDecision(self.large_model, "ambiguous topic")
+        
+        with self._lock:
+            fast = self._stats[self.fast_model]
+            large = self._stats[self.large_model]
+            
+            reason = None
+            if fast.requests >= self.min_samples and fast.error_rate > self.max_error_rate:
+                reason = "fast model error rate"
+            elif (fast.avg_latency is not None and large.avg_latency is not None
+                    and fast.avg_latency > large.avg_latency):
+                reason = "fast model latency"
+            
+            if reason is not None:
+                self._bypassed += 1
+                if self._bypassed % self.probe_interval:
+                    return RouteDecision(self.large_model, reason)
+                return RouteDecision(self.fast_model, "probe")
+        
+        return RouteDecision(self.fast_model, "short unambiguous input")
+    
+    def record(self, model: str, latency: float, success: bool) -> None:
+        """
+        Record the outcome of a model call.
+        
+        Args:
+            model: Model that served the request
+            latency: Call latency in seconds
+            success: Whether the output parsed and validated
+        """
+        with self._lock:
+            stats = self._stats.setdefault(model, ModelStats())
+            stats.requests += 1
+            if not success:
+                stats.failures += 1
+            
+            if stats.avg_latency is None:
+                stats.avg_latency = latency
+            else:
+                stats.avg_latency += self.smoothing * (latency - stats.avg_latency)
+            stats.error_rate += self.smoothing * ((0.0 if success else 1.0) - stats.error_rate)
+    
+    def get_stats(self) -> Dict[str, Dict[str, float]]:
+        """
+        Snapshot of per-model statistics.
+        
+        Returns:
+            Dictionary mapping model name to its statistics
+        """
+        with self._lock:
+            return {
+                model: {
+                    'requests': stats.requests,
+                    'failures': stats.failures,
+                    'avg_latency': stats.avg_latency or 0.0,
+                    'error_rate': stats.error_rate,
+                }
+                for model, stats in self._stats.items()
+            }
@@ -0,0 +1,227 @@
+"""
+Overlapped text-to-music pipeline.
+
+Runs preprocess -> Cerebras -> parse/validate -> Suno generate -> poll ->
+download -> play as one pipeline in one process instead of a chain of
+separate steps. Stages overlap where the data allows it:
+
+- the compressor streams the model response and hands over topics and tags
+  as soon as they are complete, so the Suno generation request goes out
+  while the rest of the response is still being received and validated;
+- the clip is polled until it is streamable (status "streaming"), not
+  complete, and the audio is played while it downloads.
+
+Every run records per-stage and end-to-end latencies. The Suno client is
+passed in (anything with SunoAPI's generate_song, wait_for_streaming and
+download_and_play_audio), so the pipeline runs end to end against the fake
+Cerebras backend and the local fake Suno server (see
+benchmarks/bench_pipeline.py).
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+
+from .cerebras_vibe_compressor import CerebrasCompressionResult, CerebrasVibeCompressor
+
+
+# Stages timed for every run, in pipeline order
+STAGES = ('preprocess', 'fields', 'compress', 'generate', 'streaming', 'first_audio', 'end_to_end')
+
+
+@dataclass
+class PipelineResult:
+    """Outcome of one text-to-music run."""
+    success: bool
+    data: Optional[Dict[str, Any]]
+    clip: Optional[Dict[str, Any]]
+    audio_path: Optional[str]
+    playback: Any
+    compression: Optional[CerebrasCompressionResult]
+    error_message: Optional[str] = None
+    early_start: bool = False
+    timings: Dict[str, float] = field(default_factory=dict)
+
+
+class MusicPipeline:
+    """
+    Turns page text into playing music with overlapped stages.
+    
+    Thread-safe; runs may be started from several threads at once.
+    
+    Timings (seconds, see STAGES):
+        preprocess: Text preprocessing inside the compressor
+        fields: Start of the run until topics and tags were available
+        compress: Start of the run until compression finished
+        generate: Suno generate request
+        streaming: Generation until the clip was detected streamable
+        first_audio: Streamable until playback started
+        end_to_end: Start of the run until playback started
+        overlap: Time the generation ran while compression was still
+            finishing (0 when it could not start early)
+    """
+    
+    def __init__(self,
+                 compressor: CerebrasVibeCompressor,
+                 suno: Any,
+                 make_instrumental: bool = True,
+                 progressive: bool = True,
+                 max_wait: int = 300,
+                 max_workers: int = 4,
+                 max_samples: int = 100,
+                 enable_logging: bool = True):
+        """
+        Initialize the pipeline.
+        
+        Args:
+            compressor: Vibe compressor turning text into topics and tags
+            suno: Suno client (e.g. a SunoAPI, possibly pointed at the local
+                fake server)
+            make_instrumental: Generate without vocals
+            progressive: Play while downloading (see
+                SunoAPI.download_and_play_audio)
+            max_wait: Seconds to wait for a clip to become streamable
+            max_workers: Generations run at once
+            max_samples: Runs kept for get_stats
+            enable_logging: Whether to enable logging
+        """
+        self.compressor = compressor
+        self.suno = suno
+        self.make_instrumental = make_instrumental
+        self.progressive = progressive
+        self.max_wait = max_wait
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="pipeline-generate")
+        
+        if enable_logging:
+            logging.basicConfig(
+                level=logging.INFO,
+                format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+            )
+        self.logger = logging.getLogger(__name__)
+        
+        self._samples: Dict[str, deque] = {stage: deque(maxlen=max_samples) for stage in STAGES + ('overlap',)}
+        self._runs = 0
+        self._failures = 0
+        self._early_starts = 0
+        self._lock = threading.Lock()
+    
+    def run(self, text: str) -> PipelineResult:
+        """
+        Compress text and play music for it.
+        
+        Args:
+            text: Raw webpage text
+        
+        Returns:
+            PipelineResult; on success playback is the running Playback
+            handle and timings has every stage of STAGES plus overlap
+        """
+        start = time.perf_counter()
+        marks: Dict[str, float] = {}
+        generation: Dict[str, Future] = {}
+        
+        def on_fields(data: Dict[str, Any]) -> None:
+            marks['fields'] = time.perf_counter()
+            generation['future'] = self._executor.submit(self._generate, data, marks)
+        
+        compression = self.compressor.compress(text, on_fields=on_fields)
+        marks['compress'] = time.perf_counter()
+        early_start = 'future' in generation
+        
+        if not early_start:
+            if not compression.success:
+                return self._finish(PipelineResult(
+                    success=False, data=None, clip=None, audio_path=None, playback=None,
+                    compression=compression, error_message=compression.error_message))
+            # The fields were not usable mid-stream (e.g. repaired JSON): start now
+            self.logger.info("Topics and tags were not available early, generating after compression")
+            marks['fields'] = marks['compress']
+            generation['future'] = self._executor.submit(self._generate, compression.data, marks)
+        
+        try:
+            data, clip, audio_path, playback = generation['future'].result()
+        except Exception as e:
+            self.logger.error(f"Pipeline generation failed: {e}")
+            return self._finish(PipelineResult(
+                success=False, data=compression.data, clip=None, audio_path=None, playback=None,
+                compression=compression, error_message=f"Music generation failed: {e}",
+                early_start=early_start))
+        
+        timings = {
+            'preprocess': compression.preprocess_time or 0.0,
+            'fields': marks['fields'] - start,
+            'compress': marks['compress'] - start,
+            'generate': marks['generated'] - marks['fields'],
+            'streaming': marks['streaming'] - marks['generated'],
+            'first_audio': marks['playing'] - marks['streaming'],
+            'end_to_end': marks['playing'] - start,
+            'overlap': max(0.0, marks['compress'] - marks['fields']),
+        }
+        self.logger.info(f"Music playing {timings['end_to_end']:.2f}s after the text arrived "
+                         f"({timings['overlap']:.2f}s of compression overlapped with generation)")
+        
+        return self._finish(PipelineResult(
+            success=True, data=data, clip=clip, audio_path=audio_path, playback=playback,
+            compression=compression, early_start=early_start, timings=timings))
+    
+    def _generate(self, data: Dict[str, Any], marks: Dict[str, float]) -> tuple:
+        """Generate, wait until streamable and start playback (on a worker thread)."""
+        started_at = time.time()
+        clip_info = self.suno.generate_song(data['topics'], data['tags'], self.make_instrumental)
+        marks['generated'] = time.perf_counter()
+        
+        ready_clip = self.suno.wait_for_streaming(clip_info['id'], self.max_wait, started_at=started_at)
+        marks['streaming'] = time.perf_counter()
+        
+        audio_path, playback = self.suno.download_and_play_audio(
+            ready_clip['audio_url'], progressive=self.progressive, clip_id=ready_clip['id'])
+        marks['playing'] = time.perf_counter()
+        return data, ready_clip, audio_path, playback
+    
+    def _finish(self, result: PipelineResult) -> PipelineResult:
+        """Record a run's outcome and timings."""
+        with self._lock:
+            self._runs += 1
+            if not result.success:
+                self._failures += 1
+            if result.early_start:
+                self._early_starts += 1
+            for stage, seconds in result.timings.items():
+                self._samples[stage].append(seconds)
+        return result
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Latency statistics over the most recent runs.
+        
+        Returns:
+            Dictionary with runs, failures, early_starts and, per stage,
+            count and mean/p50/p95/max in seconds
+        """
+        with self._lock:
+            samples = {stage: sorted(values) for stage, values in self._samples.items() if values}
+            stats: Dict[str, Any] = {
+                'runs': self._runs,
+                'failures': self._failures,
+                'early_starts': self._early_starts,
+            }
+        
+        stats['stages'] = {
+            stage: {
+                'count': len(values),
+                'mean': sum(values) / len(values),
+                'p50': values[len(values) // 2],
+                'p95': values[min(len(values) - 1, int(len(values) * 0.95))],
+                'max': values[-1],
+            }
+            for stage, values in samples.items()
+        }
+        return stats
+    
+    def close(self) -> None:
+        """Wait for running generations and release the worker threads."""
+        self._executor.shutdown(wait=True)
@@ -6,7 +6,8 @@ output conforms to the expected structure and constraints.
 """
 
 import json
-from typing import Dict, Any, List, Union
+import re
+from typing import Dict, Any, Callable, FrozenSet, List, Optional, Tuple, Union
 from dataclasses import dataclass
 
 
@@ -18,6 +19,44 @@ class ValidationResult:
     warnings: List[str]
 
 
+# Normalization repairs that invent content instead of reformatting it: the
+# normalized data is valid, but not what the model said about the page
+SUBSTANTIVE_REPAIRS = frozenset({
+    "replaced invalid JSON",
+    "replaced non-dictionary data",
+    "generated topics from tags",
+    "no tags besides instrumental",
+})
+
+
+@dataclass
+class NormalizationResult:
+    """Result of vibe normalization."""
+    data: Dict[str, Any]
+    canonical_key: str
+    repairs: List[str]
+    validation: ValidationResult
+    
+    @property
+    def substantive(self) -> bool:
+        """Whether any repair invented content (see SUBSTANTIVE_REPAIRS)."""
+        return not SUBSTANTIVE_REPAIRS.isdisjoint(self.repairs)
+
+
+@dataclass(frozen=True)
+class ValidationPlan:
+    """Precomputed checks for one schema variant."""
+    name: str
+    required_fields: FrozenSet[str]
+    field_checks: Tuple[Tuple[str, Callable[[Any], List[str]]], ...]
+    checked_fields: FrozenSet[str]
+    # Checks for data whose keys are exactly required_fields (all present,
+    # so no membership tests)
+    exact_checks: Tuple[Tuple[str, Callable[[Any], List[str]]], ...]
+    # Token estimate for structurally valid data, without a json_str
+    estimate_tokens: Callable[[Dict[str, Any]], int]
+
+
 class VibeSchemaValidator:
     """
     Validates vibe compression output against the expected schema.
@@ -37,9 +76,102 @@ class VibeSchemaValidator:
         'bass', 'light percussion', 'lo-fi kit'
     }
     
+    # Common spellings the model uses, mapped to the VALID_INSTRUMENTS vocabulary
+    INSTRUMENT_ALIASES = {
+        'pianos': 'piano', 'keys': 'piano', 'grand piano': 'piano',
+        'gentle piano': 'soft piano', 'guitar': 'acoustic guitar',
+        'guitars': 'acoustic guitar', 'acoustic guitars': 'acoustic guitar',
+        'electric guitars': 'electric guitar', 'string': 'strings',
+        'string section': 'strings', 'gentle strings': 'soft strings',
+        'violins': 'violin', 'cellos': 'cello', 'synths': 'synth',
+        'synthesizer': 'synth', 'synthesizers': 'synth', 'pads': 'synth pad',
+        'pad': 'synth pad', 'synth pads': 'synth pad', 'electronica': 'electronic',
+        'orchestra': 'orchestral', 'ambient pads': 'ambient pad', 'drum': 'drums',
+        'percussion': 'light percussion', 'lo-fi drums': 'lo-fi kit',
+        'lofi kit': 'lo-fi kit', 'lo fi kit': 'lo-fi kit', 'bass guitar': 'bass',
+    }
+    
+    # Tags meaning "no vocals", collapsed to the canonical first tag
+    INSTRUMENTAL_ALIASES = {'instrumental', 'instrumentals', 'no vocals', 'without vocals'}
+    
+    # Suno generate endpoint limits
+    MAX_TAGS_LENGTH = 100
+    MAX_TOPICS_LENGTH = 2500
+    
+    # Required fields per schema variant
+    SUNO_FIELDS = frozenset({'topics', 'tags'})
+    LEGACY_FIELDS = frozenset({'topic', 'mood', 'energy', 'tempo', 'palette', 'vocals'})
+    
+    FORMAT_ERROR = "Invalid format: must contain either 'topics'+'tags' (Suno format) or 'topic'+'mood'+... (legacy format)"
+    
     def __init__(self):
-        """Initialize the validator."""
-        pass
+        """Initialize the validator and compile the validation plans."""
+        self._plans = self._compile_plans()
+    
+    def _compile_plans(self) -> Dict[str, ValidationPlan]:
+        """
+        Compile one validation plan per schema variant.
+        
+        Field checks run for any legacy field that is present, whichever
+        variant was detected, so both plans share the same check table for
+        data with missing or unexpected fields. Structurally exact data is
+        specialized: Suno data has no field checks and its token estimate
+        skips serialization; legacy data runs every check unconditionally.
+        
+        Returns:
+            Dictionary mapping variant name to its plan
+        """
+        field_checks = (
+            ('topic', self.validate_topic),
+            ('mood', self.validate_mood),
+            ('energy', self.validate_energy),
+            ('tempo', self.validate_tempo),
+            ('palette', self.validate_palette),
+            ('vocals', self.validate_vocals),
+        )
+        checked_fields = frozenset(name for name, _ in field_checks)
+        
+        return {
+            'suno': ValidationPlan('suno', self.SUNO_FIELDS, field_checks, checked_fields,
+                                   (), self._estimate_suno_tokens),
+            'legacy': ValidationPlan('legacy', self.LEGACY_FIELDS, field_checks, checked_fields,
+                                     field_checks, self._estimate_tokens),
+        }
+    
+    @staticmethod
+    def _estimate_tokens(data: Dict[str, Any]) -> int:
+        """Token estimate: whitespace-separated chunks of the compact JSON."""
+        return len(json.dumps(data, separators=(',', ':')).split())
+    
+    @classmethod
+    def _estimate_suno_tokens(cls, data: Dict[str, Any]) -> int:
+        """
+        Same estimate as _estimate_tokens for Suno data, without serializing.
+        
+        With string values the compact JSON only contains whitespace where
+        the values have ASCII spaces (json.dumps escapes control characters
+        and everything non-ASCII), and the text around the values has none.
+        """
+        topics, tags = data['topics'], data['tags']
+        if not isinstance(topics, str) or not isinstance(tags, str):
+            return cls._estimate_tokens(data)
+        return sum(1 for chunk in f'"{topics}","{tags}"'.split(' ') if chunk)
+    
+    def detect_format(self, data: Dict[str, Any]) -> Optional[str]:
+        """
+        Detect which schema variant a result uses.
+        
+        Args:
+            data: Vibe compression output dictionary
+            
+        Returns:
+            'suno', 'legacy', or None if neither matches
+        """
+        if 'topics' in data and 'tags' in data:
+            return 'suno'
+        if 'topic' in data or 'mood' in data:
+            return 'legacy'
+        return None
     
     def validate_structure(self, data: Dict[str, Any]) -> List[str]:
         """
@@ -51,36 +183,26 @@ class VibeSchemaValidator:
         Returns:
             List of structural validation errors
         """
+        variant = self.detect_format(data)
+        if variant is None:
+            return [self.FORMAT_ERROR]
+        return self._check_structure(self._plans[variant], data)
+    
+    def _check_structure(self, plan: ValidationPlan, data: Dict[str, Any]) -> List[str]:
+        """Check required and unexpected fields against a compiled plan."""
+        keys = data.keys()
+        if keys == plan.required_fields:
+            return []
+        
         errors = []
+        present_fields = set(keys)
+        missing_fields = plan.required_fields - present_fields
+        if missing_fields:
+            errors.append(f"Missing required fields: {', '.join(missing_fields)}")
         
-        # Check for Suno API format (new format)
-        if 'topics' in data and 'tags' in data:
-            required_fields = {'topics', 'tags'}
-            # Check required fields
-            missing_fields = required_fields - set(data.keys())
-            if missing_fields:
-                errors.append(f"Missing required fields: {', '.join(missing_fields)}")
-            
-            # Check extra fields
-            extra_fields = set(data.keys()) - required_fields
-            if extra_fields:
-                errors.append(f"Unexpected fields: {', '.join(extra_fields)}")
-        
-        # Check for legacy format (old format)
-        elif 'topic' in data or 'mood' in data:
-            required_fields = {'topic', 'mood', 'energy', 'tempo', 'palette', 'vocals'}
-            # Check required fields
-            missing_fields = required_fields - set(data.keys())
-            if missing_fields:
-                errors.append(f"Missing required fields: {', '.join(missing_fields)}")
-            
-            # Check extra fields
-            extra_fields = set(data.keys()) - required_fields
-            if extra_fields:
-                errors.append(f"Unexpected fields: {', '.join(extra_fields)}")
-        
-        else:
-            errors.append("Invalid format: must contain either 'topics'+'tags' (Suno format) or 'topic'+'mood'+... (legacy format)")
+        extra_fields = present_fields - plan.required_fields
+        if extra_fields:
+            errors.append(f"Unexpected fields: {', '.join(extra_fields)}")
         
         return errors
     
@@ -232,40 +354,41 @@ class VibeSchemaValidator:
         
         return errors
     
-    def validate_token_count(self, data: Dict[str, Any]) -> List[str]:
+    def validate_token_count(self, data: Dict[str, Any], json_str: Optional[str] = None) -> List[str]:
         """
         Validate that the output is concise enough (≤25 tokens).
         
         Args:
             data: Vibe compression output dictionary
+            json_str: Compact JSON serialization of data, if already computed
             
         Returns:
             List of token count warnings
         """
-        warnings = []
-        
         # Convert to compact JSON and estimate tokens
-        json_str = json.dumps(data, separators=(',', ':'))
-        estimated_tokens = len(json_str.split())
+        if json_str is None:
+            json_str = json.dumps(data, separators=(',', ':'))
+        return self._token_warnings(len(json_str.split()))
         
+    @staticmethod
+    def _token_warnings(estimated_tokens: int) -> List[str]:
+        """Warnings for a token estimate."""
         if estimated_tokens > 25:
-            warnings.append(f"Output may exceed 25 token limit (estimated: {estimated_tokens})")
-        
-        return warnings
+            return [f"Output may exceed 25 token limit (estimated: {estimated_tokens})"]
+        return []
     
-    def validate(self, data: Union[Dict[str, Any], str]) -> ValidationResult:
+    def validate(self, data: Union[Dict[str, Any], str], json_str: Optional[str] = None) -> ValidationResult:
         """
         Perform complete validation of vibe compression output.
         
         Args:
             data: Vibe data as dictionary or JSON string
+            json_str: Compact JSON serialization of data, if the caller already
+                has it (e.g. CerebrasCompressionResult.json_output)
             
         Returns:
             ValidationResult with errors and warnings
         """
-        errors = []
-        warnings = []
-        
         # Parse JSON if string provided
         if isinstance(data, str):
             try:
@@ -276,37 +399,201 @@ class VibeSchemaValidator:
         if not isinstance(data, dict):
             return ValidationResult(False, ["Data must be dictionary or JSON string"], [])
         
-        # Structural validation
-        errors.extend(self.validate_structure(data))
+        variant = self.detect_format(data)
+        plan = self._plans['legacy' if variant is None else variant]
         
-        # Field-specific validation
-        if 'topic' in data:
-            errors.extend(self.validate_topic(data['topic']))
+        if variant is not None and data.keys() == plan.required_fields:
+            # Structurally exact: the plan's specialized checks
+            errors = []
+            for field, check in plan.exact_checks:
+                errors.extend(check(data[field]))
+        else:
+            # Structural validation
+            errors = [self.FORMAT_ERROR] if variant is None else self._check_structure(plan, data)
+        
+            # Field-specific validation
+            if not plan.checked_fields.isdisjoint(data):
+                for field, check in plan.field_checks:
+                    if field in data:
+                        errors.extend(check(data[field]))
+        
+        # Token count validation (only if structure is valid)
+        if errors:
+            warnings = []
+        elif json_str is not None:
+            warnings = self._token_warnings(len(json_str.split()))
+        else:
+            warnings = self._token_warnings(plan.estimate_tokens(data))
         
-        if 'mood' in data:
-            errors.extend(self.validate_mood(data['mood']))
+        return ValidationResult(
+            is_valid=not errors,
+            errors=errors,
+            warnings=warnings
+        )
+    
+    def normalize_tags(self, tags: Union[str, List[Any]]) -> Tuple[List[str], List[str]]:
+        """
+        Canonicalize a tag list.
         
-        if 'energy' in data:
-            errors.extend(self.validate_energy(data['energy']))
+        Tags are lowercased, mapped to the instrument vocabulary, deduplicated
+        and sorted, with "instrumental" first, then trimmed to fit Suno's
+        tag length limit (whole tags are dropped, never cut mid-word).
         
-        if 'tempo' in data:
-            errors.extend(self.validate_tempo(data['tempo']))
+        Args:
+            tags: Comma-separated tag string or list of tags
+            
+        Returns:
+            Tuple of (canonical tag list, list of repairs applied)
+        """
+        repairs = []
         
-        if 'palette' in data:
-            errors.extend(self.validate_palette(data['palette']))
+        if isinstance(tags, str):
+            raw_tags = re.split(r'[,;|\n]', tags)
+        elif isinstance(tags, (list, tuple)):
+            raw_tags = [str(tag) for tag in tags]
+            repairs.append("converted tags list to string")
+        else:
+            raw_tags = []
+            repairs.append(f"dropped tags of type {type(tags).__name__}")
+        
+        seen = set()
+        canonical = []
+        for raw_tag in raw_tags:
+            tag = ' '.join(raw_tag.strip(" \t'\".#").lower().split())
+            if not tag:
+                continue
+            if tag != raw_tag.strip():
+                self._note(repairs, "lowercased tags")
+            
+            if tag in self.INSTRUMENTAL_ALIASES:
+                tag = 'instrumental'
+            elif tag in self.INSTRUMENT_ALIASES:
+                tag = self.INSTRUMENT_ALIASES[tag]
+                self._note(repairs, "mapped instrument names")
+            elif tag.endswith('s') and tag[:-1] in self.VALID_INSTRUMENTS:
+                tag = tag[:-1]
+                self._note(repairs, "mapped instrument names")
+            
+            if tag in seen:
+                self._note(repairs, "removed duplicate tags")
+                continue
+            seen.add(tag)
+            canonical.append(tag)
+        
+        if 'instrumental' not in seen:
+            repairs.append("added instrumental tag")
+        rest = sorted(tag for tag in canonical if tag != 'instrumental')
+        canonical = ['instrumental'] + rest
+        
+        # Drop trailing tags until the joined string fits Suno's limit
+        while len(canonical) > 1 and len(', '.join(canonical)) > self.MAX_TAGS_LENGTH:
+            canonical.pop()
+            self._note(repairs, f"trimmed tags to {self.MAX_TAGS_LENGTH} characters")
+        
+        return canonical, repairs
+    
+    def canonical_key(self, data: Dict[str, Any], include_topics: bool = False) -> str:
+        """
+        Build a stable key for a vibe so identical vibes compare equal.
         
-        if 'vocals' in data:
-            errors.extend(self.validate_vocals(data['vocals']))
+        Args:
+            data: Suno format vibe data (topics and tags)
+            include_topics: Whether the topic description is part of the key
+            
+        Returns:
+            Canonical key string, e.g. "instrumental,ambient,piano"
+        """
+        tags, _ = self.normalize_tags(data.get('tags', ''))
+        key = ','.join(tags)
         
-        # Token count validation
-        if not errors:  # Only check if structure is valid
-            warnings.extend(self.validate_token_count(data))
+        if include_topics:
+            topics = re.sub(r'[^a-z0-9 ]+', ' ', str(data.get('topics', '')).lower())
+            key = ' '.join(topics.split()) + '|' + key
         
-        return ValidationResult(
-            is_valid=len(errors) == 0,
-            errors=errors,
-            warnings=warnings
+        return key
+    
+    def normalize(self, data: Union[Dict[str, Any], str]) -> NormalizationResult:
+        """
+        Repair and canonicalize vibe compression output.
+        
+        Produces Suno format data ({"topics", "tags"}) with canonical tags,
+        so a malformed result can be used directly instead of re-requested.
+        
+        Args:
+            data: Vibe data as dictionary or JSON string
+            
+        Returns:
+            NormalizationResult with the normalized data, canonical key,
+            repairs applied, and validation of the normalized data (which
+            passes even when repairs were substantive, see
+            NormalizationResult.substantive)
+        """
+        repairs = []
+        
+        if isinstance(data, str):
+            try:
+                data = json.loads(data)
+            except json.JSONDecodeError:
+                data = {}
+                repairs.append("replaced invalid JSON")
+        if not isinstance(data, dict):
+            data = {}
+            repairs.append("replaced non-dictionary data")
+        
+        topics = data.get('topics')
+        if topics is None and 'topic' in data:
+            topics = data['topic']
+            repairs.append("renamed topic to topics")
+        
+        tags = data.get('tags')
+        if tags is None:
+            tags = ''
+            if 'mood' in data or 'palette' in data:
+                # Legacy results carry their vibe in mood and palette
+                legacy_tags = [*self._as_list(data.get('mood')), *self._as_list(data.get('palette'))]
+                tags = ', '.join(str(tag) for tag in legacy_tags)
+                repairs.append("built tags from legacy fields")
+        
+        canonical_tags, tag_repairs = self.normalize_tags(tags)
+        repairs.extend(tag_repairs)
+        if len(canonical_tags) == 1:
+            repairs.append("no tags besides instrumental")
+        
+        if not isinstance(topics, str) or not topics.strip():
+            descriptors = ' '.join(canonical_tags[1:3])
+            topics = f"An instrumental {descriptors} track".replace('  ', ' ')
+            repairs.append("generated topics from tags")
+        else:
+            cleaned = ' '.join(topics.split())[:self.MAX_TOPICS_LENGTH]
+            if cleaned != topics:
+                repairs.append("cleaned topics whitespace")
+            topics = cleaned
+        
+        extra_fields = set(data.keys()) - self.SUNO_FIELDS - {'topic'}
+        if extra_fields and 'tags' in data:
+            repairs.append(f"dropped fields: {', '.join(sorted(extra_fields))}")
+        
+        normalized = {'topics': topics, 'tags': ', '.join(canonical_tags)}
+        
+        return NormalizationResult(
+            data=normalized,
+            canonical_key=','.join(canonical_tags),
+            repairs=repairs,
+            validation=self.validate(normalized)
         )
+    
+    @staticmethod
+    def _as_list(value: Any) -> List[Any]:
+        """Return value as a list (lists pass through, scalars are wrapped)."""
+        if isinstance(value, list):
+            return value
+        return [] if value is None else [value]
+    
+    @staticmethod
+    def _note(repairs: List[str], repair: str) -> None:
+        """Record a repair once."""
+        if repair not in repairs:
+            repairs.append(repair)
 
 
 # Example usage and testing
@@ -343,4 +630,17 @@ if __name__ == "__main__":
     print("\nInvalid data validation:")
     print(f"Is valid: {result.is_valid}")
     print(f"Errors: {result.errors}")
-    print(f"Warnings: {result.warnings}")
\ No newline at end of file
+    print(f"Warnings: {result.warnings}")
+    
+    # Test normalization of messy Suno output
+    messy_data = {
+        "topics": "  A calm   instrumental track for reading ",
+        "tags": "Ambient, Piano, pianos, instrumental, Strings, ambient"
+    }
+    
+    result = validator.normalize(messy_data)
+    print("\nNormalization:")
+    print(f"Data: {result.data}")
+    print(f"Canonical key: {result.canonical_key}")
+    print(f"Repairs: {result.repairs}")
+    print(f"Is valid: {result.validation.is_valid}")
\ No newline at end of file
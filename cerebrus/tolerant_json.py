@@ -0,0 +1,381 @@
+"""
+Tolerant JSON object extraction for model responses.
+
+This module pulls the first JSON object out of raw LLM output and repairs
+the malformations that show up in practice (truncation at the completion
+token limit, trailing prose, single quotes, trailing commas, Python
+literals) so a response can be used without paying for a retry.
+"""
+
+import json
+from typing import Dict, Any, List, Optional
+from dataclasses import dataclass, field
+
+
+_decoder = json.JSONDecoder()
+
+# Bare literals the model sometimes emits, mapped to their JSON spelling
+_LITERALS = {
+    'true': 'true', 'false': 'false', 'null': 'null',
+    'True': 'true', 'False': 'false', 'None': 'null',
+}
+
+_QUOTES = {'"': '"', "'": "'", '“': '”', '‘': '’'}
+
+_DELIMITERS = set(',:{}[]"\'') | {'“', '‘'}
+
+# Characters JSON allows after a backslash (\u also needs four hex digits)
+_ESCAPES = set('"\\/bfnrtu')
+_HEX = set('0123456789abcdefABCDEF')
+
+
+@dataclass
+class TolerantParseResult:
+    """Result of tolerant JSON extraction."""
+    data: Optional[Dict[str, Any]]
+    repaired: bool
+    repairs: List[str] = field(default_factory=list)
+
+
+class _Frame:
+    """Parser state for one open object or array."""
+    
+    __slots__ = ('kind', 'state', 'key_start')
+    
+    def __init__(self, kind: str):
+        self.kind = kind
+        # Objects move through key -> colon -> value -> comma,
+        # arrays through value -> comma
+        self.state = 'key' if kind == '{' else 'value'
+        self.key_start = 0
+
+
+def _value_done(stack: List[_Frame]) -> None:
+    """Advance the enclosing container after a complete value."""
+    if stack:
+        stack[-1].state = 'comma'
+
+
+def _repair_object(text: str, start: int) -> TolerantParseResult:
+    """
+    Re-emit the object starting at ``start`` as strict JSON, repairing as we go.
+    
+    Args:
+        text: Raw model response
+        start: Index of the opening brace
+    
+    Returns:
+        TolerantParseResult with the parsed object, or None data on failure
+    """
+    out: List[str] = []
+    stack: List[_Frame] = []
+    repairs: List[str] = []
+    
+    def note(repair: str) -> None:
+        if repair not in repairs:
+            repairs.append(repair)
+    
+    i = start
+    n = len(text)
+    in_string = False
+    close_quote = ''
+    string_is_key = False
+    
+    while i < n:
+        ch = text[i]
+        
+        if in_string:
+            if ch == '\\':
+                if i + 1 >= n or (text[i + 1] == 'u' and i + 6 > n):
+                    # Cut off mid-escape: drop it so the string can be closed
+                    note('dropped truncated escape')
+                    i = n
+                    continue
+                escaped = text[i + 1]
+                if escaped == "'":
+                    # Python-style escape of a single quote
+                    out.append("'")
+                    note('unescaped single quote')
+                    i += 2
+                    continue
+                if escaped not in _ESCAPES or (escaped == 'u' and not set(text[i + 2:i + 6]) <= _HEX):
+                    # Not a JSON escape: keep the backslash as a literal one
+                    out.append('\\\\')
+                    note('escaped stray backslash')
+                    i += 1
+                    continue
+                out.append(text[i:i + 2])
+                i += 2
+                continue
+            if ch == close_quote:
+                out.append('"')
+                in_string = False
+                if string_is_key:
+                    stack[-1].state = 'colon'
+                else:
+                    _value_done(stack)
+            elif ch == '"':
+                out.append('\\"')
+            elif ch == '\n':
+                out.append('\\n')
+                note('escaped newline in string')
+            elif ch == '\t':
+                out.append('\\t')
+            else:
+                out.append(ch)
+            i += 1
+            continue
+        
+        if ch.isspace():
+            i += 1
+            continue
+        
+        frame = stack[-1] if stack else None
+        
+        if ch in '{[':
+            if frame is not None and frame.state != 'value':
+                note('unexpected container')
+                if frame.state == 'comma':
+                    out.append(',')
+                    note('inserted missing comma')
+                    frame.state = 'value' if frame.kind == '[' else 'key'
+                if frame.state != 'value':
+                    break
+            stack.append(_Frame(ch))
+            out.append(ch)
+            i += 1
+            continue
+        
+        if ch in '}]':
+            if frame is None:
+                break
+            closer = '}' if frame.kind == '{' else ']'
+            if ch != closer:
+                note('mismatched bracket')
+            if out and out[-1] == ',':
+                out.pop()
+                note('removed trailing comma')
+            if frame.kind == '{' and frame.state in ('colon', 'value'):
+                del out[frame.key_start:]
+                if out and out[-1] == ',':
+                    out.pop()
+                note('dropped key without value')
+            stack.pop()
+            out.append(closer)
+            _value_done(stack)
+            i += 1
+            if not stack:
+                break
+            continue
+        
+        if frame is None:
+            break
+        
+        if ch == ',':
+            if frame.state == 'comma':
+                out.append(',')
+                frame.state = 'key' if frame.kind == '{' else 'value'
+            else:
+                note('removed stray comma')
+            i += 1
+            continue
+        
+        if ch == ':':
+            if frame.kind == '{' and frame.state == 'colon':
+                out.append(':')
+                frame.state = 'value'
+            else:
+                note('removed stray colon')
+            i += 1
+            continue
+        
+        if frame.state == 'comma':
+            # Two values in a row: the model forgot a comma
+            out.append(',')
+            frame.state = 'key' if frame.kind == '{' else 'value'
+            note('inserted missing comma')
+        
+        if frame.kind == '{' and frame.state == 'key':
+            frame.key_start = len(out)
+        
+        if ch in _QUOTES:
+            if ch != '"':
+                note('normalized quotes')
+            in_string = True
+            close_quote = _QUOTES[ch]
+            string_is_key = frame.kind == '{' and frame.state == 'key'
+            out.append('"')
+            i += 1
+            continue
+        
+        if frame.kind == '{' and frame.state == 'colon':
+            # Junk between a key and its colon
+            note('removed stray text')
+            i += 1
+            continue
+        
+        # Bare token: number, literal, or unquoted key/word
+        j = i
+        while j < n and text[j] not in _DELIMITERS and text[j] != '\n':
+            j += 1
+        token = text[i:j].strip()
+        i = j
+        
+        if j >= n and token not in _LITERALS:
+            # Cut off mid-token (e.g. "0.4" of "0.45"): drop rather than guess
+            if frame.kind == '{':
+                del out[frame.key_start:]
+                frame.state = 'comma'
+            break
+        
+        if frame.kind == '{' and frame.state == 'key':
+            out.append(json.dumps(token))
+            frame.state = 'colon'
+            note('quoted bare key')
+            continue
+        
+        if token in _LITERALS:
+            out.append(_LITERALS[token])
+            if token != _LITERALS[token]:
+                note('converted literal')
+        else:
+            try:
+                float(token)
+                out.append(token)
+            except ValueError:
+                out.append(json.dumps(token))
+                note('quoted bare value')
+        _value_done(stack)
+    
+    # Truncated output: close whatever is still open
+    if stack:
+        note('closed truncated output')
+        frame = stack[-1]
+        if in_string:
+            if string_is_key:
+                del out[frame.key_start:]
+            else:
+                out.append('"')
+                frame.state = 'comma'
+        elif frame.kind == '{' and frame.state in ('colon', 'value'):
+            del out[frame.key_start:]
+        if out and out[-1] == ',':
+            out.pop()
+        for open_frame in reversed(stack):
+            out.append('}' if open_frame.kind == '{' else ']')
+    
+    try:
+        data = json.loads(''.join(out))
+    except json.JSONDecodeError:
+        return TolerantParseResult(data=None, repaired=bool(repairs), repairs=repairs)
+    
+    if not isinstance(data, dict):
+        return TolerantParseResult(data=None, repaired=bool(repairs), repairs=repairs)
+    
+    return TolerantParseResult(data=data, repaired=bool(repairs), repairs=repairs)
+
+
+def parse_json_object(text: str) -> TolerantParseResult:
+    """
+    Extract the first JSON object from a model response.
+    
+    Well-formed objects (optionally wrapped in code fences or followed by
+    prose) are decoded directly; anything else goes through the repairing
+    scanner.
+    
+    Args:
+        text: Raw model response
+    
+    Returns:
+        TolerantParseResult with the object and whether a repair happened
+    """
+    if not text:
+        return TolerantParseResult(data=None, repaired=False)
+    
+    start = text.find('{')
+    if start == -1:
+        return TolerantParseResult(data=None, repaired=False)
+    
+    # Fast path: a balanced, valid object; anything after it is ignored
+    try:
+        data, _ = _decoder.raw_decode(text, start)
+        if isinstance(data, dict):
+            return TolerantParseResult(data=data, repaired=False)
+    except json.JSONDecodeError:
+        pass
+    
+    return _repair_object(text, start)
+
+
+def parse_complete_members(prefix: str) -> Dict[str, Any]:
+    """
+    Members of a JSON object that are complete in a streamed prefix.
+    
+    Used while a response is still streaming: a member counts once its
+    value can no longer change (a closed string or container, or a bare
+    value followed by a delimiter). Scanning stops at the first member that
+    is incomplete or not strict JSON, so malformed output simply yields
+    fewer members and is left to parse_json_object once the stream ends.
+    
+    Args:
+        prefix: Response text received so far
+    
+    Returns:
+        Dictionary of the complete leading members (empty if none)
+    """
+    members: Dict[str, Any] = {}
+    i = prefix.find('{') + 1 if prefix else 0
+    if not i:
+        return members
+    n = len(prefix)
+    
+    def skip_space(j: int) -> int:
+        while j < n and prefix[j].isspace():
+            j += 1
+        return j
+    
+    while True:
+        i = skip_space(i)
+        if i >= n or prefix[i] != '"':
+            return members
+        try:
+            key, i = _decoder.raw_decode(prefix, i)
+        except json.JSONDecodeError:
+            return members
+        i = skip_space(i)
+        if i >= n or prefix[i] != ':':
+            return members
+        i = skip_space(i + 1)
+        if i >= n:
+            return members
+        bare = prefix[i] not in '"{['
+        try:
+            value, i = _decoder.raw_decode(prefix, i)
+        except json.JSONDecodeError:
+            return members
+        i = skip_space(i)
+        if bare and (i >= n or prefix[i] not in ',}'):
+            # "0.4" may still become "0.45"
+            return members
+        members[key] = value
+        if i >= n or prefix[i] != ',':
+            return members
+        i += 1
+
+
+# Example usage and testing
+if __name__ == "__main__":
+    samples = [
+        '{"topics": "A calm instrumental track", "tags": "instrumental, ambient"}',
+        'Sure! {"topics": "A calm track", "tags": "instrumental, piano"} Enjoy.',
+        '{"topics": "A calm instrumental track for reading", "tags": "instrumental, amb',
+        "{'topics': 'A gentle piece', 'tags': 'instrumental, soft',}",
+        '{"topics": "A calm track", "tags": "instrumental", "ene',
+    ]
+    
+    for sample in samples:
+        result = parse_json_object(sample)
+        print(f"Input: {sample}")
+        print(f"Data: {result.data}")
+        print(f"Repaired: {result.repaired} {result.repairs}")
+        print()
@@ -0,0 +1,422 @@
+"""
+Vibe drift detection for live screen text.
+
+Every OCR text change that gets past the UI's freeze window costs a full
+compress (Cerebras) and generate (Suno) cycle, even when the reader is still
+on the same kind of page. This module decides when the vibe has actually
+changed enough to regenerate.
+
+Each text is turned into a vibe vector with the TextPreprocessor: its topic
+scores, its mood scores and the canonical tags of its moods. The session
+keeps an exponentially smoothed vector, so a single odd OCR sample barely
+moves it, and regeneration is triggered only when the smoothed vibe has
+been further than enter_threshold from the playing vibe for min_duration
+seconds. Hysteresis: once drifting, the vibe has to come back within
+exit_threshold (lower than enter_threshold) to cancel the pending change.
+
+A pending drift must also fire when the screen stops changing (the reader
+settles on the new page), so callers schedule tick() at next_deadline():
+it re-observes the text still on screen without needing a new one.
+
+With a ChromeFilter, learned screen chrome (tabs, menus, taskbar) is
+stripped from every text before it is vectorized, and the decision carries
+the filtered text to compress.
+"""
+
+import math
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .chrome_filter import ChromeFilter
+from .schema_validator import VibeSchemaValidator
+from .text_preprocessor import TextPreprocessor
+
+
+# Weight of each component in the vibe distance
+DEFAULT_WEIGHTS = {'topics': 0.5, 'moods': 0.25, 'tags': 0.25}
+
+# Shortest text the UI generates music for
+MIN_TEXT_LENGTH = 50
+
+
+@dataclass
+class VibeVector:
+    """Sparse vibe vector: unit-length topic, mood and tag components."""
+    topics: Dict[str, float] = field(default_factory=dict)
+    moods: Dict[str, float] = field(default_factory=dict)
+    tags: Dict[str, float] = field(default_factory=dict)
+    
+    def components(self) -> Dict[str, Dict[str, float]]:
+        return {'topics': self.topics, 'moods': self.moods, 'tags': self.tags}
+
+
+@dataclass
+class DriftDecision:
+    """Whether an observed text should trigger regeneration, and why."""
+    regenerate: bool
+    distance: float
+    reason: str
+    text: Optional[str] = None  # the observed text, without chrome when filtered
+
+
+def _unit(scores: Dict[str, float]) -> Dict[str, float]:
+    """Scores scaled to unit length, without zero entries."""
+    norm = math.sqrt(sum(value * value for value in scores.values()))
+    if norm == 0:
+        return {}
+    return {key: value / norm for key, value in scores.items() if value}
+
+
+def _cosine_distance(a: Dict[str, float], b: Dict[str, float]) -> float:
+    """1 - cosine similarity; 0 when both are empty, 1 when only one is."""
+    if not a and not b:
+        return 0.0
+    norm = math.sqrt(sum(v * v for v in a.values())) * math.sqrt(sum(v * v for v in b.values()))
+    if norm == 0:
+        return 1.0
+    dot = sum(value * b.get(key, 0.0) for key, value in a.items())
+    return max(0.0, 1.0 - dot / norm)
+
+
+def vibe_distance(a: VibeVector, b: VibeVector, weights: Optional[Dict[str, float]] = None) -> float:
+    """
+    Distance between two vibes.
+    
+    Args:
+        a: First vibe
+        b: Second vibe
+        weights: Weight per component (topics, moods, tags); DEFAULT_WEIGHTS if None
+    
+    Returns:
+        Weighted cosine distance, 0.0 (same vibe) to 1.0
+    """
+    weights = weights or DEFAULT_WEIGHTS
+    total = sum(weights.values())
+    a_parts, b_parts = a.components(), b.components()
+    return sum(weight * _cosine_distance(a_parts[name], b_parts[name])
+               for name, weight in weights.items()) / total
+
+
+class VibeDriftDetector:
+    """
+    Decides, text by text, whether a session's vibe has changed enough to
+    regenerate music.
+    
+    Thread-safe; use one detector per listening session.
+    """
+    
+    def __init__(self,
+                 preprocessor: Optional[TextPreprocessor] = None,
+                 validator: Optional[VibeSchemaValidator] = None,
+                 enter_threshold: float = 0.3,
+                 exit_threshold: float = 0.15,
+                 min_duration: float = 6.0,
+                 min_interval: float = 25.0,
+                 half_life: float = 6.0,
+                 min_text_length: int = MIN_TEXT_LENGTH,
+                 weights: Optional[Dict[str, float]] = None,
+                 chrome_filter: Optional[ChromeFilter] = None):
+        """
+        Initialize the detector.
+        
+        Args:
+            preprocessor: Text preprocessor (a new one is created if None)
+            validator: Validator canonicalizing mood tags (a new one is
+                created if None)
+            enter_threshold: Distance from the playing vibe that starts a drift
+            exit_threshold: Distance under which a pending drift is cancelled
+            min_duration: Seconds a drift must last before regenerating
+            min_interval: Minimum seconds between regenerations (the UI's
+                freeze window)
+            half_life: Seconds for an observation's weight in the smoothed
+                vibe to halve
+            min_text_length: Texts shorter than this are ignored
+            weights: Distance weight per component (see vibe_distance)
+            chrome_filter: Filter stripping learned screen chrome from every
+                text first (None to use texts as they are)
+        """
+        if exit_threshold > enter_threshold:
+            raise ValueError("exit_threshold must not exceed enter_threshold")
+        self.preprocessor = preprocessor or TextPreprocessor()
+        self.validator = validator or VibeSchemaValidator()
+        self.enter_threshold = enter_threshold
+        self.exit_threshold = exit_threshold
+        self.min_duration = min_duration
+        self.min_interval = min_interval
+        self.half_life = half_life
+        self.min_text_length = min_text_length
+        self.weights = weights or DEFAULT_WEIGHTS
+        self.chrome_filter = chrome_filter
+        
+        self.smoothed: Optional[VibeVector] = None
+        self.playing: Optional[VibeVector] = None
+        self._last_vector: Optional[VibeVector] = None
+        self._last_text: Optional[str] = None
+        self._last_observed: Optional[float] = None
+        self._last_regenerated: Optional[float] = None
+        self._drift_since: Optional[float] = None
+        self._stats = {'observations': 0, 'ignored': 0, 'regenerations': 0, 'suppressed': 0}
+        self._lock = threading.Lock()
+    
+    def vectorize(self, text: str) -> VibeVector:
+        """
+        Vibe vector of a text.
+        
+        Args:
+            text: Raw screen or webpage text
+        
+        Returns:
+            VibeVector with the preprocessor's topic and mood scores and
+            the canonical tags of the text's moods
+        """
+        processed = self.preprocessor.process_text(text)
+        content = processed['main_content']
+        if len(content.strip()) < 5:
+            # Same fallback as the compressor for text without sentences
+            content = processed['cleaned_text'][:800]
+            topic = self.preprocessor.extract_topic_enhanced(content)
+            moods = self.preprocessor.determine_mood_enhanced(content, topic)
+            keyword_scores = self.preprocessor.analyze_keywords(content)
+            sentiment_scores = self.preprocessor.analyze_sentiment(content)
+        else:
+            moods = processed['mood']
+            keyword_scores = processed['keyword_scores']
+            sentiment_scores = processed['sentiment_scores']
+        
+        tags, _ = self.validator.normalize_tags(moods)
+        return VibeVector(
+            topics=_unit(keyword_scores),
+            moods=_unit(sentiment_scores),
+            tags=_unit({tag: 1.0 for tag in tags if tag != 'instrumental'}),
+        )
+    
+    def _smooth(self, vector: VibeVector, now: float) -> None:
+        """Fold an observation into the session's smoothed vibe."""
+        if self.smoothed is None:
+            self.smoothed = vector
+            return
+        elapsed = max(0.0, now - self._last_observed)
+        weight = 1.0 - 0.5 ** (elapsed / self.half_life) if self.half_life > 0 else 1.0
+        parts = vector.components()
+        smoothed = {}
+        for name, old in self.smoothed.components().items():
+            new = parts[name]
+            smoothed[name] = {key: (1.0 - weight) * old.get(key, 0.0) + weight * new.get(key, 0.0)
+                              for key in old.keys() | new.keys()}
+        self.smoothed = VibeVector(**smoothed)
+    
+    def observe(self, text: str, now: Optional[float] = None) -> DriftDecision:
+        """
+        Observe a new screen text and decide whether to regenerate.
+        
+        A True decision assumes the caller regenerates (from decision.text):
+        the current smoothed vibe becomes the playing vibe. When the text
+        stops changing, the caller keeps deciding with tick().
+        
+        Args:
+            text: Screen text that changed
+            now: Observation time in seconds (defaults to time.time())
+        
+        Returns:
+            DriftDecision
+        """
+        now = time.time() if now is None else now
+        if text and self.chrome_filter is not None:
+            text = self.chrome_filter.filter(text)
+        if not text or len(text.strip()) < self.min_text_length:
+            with self._lock:
+                self._stats['ignored'] += 1
+            return DriftDecision(False, 0.0, "text too short", text)
+        
+        vector = self.vectorize(text)
+        
+        with self._lock:
+            self._stats['observations'] += 1
+            self._last_vector, self._last_text = vector, text
+            return self._decide(now)
+    
+    def tick(self, now: Optional[float] = None) -> DriftDecision:
+        """
+        Re-evaluate with the last observed text still on screen.
+        
+        Call it when the screen text has not changed (an unchanged OCR
+        sample) or at next_deadline(), so a pending drift regenerates
+        without waiting for another text change.
+        
+        Args:
+            now: Time in seconds (defaults to time.time())
+        
+        Returns:
+            DriftDecision (its text is the last observed text)
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            if self._last_vector is None:
+                return DriftDecision(False, 0.0, "nothing observed", None)
+            return self._decide(now)
+    
+    def next_deadline(self) -> Optional[float]:
+        """
+        When a pending drift can next regenerate.
+        
+        Returns:
+            Time in seconds to call tick() at, or None if no drift is pending
+        """
+        with self._lock:
+            if self._drift_since is None:
+                return None
+            deadline = self._drift_since + self.min_duration
+            if self._last_regenerated is not None:
+                deadline = max(deadline, self._last_regenerated + self.min_interval)
+            return deadline
+    
+    def _decide(self, now: float) -> DriftDecision:
+        """Fold the last observed vibe in at now and decide (lock held)."""
+        text = self._last_text
+        self._smooth(self._last_vector, now)
+        self._last_observed = now
+        
+        if self.playing is None:
+            return self._regenerate(now, 0.0, "first vibe", text)
+        
+        distance = vibe_distance(self.smoothed, self.playing, self.weights)
+        if distance < self.exit_threshold:
+            self._drift_since = None
+        elif distance >= self.enter_threshold and self._drift_since is None:
+            self._drift_since = now
+        
+        if self._drift_since is None:
+            reason = "same vibe"
+        elif now - self._drift_since < self.min_duration:
+            reason = "drift pending"
+        elif now - self._last_regenerated < self.min_interval:
+            reason = "within min_interval"
+        else:
+            return self._regenerate(now, distance, "vibe changed", text)
+        
+        self._stats['suppressed'] += 1
+        return DriftDecision(False, distance, reason, text)
+    
+    def _regenerate(self, now: float, distance: float, reason: str, text: str) -> DriftDecision:
+        self.playing = self.smoothed
+        self._last_regenerated = now
+        self._drift_since = None
+        self._stats['regenerations'] += 1
+        return DriftDecision(True, distance, reason, text)
+    
+    def reset(self) -> None:
+        """Forget the session (e.g. when live mode is turned off)."""
+        with self._lock:
+            self.smoothed = None
+            self.playing = None
+            self._last_vector = None
+            self._last_text = None
+            self._last_observed = None
+            self._last_regenerated = None
+            self._drift_since = None
+        if self.chrome_filter is not None:
+            self.chrome_filter.reset()
+    
+    def get_stats(self) -> Dict[str, int]:
+        """
+        Detector statistics.
+        
+        Returns:
+            Dictionary with observations, ignored (too short), regenerations
+            and suppressed
+        """
+        with self._lock:
+            return dict(self._stats)
+
+
+def freeze_window_commits(events: Iterable[Tuple[float, str]], freeze_window: float = 25.0) -> List[Tuple[float, str]]:
+    """
+    Texts the UI commits today: a changed text is committed at once outside
+    the freeze window, otherwise the latest one is committed when the
+    window ends.
+    
+    Args:
+        events: (seconds, text) OCR samples in time order
+        freeze_window: The UI's freeze window in seconds
+    
+    Returns:
+        Committed (seconds, text) pairs
+    """
+    commits: List[Tuple[float, str]] = []
+    last_text = None
+    pending: Optional[str] = None
+    for ts, text in events:
+        text = text.strip()
+        # A pending text is committed by its timer when the window ends
+        if pending is not None and commits and ts >= commits[-1][0] + freeze_window:
+            commits.append((commits[-1][0] + freeze_window, pending))
+            last_text, pending = pending, None
+        if not text or text == last_text:
+            continue
+        if commits and ts - commits[-1][0] < freeze_window:
+            pending = text
+            continue
+        commits.append((ts, text))
+        last_text, pending = text, None
+    if pending is not None:
+        commits.append((commits[-1][0] + freeze_window, pending))
+    return commits
+
+
+def replay_session(events: Iterable[Tuple[float, str]], detector: Optional[VibeDriftDetector] = None,
+                   freeze_window: float = 25.0) -> Dict[str, Any]:
+    """
+    Replay a recorded session and count the calls the detector avoids.
+    
+    Today every committed text (see freeze_window_commits) of at least
+    MIN_TEXT_LENGTH characters costs one Cerebras call and one Suno
+    generation; with the detector only its regenerations do. The detector
+    takes the freeze window's place: it observes every text change, ticks
+    on unchanged samples and at its next_deadline() (as the UI's timer
+    would), and its min_interval keeps regenerations at least a window
+    apart.
+    
+    Args:
+        events: (seconds, text) OCR samples in time order
+        detector: Detector to replay through (a default one if None)
+        freeze_window: The UI's freeze window in seconds
+    
+    Returns:
+        Dictionary with samples, commits, baseline_calls,
+        detector_calls, avoided_calls (per service: Cerebras and Suno
+        each), avoided_rate and regenerated_at (seconds)
+    """
+    events = list(events)
+    detector = detector or VibeDriftDetector(min_interval=freeze_window)
+    commits = freeze_window_commits(events, freeze_window)
+    baseline = [ts for ts, text in commits if len(text) >= MIN_TEXT_LENGTH]
+    
+    regenerated_at = []
+    last_text = None
+    for ts, text in events:
+        # A pending drift fires at its deadline, before the next sample
+        deadline = detector.next_deadline()
+        if deadline is not None and deadline < ts and detector.tick(deadline).regenerate:
+            regenerated_at.append(deadline)
+        if text.strip() == last_text:
+            decision = detector.tick(ts)
+        else:
+            last_text = text.strip()
+            decision = detector.observe(text, now=ts)
+        if decision.regenerate:
+            regenerated_at.append(ts)
+    deadline = detector.next_deadline()
+    if deadline is not None and detector.tick(deadline).regenerate:
+        regenerated_at.append(deadline)
+    
+    return {
+        'samples': len(events),
+        'commits': len(commits),
+        'baseline_calls': len(baseline),
+        'detector_calls': len(regenerated_at),
+        'avoided_calls': len(baseline) - len(regenerated_at),
+        'avoided_rate': (len(baseline) - len(regenerated_at)) / len(baseline) if baseline else 0.0,
+        'regenerated_at': regenerated_at,
+    }
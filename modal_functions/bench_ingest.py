@@ -0,0 +1,124 @@
+"""
+Compare single-record and batch ingestion of play records.
+
+Runs the storage path of record_play (one request per play) and of
+record_plays_batch (one request per batch, one read and write per user)
+against a local stand-in for modal.Dict that adds a fixed round-trip delay
+to every operation, plus a fixed delay per HTTP request.
+
+Usage:
+    python modal_functions/bench_ingest.py
+    python modal_functions/bench_ingest.py --plays 2000 --users 20 --batch-size 200 --store-rtt 0.002
+"""
+
+import argparse
+import random
+import time
+
+from play_ring import PlayRing, record_play, record_plays
+from play_store import MemoryStore
+
+
+class LocalDict(MemoryStore):
+    """In-process modal.Dict stand-in with a simulated round trip per operation."""
+    
+    def __init__(self, rtt: float = 0.004):
+        super().__init__()
+        self.rtt = rtt
+        self.ops = 0
+    
+    def _call(self):
+        self.ops += 1
+        time.sleep(self.rtt)
+    
+    def get(self, key, default=None):
+        self._call()
+        return super().get(key, default)
+    
+    def put(self, key, value, skip_if_exists=False):
+        self._call()
+        return super().put(key, value, skip_if_exists)
+    
+    def pop(self, key, default=None):
+        self._call()
+        return super().pop(key, default)
+    
+    def pop_if(self, key, expected):
+        self._call()
+        return super().pop_if(key, expected)
+
+
+def make_plays(count: int, users: int, duplicate_rate: float, seed: int = 0):
+    """(user_id, play) pairs, with some clip_ids repeated as clients resend them."""
+    rng = random.Random(seed)
+    plays = []
+    for i in range(count):
+        if plays and rng.random() < duplicate_rate:
+            plays.append(rng.choice(plays))
+            continue
+        plays.append((f"user-{rng.randrange(users)}", {
+            "clip_id": f"clip-{i}",
+            "url": f"https://cdn1.suno.ai/clip-{i}.mp3",
+            "topics": "Calm focus music",
+            "tags": "instrumental, lo-fi, focus",
+            "started_at": f"2025-01-01T00:00:{i % 60:02d}+00:00",
+            "source": "generate",
+        }))
+    return plays
+
+
+def run_single(plays, store: LocalDict, request_rtt: float):
+    for user_id, play in plays:
+        time.sleep(request_rtt)
+        record_play(store, user_id, play)
+
+
+def run_batch(plays, store: LocalDict, request_rtt: float, batch_size: int):
+    for start in range(0, len(plays), batch_size):
+        time.sleep(request_rtt)
+        by_user = {}
+        for user_id, play in plays[start:start + batch_size]:
+            by_user.setdefault(user_id, []).append(play)
+        for user_id, user_plays in by_user.items():
+            record_plays(store, user_id, user_plays)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare single-record and batch play ingestion")
+    parser.add_argument("--plays", type=int, default=1000)
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--duplicate-rate", type=float, default=0.1)
+    parser.add_argument("--store-rtt", type=float, default=0.004, help="Seconds per Dict operation")
+    parser.add_argument("--request-rtt", type=float, default=0.02, help="Seconds per HTTP request")
+    args = parser.parse_args()
+    
+    plays = make_plays(args.plays, args.users, args.duplicate_rate)
+    results = {}
+    for name in ("single", "batch"):
+        store = LocalDict(args.store_rtt)
+        start = time.perf_counter()
+        if name == "single":
+            run_single(plays, store, args.request_rtt)
+        else:
+            run_batch(plays, store, args.request_rtt, args.batch_size)
+        elapsed = time.perf_counter() - start
+        requests = len(plays) if name == "single" else -(-len(plays) // args.batch_size)
+        results[name] = (elapsed, requests, store)
+    
+    # Both paths must leave identical recent-play lists behind
+    for key in results["single"][2].data:
+        if key.startswith("user:"):
+            single = PlayRing.from_value(results["single"][2].data[key]).recent(50)
+            batch = PlayRing.from_value(results["batch"][2].data[key]).recent(50)
+            assert single == batch, f"{key} differs between single and batch ingestion"
+    
+    print(f"{len(plays)} plays for {args.users} users, batches of {args.batch_size}")
+    print(f"{'mode':<8} {'requests':>9} {'dict ops':>9} {'time':>8} {'plays/s':>9}")
+    for name, (elapsed, requests, store) in results.items():
+        print(f"{name:<8} {requests:>9} {store.ops:>9} {elapsed:>6.2f} s {len(plays) / elapsed:>9.0f}")
+    print(f"speedup: {results['single'][0] / results['batch'][0]:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
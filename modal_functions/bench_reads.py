@@ -0,0 +1,97 @@
+"""
+Measure what polling get_recent_plays costs, with and without conditional GET.
+
+Simulates sidebar/recap pages polling a user's recent plays while new plays
+arrive now and then. "full" reads and returns the whole ring on every poll,
+as get_recent_plays did before; "conditional" sends back the last ETag, so
+an unchanged user costs one read of the small version key and a 304 with no
+body, and a changed user is served from the in-container read cache when it
+is current.
+
+Writes are modelled as coming from another container: they do not warm the
+reader's cache.
+
+Usage:
+    python modal_functions/bench_reads.py
+    python modal_functions/bench_reads.py --polls 5000 --write-every 50
+"""
+
+import argparse
+import json
+import pickle
+import random
+
+from bench_ingest import LocalDict, make_plays
+from play_ring import PlayRing, RingCache, record_play, recent_plays
+
+
+class MeteredDict(LocalDict):
+    """LocalDict that counts reads (all, and of play rings) and the bytes they return."""
+    
+    def __init__(self):
+        super().__init__(rtt=0.0)
+        self.reads = 0
+        self.ring_reads = 0
+        self.read_bytes = 0
+    
+    def get(self, key, default=None):
+        value = super().get(key, default)
+        if not key.startswith("lock:"):
+            self.reads += 1
+            self.ring_reads += key.startswith("user:")
+            self.read_bytes += len(pickle.dumps(value))
+        return value
+
+
+def run(mode: str, users: int, polls: int, write_every: int, limit: int, seed: int = 0):
+    rng = random.Random(seed)
+    store = MeteredDict()
+    
+    plays = iter(make_plays(polls // write_every + users * 50, users, duplicate_rate=0.0, seed=seed))
+    for _ in range(users * 50):
+        user_id, play = next(plays)
+        record_play(store, user_id, play)
+    store.read_cache = RingCache()
+    store.reads = store.ring_reads = store.read_bytes = 0
+    
+    etags = {}
+    response_bytes = not_modified = 0
+    for i in range(polls):
+        if i % write_every == 0:
+            user_id, play = next(plays)
+            record_play(store, user_id, play)
+            store.read_cache.invalidate(f"user:{user_id}")
+        
+        user_id = f"user-{rng.randrange(users)}"
+        if mode == "full":
+            body = PlayRing.from_value(store.get(f"user:{user_id}")).recent(limit)
+        else:
+            body, etags[user_id] = recent_plays(store, user_id, limit, if_none_match=etags.get(user_id))
+        if body is None:
+            not_modified += 1
+        else:
+            response_bytes += len(json.dumps(body))
+    
+    return store.reads, store.ring_reads, store.read_bytes, response_bytes, not_modified
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare full and conditional polling of recent plays")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--polls", type=int, default=2000)
+    parser.add_argument("--write-every", type=int, default=20, help="Polls between new plays")
+    parser.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args()
+    
+    print(f"{args.polls} polls over {args.users} users, a new play every {args.write_every} polls")
+    print(f"{'mode':<12} {'reads/poll':>10} {'ring reads/poll':>16} {'read bytes/poll':>16} "
+          f"{'response bytes/poll':>20} {'304s':>6}")
+    for mode in ("full", "conditional"):
+        reads, ring_reads, read_bytes, response_bytes, not_modified = run(
+            mode, args.users, args.polls, args.write_every, args.limit)
+        print(f"{mode:<12} {reads / args.polls:>10.2f} {ring_reads / args.polls:>16.2f} {read_bytes / args.polls:>16.0f} "
+              f"{response_bytes / args.polls:>20.0f} {not_modified:>6}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,355 @@
+"""
+Cross-user index of recently generated clips, for reusing music.
+
+Every recorded play carries a clip's topics, tags and audio URL. The index
+keeps recently recorded clips keyed by their normalized tag set, so a
+caller about to generate music for a tag set can first look up the nearest
+existing clip (by tag-set Jaccard similarity) and play that instead.
+
+The index is one value in the PlayStore, written under a global lock like a
+user's ring; each container queues the plays it records and writes them in
+batches, so record_play never waits for that lock. Readers keep it in the
+store's read cache and check a tiny version key per lookup, so lookups do
+not re-read the whole index. Clips expire after max_age (their URLs are
+not kept forever) and, past max_clips, the least played clips are evicted
+first.
+
+Reuse is measured where it happens: a play of an indexed clip by another
+user than the one who first recorded it is a generation that user did not
+pay for.
+"""
+
+import heapq
+import threading
+import time
+import weakref
+from typing import Any, Dict, List, Optional, Set
+
+from play_ring import user_lock, version_key
+from play_rollups import split_terms
+
+
+INDEX_KEY = "clip_index"
+
+DEFAULT_MAX_CLIPS = 1000
+DEFAULT_MAX_AGE = 3 * 24 * 3600
+
+# Position of each field in an index entry (lists, since counts change)
+URL, TOPICS, TAGS, RECORDED_AT, PLAYS, REUSES, OWNER = range(7)
+
+
+def tag_set(tags: str) -> frozenset:
+    """Normalized tag set of a comma-separated tag string."""
+    return frozenset(split_terms(tags))
+
+
+class ClipIndex:
+    """Clips by tag set, with popularity counts and reuse statistics."""
+    
+    VERSION = 1
+    
+    def __init__(self, max_clips: int = DEFAULT_MAX_CLIPS, max_age: float = DEFAULT_MAX_AGE):
+        self.max_clips = max_clips
+        self.max_age = max_age
+        self.entries: Dict[str, list] = {}
+        self.seq = 0  # bumped on every write; the index's version
+        self.stats = {'indexed': 0, 'plays': 0, 'reused_plays': 0, 'evictions': 0}
+        self._postings: Optional[Dict[str, Set[str]]] = None
+    
+    @classmethod
+    def from_value(cls, value: Optional[Dict[str, Any]], max_clips: int = DEFAULT_MAX_CLIPS,
+                   max_age: float = DEFAULT_MAX_AGE) -> "ClipIndex":
+        index = cls(max_clips, max_age)
+        if value:
+            index.entries = {clip_id: list(entry) for clip_id, entry in value["entries"].items()}
+            index.seq = value["seq"]
+            index.stats.update(value["stats"])
+        return index
+    
+    def to_value(self) -> Dict[str, Any]:
+        """Compact value for storage."""
+        return {"v": self.VERSION, "seq": self.seq, "entries": self.entries, "stats": self.stats}
+    
+    def add_play(self, user_id: str, play: Dict[str, Any], now: Optional[float] = None) -> None:
+        """
+        Count a recorded play, indexing its clip if it is new.
+        
+        Args:
+            user_id: User who played it
+            play: Stored play dict (clip_id, url, topics, tags, ...)
+            now: Current time (defaults to time.time())
+        """
+        now = time.time() if now is None else now
+        clip_id = play.get("clip_id")
+        entry = self.entries.get(clip_id)
+        self.stats['plays'] += 1
+        if entry is not None:
+            entry[PLAYS] += 1
+            if entry[OWNER] != user_id:
+                entry[REUSES] += 1
+                self.stats['reused_plays'] += 1
+            return
+        
+        if not clip_id or not play.get("url") or not tag_set(play.get("tags")):
+            return
+        self.entries[clip_id] = [play["url"], play.get("topics", ""), play["tags"], now, 1, 0, user_id]
+        self.stats['indexed'] += 1
+        self._postings = None
+    
+    def evict(self, now: Optional[float] = None) -> None:
+        """Drop expired clips, then the least played ones beyond max_clips."""
+        now = time.time() if now is None else now
+        expired = [clip_id for clip_id, entry in self.entries.items() if now - entry[RECORDED_AT] > self.max_age]
+        excess = len(self.entries) - len(expired) - self.max_clips
+        if excess > 0:
+            live = ((entry[PLAYS], entry[RECORDED_AT], clip_id)
+                    for clip_id, entry in self.entries.items() if now - entry[RECORDED_AT] <= self.max_age)
+            expired.extend(clip_id for _, _, clip_id in heapq.nsmallest(excess, live))
+        for clip_id in expired:
+            del self.entries[clip_id]
+        self.stats['evictions'] += len(expired)
+        if expired:
+            self._postings = None
+    
+    def _tag_postings(self) -> Dict[str, Set[str]]:
+        """tag -> clip IDs, built once per loaded version."""
+        if self._postings is None:
+            postings: Dict[str, Set[str]] = {}
+            for clip_id, entry in self.entries.items():
+                for tag in tag_set(entry[TAGS]):
+                    postings.setdefault(tag, set()).add(clip_id)
+            self._postings = postings
+        return self._postings
+    
+    def lookup(self, tags: str, limit: int = 3, min_similarity: float = 0.5,
+               now: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Nearest clips to a tag set.
+        
+        Args:
+            tags: Comma-separated tags of the music about to be generated
+            limit: Most matches to return
+            min_similarity: Minimum tag-set Jaccard similarity
+            now: Current time (defaults to time.time())
+        
+        Returns:
+            Matches, best first: clip_id, url, topics, tags, similarity,
+            plays and recorded_at
+        """
+        now = time.time() if now is None else now
+        wanted = tag_set(tags)
+        if not wanted:
+            return []
+        postings = self._tag_postings()
+        candidates = set().union(*(postings.get(tag, ()) for tag in wanted))
+        
+        matches = []
+        for clip_id in candidates:
+            entry = self.entries[clip_id]
+            if now - entry[RECORDED_AT] > self.max_age:
+                continue
+            clip_tags = tag_set(entry[TAGS])
+            similarity = len(wanted & clip_tags) / len(wanted | clip_tags)
+            if similarity >= min_similarity:
+                matches.append((similarity, entry[PLAYS], entry[RECORDED_AT], clip_id))
+        matches.sort(reverse=True)
+        
+        return [{
+            "clip_id": clip_id,
+            "url": self.entries[clip_id][URL],
+            "topics": self.entries[clip_id][TOPICS],
+            "tags": self.entries[clip_id][TAGS],
+            "similarity": round(similarity, 3),
+            "plays": plays,
+            "recorded_at": recorded_at,
+        } for similarity, plays, recorded_at, clip_id in matches[:limit]]
+
+
+class _LookupStats:
+    """Lookups served by this container (not persisted)."""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.matches = 0
+    
+    def count(self, matched: bool) -> None:
+        with self._lock:
+            self.lookups += 1
+            self.matches += matched
+
+
+lookup_stats = _LookupStats()
+
+
+class _PendingPlays:
+    """
+    Plays recorded by this container and not yet written to the index.
+    
+    Writing the index takes its global lock, so doing it inside every
+    record_play would serialize all writers; plays are instead written in
+    batches every flush_interval seconds, or as soon as max_pending are
+    waiting.
+    
+    Plays from a failed write are retried with the next batch. While writes
+    keep failing only the background flush retries, and at most max_buffered
+    plays are kept (the oldest are dropped: the index is only a hint).
+    
+    Only a weak reference to the store is kept: once the store is garbage
+    collected, its queued plays are dropped and the flush thread exits.
+    """
+    
+    def __init__(self, store, flush_interval: float = 2.0, max_pending: int = 100, max_buffered: int = 1000):
+        self._store = weakref.ref(store)
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.max_buffered = max_buffered
+        self.plays: List[tuple] = []
+        self.failing = False
+        self.dropped = 0
+        self._drop_reported = False
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        threading.Thread(target=self._run, name="clip-index-flush", daemon=True).start()
+    
+    def add(self, plays: List[tuple]) -> None:
+        with self._lock:
+            self.plays.extend(plays)
+            self._trim()
+            full = len(self.plays) >= self.max_pending and not self.failing
+        if full:
+            self.flush()
+    
+    def flush(self) -> None:
+        with self._flush_lock:
+            with self._lock:
+                plays, self.plays = self.plays, []
+            store = self._store()
+            if not plays or store is None:
+                return
+            try:
+                _write_plays(store, plays)
+            except Exception as e:
+                print(f"Could not update the clip index, will retry: {e}")
+                with self._lock:
+                    self.failing = True
+                    self.plays[:0] = plays
+                    self._trim()
+                return
+            with self._lock:
+                self.failing = False
+                self._drop_reported = False
+    
+    def _trim(self) -> None:
+        """Drop the oldest plays beyond max_buffered (lock held)."""
+        excess = len(self.plays) - self.max_buffered
+        if excess > 0:
+            del self.plays[:excess]
+            self.dropped += excess
+            if not self._drop_reported:
+                # Once per failure streak; the total is in self.dropped
+                print(f"Clip index writes are failing, dropping queued plays beyond {self.max_buffered}")
+                self._drop_reported = True
+    
+    def _run(self) -> None:
+        while self._store() is not None:
+            time.sleep(self.flush_interval)
+            self.flush()
+
+
+_pending: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+_pending_lock = threading.Lock()
+
+
+def _pending_for(store) -> _PendingPlays:
+    with _pending_lock:
+        if store not in _pending:
+            _pending[store] = _PendingPlays(store)
+        return _pending[store]
+
+
+def index_plays(store, plays: List[tuple]) -> None:
+    """
+    Queue recorded plays for the clip index (written within a couple of
+    seconds; see flush_index).
+    
+    Args:
+        store: PlayStore holding the index
+        plays: (user_id, play dict) pairs that were added to users' rings
+    """
+    if plays:
+        _pending_for(store).add(plays)
+
+
+def flush_index(store) -> None:
+    """Write this container's queued plays to the index now."""
+    _pending_for(store).flush()
+
+
+def _write_plays(store, plays: List[tuple]) -> None:
+    """Add plays to the index with one read and write under its lock."""
+    with user_lock(store, INDEX_KEY):
+        index = ClipIndex.from_value(store.get(INDEX_KEY))
+        for user_id, play in plays:
+            index.add_play(user_id, play)
+        index.evict()
+        index.seq += 1
+        store.read_cache.invalidate(INDEX_KEY)
+        store[INDEX_KEY] = index.to_value()
+        store[version_key(INDEX_KEY)] = index.seq
+        store.read_cache.put(INDEX_KEY, index)
+
+
+def load_index(store) -> ClipIndex:
+    """
+    The clip index, from the store's read cache while it is current.
+    
+    Args:
+        store: PlayStore holding the index
+    
+    Returns:
+        ClipIndex (shared with the cache: do not modify it)
+    """
+    version = store.get(version_key(INDEX_KEY))
+    index = store.read_cache.get(INDEX_KEY, version)
+    if index is None:
+        index = ClipIndex.from_value(store.get(INDEX_KEY))
+        store.read_cache.put(INDEX_KEY, index)
+    return index
+
+
+def find_clips(store, tags: str, limit: int = 3, min_similarity: float = 0.5) -> List[Dict[str, Any]]:
+    """
+    Nearest indexed clips to a tag set (see ClipIndex.lookup).
+    
+    Args:
+        store: PlayStore holding the index
+        tags: Comma-separated tags
+        limit: Most matches to return
+        min_similarity: Minimum tag-set Jaccard similarity
+    
+    Returns:
+        Matches, best first
+    """
+    matches = load_index(store).lookup(tags, limit, min_similarity)
+    lookup_stats.count(bool(matches))
+    return matches
+
+
+def index_stats(store) -> Dict[str, Any]:
+    """
+    Clip index statistics.
+    
+    Returns:
+        Dictionary with clips indexed, plays and reused_plays (plays of a
+        clip by another user than the one who first recorded it), reuse_rate,
+        evictions, and this container's lookups, matches and match_rate
+    """
+    index = load_index(store)
+    stats = dict(index.stats)
+    stats['clips'] = len(index.entries)
+    stats['reuse_rate'] = stats['reused_plays'] / stats['plays'] if stats['plays'] else 0.0
+    stats['lookups'] = lookup_stats.lookups
+    stats['matches'] = lookup_stats.matches
+    stats['match_rate'] = lookup_stats.matches / lookup_stats.lookups if lookup_stats.lookups else 0.0
+    return stats
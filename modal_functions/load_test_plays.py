@@ -0,0 +1,135 @@
+"""
+Load-test the plays service per storage backend.
+
+Sends concurrent record_play requests, then get_recent_plays requests, to
+the ASGI app from plays_api.create_app() and reports throughput and latency
+for each backend. By default the app is called in-process (no network, so
+the numbers isolate handler and storage cost); --url targets a running
+server instead, e.g. one started with
+
+    PLAY_STORE=sqlite uvicorn --factory plays_api:create_app --port 8000
+
+The modal backend talks to the real modal.Dict and needs Modal credentials.
+"app p50" is the time the server reports spending in the app (Server-Timing
+header); the gap to the client p50 is per-request overhead outside the app,
+such as routing, cold starts and the network.
+
+Usage:
+    python modal_functions/load_test_plays.py
+    python modal_functions/load_test_plays.py --backends memory sqlite modal --requests 500 --concurrency 16
+    python modal_functions/load_test_plays.py --url http://localhost:8000
+    python modal_functions/load_test_plays.py --url https://<workspace>--adaptive-sound-plays-playsservice-web.modal.run
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import statistics
+import tempfile
+import time
+
+import httpx
+
+from plays_api import create_app
+from play_store import get_store
+
+
+def app_time(response: httpx.Response) -> float:
+    """Seconds the server reported spending in the app (Server-Timing), 0 if absent."""
+    for metric in response.headers.get("server-timing", "").split(","):
+        name, _, params = metric.strip().partition(";")
+        if name == "app" and params.startswith("dur="):
+            return float(params[4:]) / 1000
+    return 0.0
+
+
+async def run_phase(client: httpx.AsyncClient, make_request, count: int, concurrency: int):
+    """
+    Send `count` requests with at most `concurrency` in flight.
+    
+    Returns:
+        Tuple of (elapsed, client latencies, server app times, errors)
+    """
+    latencies, app_times, errors = [], [], 0
+    semaphore = asyncio.Semaphore(concurrency)
+    
+    async def one(i):
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            response = await make_request(client, i)
+            latencies.append(time.perf_counter() - start)
+            app_times.append(app_time(response))
+            if response.status_code >= 400:
+                errors += 1
+    
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(count)))
+    return time.perf_counter() - start, latencies, app_times, errors
+
+
+async def load_test(client: httpx.AsyncClient, requests: int, users: int, concurrency: int):
+    auth = {"Authorization": f"Bearer {os.getenv('MODAL_AUTH_TOKEN', 'demo-token-12345')}"}
+    
+    def record(client, i):
+        return client.post("/record_play", headers=auth, json={
+            "user_id": f"load-user-{i % users}",
+            "play_record": {
+                "clip_id": f"load-clip-{i}",
+                "url": f"https://cdn1.suno.ai/load-clip-{i}.mp3",
+                "topics": "Calm focus music",
+                "tags": "instrumental, lo-fi, focus",
+                "source": "generate",
+            },
+        })
+    
+    def read(client, i):
+        return client.get("/get_recent_plays", headers=auth, params={"user_id": f"load-user-{i % users}", "limit": 10})
+    
+    results = {}
+    for name, make_request in (("record", record), ("read", read)):
+        results[name] = await run_phase(client, make_request, requests, concurrency)
+    return results
+
+
+def report(backend: str, results) -> None:
+    for name, (elapsed, latencies, app_times, errors) in results.items():
+        latencies = sorted(latencies)
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        print(f"{backend:<8} {name:<7} {len(latencies) / elapsed:>9.0f} {statistics.median(latencies) * 1000:>9.2f} "
+              f"{p95 * 1000:>9.2f} {max(latencies) * 1000:>9.2f} {statistics.median(app_times) * 1000:>10.2f} {errors:>7}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Load-test the plays service per storage backend")
+    parser.add_argument("--backends", nargs="+", default=["memory", "sqlite"], choices=["memory", "sqlite", "modal"])
+    parser.add_argument("--requests", type=int, default=2000, help="Requests per phase")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--url", help="Load-test a running server instead of in-process apps")
+    args = parser.parse_args()
+    
+    print(f"{args.requests} requests per phase, {args.users} users, concurrency {args.concurrency}")
+    print(f"{'backend':<8} {'phase':<7} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'max ms':>9} {'app p50 ms':>10} {'errors':>7}")
+    
+    if args.url:
+        async with httpx.AsyncClient(base_url=args.url, timeout=60) as client:
+            report("remote", await load_test(client, args.requests, args.users, args.concurrency))
+        return
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        for backend in args.backends:
+            kwargs = {"path": os.path.join(tmp, "plays.db")} if backend == "sqlite" else {}
+            app = create_app(get_store(backend, **kwargs))
+            transport = httpx.ASGITransport(app=app)
+            # The handlers log every request; keep the report readable
+            with contextlib.redirect_stdout(io.StringIO()):
+                async with httpx.AsyncClient(transport=transport, base_url="http://plays", timeout=60) as client:
+                    results = await load_test(client, args.requests, args.users, args.concurrency)
+            report(backend, results)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
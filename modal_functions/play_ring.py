@@ -0,0 +1,425 @@
+"""
+Fixed-capacity ring buffer of recent plays with a clip-ID index.
+
+Replaces the plain list of play dicts stored per user. Plays
+are stored as compact tuples in a ring of fixed capacity, and a clip-ID ->
+slot index makes the duplicate check O(1). Writes for one user are
+serialized with a lease lock kept in the same store, so concurrent
+record_play calls can no longer lose each other's updates.
+
+Rings are kept in a PlayStore (play_store.py): modal.Dict when deployed,
+SQLite or memory locally.
+
+Every play gets a sequence number, which doubles as the user's version:
+it is also written to a small "version:" key so that readers can tell
+whether a cached ring (or a client's ETag) is still current without
+reading the ring itself, and it gives stable pagination cursors.
+
+Each write also updates the user's listening rollup (play_rollups.py) in
+the same locked update.
+
+Values written by the original list-based code are still read, and are
+converted to the ring format on their next write.
+"""
+
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Tuple
+
+from play_rollups import Rollup, rollup_key
+
+
+# Order of the fields in a stored play tuple
+PLAY_FIELDS = ("clip_id", "url", "topics", "tags", "started_at", "source")
+
+DEFAULT_CAPACITY = 50
+
+
+class PlayRing:
+    """Newest `capacity` plays of one user, deduplicated by clip_id."""
+    
+    VERSION = 1
+    
+    def __init__(self, capacity: int = DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self.slots: List[Optional[tuple]] = [None] * capacity
+        self.head = 0  # slot the next play is written to
+        self.size = 0
+        self.seq = 0  # plays ever added; the newest play has seq - 1
+        self.index: Dict[str, int] = {}
+    
+    @classmethod
+    def from_value(cls, value: Any, capacity: int = DEFAULT_CAPACITY) -> "PlayRing":
+        """
+        Load a stored value.
+        
+        Args:
+            value: Ring dict written by to_value(), a legacy list of play
+                dicts (oldest first), or None
+        
+        Returns:
+            PlayRing
+        """
+        if isinstance(value, dict) and value.get("v") == cls.VERSION:
+            ring = cls(value["cap"])
+            ring.slots = list(value["slots"])
+            ring.head = value["head"]
+            ring.size = value["size"]
+            ring.seq = value.get("seq", value["size"])
+            ring.index = dict(value["index"])
+            return ring
+        
+        ring = cls(capacity)
+        for play in (value or [])[-capacity:]:
+            ring.append(tuple(play.get(name, "") for name in PLAY_FIELDS))
+        return ring
+    
+    def to_value(self) -> Dict[str, Any]:
+        """Compact value for storage."""
+        return {
+            "v": self.VERSION,
+            "cap": self.capacity,
+            "head": self.head,
+            "size": self.size,
+            "seq": self.seq,
+            "slots": self.slots,
+            "index": self.index,
+        }
+    
+    def __len__(self) -> int:
+        return self.size
+    
+    def __contains__(self, clip_id: str) -> bool:
+        return clip_id in self.index
+    
+    def append(self, play: tuple) -> None:
+        """Write a play tuple, overwriting the oldest one when full."""
+        evicted = self.slots[self.head]
+        if evicted is not None and self.index.get(evicted[0]) == self.head:
+            del self.index[evicted[0]]
+        self.slots[self.head] = play
+        self.index[play[0]] = self.head
+        self.head = (self.head + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+        self.seq += 1
+    
+    def add(self, play: Dict[str, Any]) -> bool:
+        """
+        Add a play unless its clip_id is already in the ring.
+        
+        Args:
+            play: Play dict with the PLAY_FIELDS keys
+        
+        Returns:
+            True if the play was added
+        """
+        if play["clip_id"] in self.index:
+            return False
+        self.append(tuple(play[name] for name in PLAY_FIELDS))
+        return True
+    
+    def newest(self, count: int) -> List[Dict[str, Any]]:
+        """
+        The newest plays, newest first.
+        
+        Args:
+            count: Number of plays (at most len(self))
+        
+        Returns:
+            List of play dicts
+        """
+        return self._newest(0, count)
+    
+    def _newest(self, skip: int, count: int) -> List[Dict[str, Any]]:
+        count = max(0, min(count, self.size - skip))
+        positions = ((self.head - 1 - skip - i) % self.capacity for i in range(count))
+        return [dict(zip(PLAY_FIELDS, self.slots[p])) for p in positions]
+    
+    def page(self, before: Optional[int], limit: int) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        """
+        One page of plays, newest first.
+        
+        Cursors are sequence numbers, so plays recorded between two page
+        requests do not shift the later pages.
+        
+        Args:
+            before: Return plays older than this cursor (None for the newest)
+            limit: Page size
+        
+        Returns:
+            Tuple of (plays, cursor for the next page or None on the last page)
+        """
+        skip = 0 if before is None else max(0, self.seq - before)
+        plays = self._newest(skip, limit)
+        if skip + len(plays) >= self.size:
+            return plays, None
+        return plays, self.seq - skip - len(plays)
+    
+    def recent(self, limit: int) -> List[Dict[str, Any]]:
+        """
+        Same result as the original `plays[-limit:][::-1] if plays else []`.
+        
+        Args:
+            limit: Requested number of plays
+        
+        Returns:
+            List of play dicts, newest first
+        """
+        if limit > 0:
+            return self.newest(limit)
+        # limit <= 0 slices from the front in the original; keep that behaviour
+        plays = self.newest(self.size)[::-1]
+        return plays[-limit:][::-1] if plays else []
+
+
+class RingCache:
+    """
+    In-container LRU cache of rings (or any value with a seq version, such
+    as the clip index), checked against the stored version so a stale entry
+    is never served.
+    """
+    
+    def __init__(self, max_users: int = 1024):
+        self.max_users = max_users
+        self._rings: "OrderedDict[str, PlayRing]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0}
+    
+    def get(self, user_key: str, version: Optional[int]) -> Optional[PlayRing]:
+        """Cached ring for a user if it is at `version` (treat it as read-only)."""
+        with self._lock:
+            ring = self._rings.get(user_key)
+            if ring is None or version is None or ring.seq != version:
+                self.stats['misses'] += 1
+                return None
+            self._rings.move_to_end(user_key)
+            self.stats['hits'] += 1
+            return ring
+    
+    def put(self, user_key: str, ring: PlayRing) -> None:
+        with self._lock:
+            self._rings[user_key] = ring
+            self._rings.move_to_end(user_key)
+            while len(self._rings) > self.max_users:
+                self._rings.popitem(last=False)
+    
+    def invalidate(self, user_key: str) -> None:
+        with self._lock:
+            self._rings.pop(user_key, None)
+
+
+def version_key(user_key: str) -> str:
+    return f"version:{user_key}"
+
+
+@contextmanager
+def user_lock(store, user_key: str, lease: float = 10.0, timeout: float = 5.0, poll: float = 0.02):
+    """
+    Hold a per-user write lock kept in the store itself.
+    
+    The lock is a key written with skip_if_exists, so only one writer can
+    create it. Its value carries a per-acquisition token. Locks left behind
+    by a crashed writer expire after `lease` seconds, and are taken over
+    (like the release) with the store's pop_if, so a waiter only removes the
+    stale lock it saw. That is atomic on SQLite and in memory; modal.Dict has
+    no compare-and-delete, so on Modal the lock is best effort (see
+    ModalDictStore.pop_if) and two writers may rarely overlap.
+    
+    The lease is not renewed: a holder must finish within `lease` seconds,
+    after which another writer may take the lock. The writers here do one
+    read and one write under it, well inside the default 10 s.
+    
+    Args:
+        store: PlayStore (or anything with get/put(skip_if_exists)/pop_if)
+        user_key: Key of the user's plays
+        lease: Seconds after which a held lock is considered abandoned
+        timeout: Seconds to wait for the lock before raising TimeoutError
+        poll: Seconds between attempts
+    """
+    lock_key = f"lock:{user_key}"
+    token = uuid.uuid4().hex
+    deadline = time.time() + timeout
+    
+    while True:
+        acquired = (token, time.time() + lease)
+        if store.put(lock_key, acquired, skip_if_exists=True):
+            break
+        held = store.get(lock_key)
+        if held is not None and held[1] < time.time():
+            # Abandoned by a writer that never released it; only removed if
+            # no other waiter replaced it in the meantime
+            store.pop_if(lock_key, held)
+            continue
+        if time.time() > deadline:
+            raise TimeoutError(f"Timed out waiting for the write lock on {user_key}")
+        time.sleep(poll)
+    
+    try:
+        yield
+    finally:
+        if acquired[1] < time.time():
+            print(f"Write lock on {user_key} was held past its {lease:.0f} s lease")
+        store.pop_if(lock_key, acquired)
+
+
+def record_play(store, user_id: str, play: Dict[str, Any], capacity: int = DEFAULT_CAPACITY) -> int:
+    """
+    Add a play to a user's ring under the user's write lock.
+    
+    Args:
+        store: PlayStore holding the rings
+        user_id: User ID
+        play: Play dict with the PLAY_FIELDS keys
+        capacity: Plays kept per user
+    
+    Returns:
+        Number of plays stored for the user afterwards
+    """
+    return record_plays(store, user_id, [play], capacity)[1]
+
+
+def record_plays(store, user_id: str, plays: List[Dict[str, Any]],
+                 capacity: int = DEFAULT_CAPACITY) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    Add several plays (oldest first) to a user's ring with one read and at
+    most one write, under the user's write lock.
+    
+    Plays whose clip_id is already stored, or appears earlier in `plays`,
+    are skipped. Added plays are also counted in the user's rollup.
+    
+    Args:
+        store: PlayStore holding the rings
+        user_id: User ID
+        plays: Play dicts with the PLAY_FIELDS keys
+        capacity: Plays kept per user
+    
+    Returns:
+        Tuple of (plays added, number of plays stored for the user afterwards)
+    """
+    user_key = f"user:{user_id}"
+    with user_lock(store, user_key):
+        ring = PlayRing.from_value(store.get(user_key), capacity)
+        rollup = _stored_rollup(store, user_key, ring)
+        added = [play for play in plays if ring.add(play)]
+        if added:
+            store.read_cache.invalidate(user_key)
+            store[user_key] = ring.to_value()
+            # Written after the ring, so a reader never sees a version
+            # whose plays are not stored yet
+            store[version_key(user_key)] = ring.seq
+            store.read_cache.put(user_key, ring)
+            # Last: if this write is lost, a retried play is deduplicated by
+            # the ring and the rollup undercounts, rather than counting it twice
+            for play in added:
+                rollup.add(play)
+            store[rollup_key(user_key)] = rollup.to_value()
+        return added, len(ring)
+
+
+def _stored_rollup(store, user_key: str, ring: PlayRing) -> Rollup:
+    """A user's rollup, seeded from the ring for users recorded before rollups existed."""
+    value = store.get(rollup_key(user_key))
+    if value is not None:
+        return Rollup.from_value(value)
+    return Rollup.from_plays(ring.newest(len(ring))[::-1])
+
+
+def load_rollup(store, user_id: str) -> Rollup:
+    """
+    A user's listening rollup (one read of a bounded-size value once the
+    user has been written since rollups were introduced).
+    
+    Args:
+        store: PlayStore holding the rings
+        user_id: User ID
+    
+    Returns:
+        Rollup
+    """
+    user_key = f"user:{user_id}"
+    value = store.get(rollup_key(user_key))
+    if value is not None:
+        return Rollup.from_value(value)
+    return _stored_rollup(store, user_key, PlayRing.from_value(store.get(user_key)))
+
+
+def read_version(store, user_id: str) -> Optional[int]:
+    """
+    A user's current version (sequence number of plays), from its small
+    version key.
+    
+    Args:
+        store: PlayStore holding the rings
+        user_id: User ID
+    
+    Returns:
+        Version, or None for users written before versions were stored
+    """
+    return store.get(version_key(f"user:{user_id}"))
+
+
+def load_ring(store, user_id: str, version: Optional[int] = None) -> PlayRing:
+    """
+    A user's ring, from the read cache when it is still at `version`.
+    
+    Args:
+        store: PlayStore holding the rings
+        user_id: User ID
+        version: Result of read_version() (None always reads the store)
+    
+    Returns:
+        PlayRing (shared with the cache: do not modify it)
+    """
+    user_key = f"user:{user_id}"
+    ring = store.read_cache.get(user_key, version)
+    if ring is None:
+        ring = PlayRing.from_value(store.get(user_key))
+        store.read_cache.put(user_key, ring)
+    return ring
+
+
+def recent_plays(store, user_id: str, limit: int, cursor: Optional[str] = None,
+                 if_none_match: Optional[str] = None) -> Tuple[Any, str]:
+    """
+    A user's recent plays, newest first (no lock needed: values are
+    replaced whole, so a read sees either the old or the new ring).
+    
+    Args:
+        store: PlayStore holding the rings
+        user_id: User ID
+        limit: Number of plays (page size when paginating)
+        cursor: None for the plain list of plays; "" for the first page of
+            {"plays", "next_cursor", "version"}, or a returned next_cursor
+        if_none_match: ETag from an earlier response
+    
+    Returns:
+        Tuple of (response body, or None if `if_none_match` is still
+        current; ETag)
+    
+    Raises:
+        ValueError: If the cursor is not one returned by this function
+    """
+    before = int(cursor) if cursor else None
+    
+    # The version key is tiny: an unchanged user costs no read of the plays
+    version = read_version(store, user_id)
+    if version is not None and if_none_match == f'"{version}"':
+        return None, if_none_match
+    
+    ring = load_ring(store, user_id, version)
+    etag = f'"{ring.seq}"'
+    if if_none_match == etag:
+        return None, etag
+    
+    if cursor is None:
+        return ring.recent(limit), etag
+    
+    plays, next_before = ring.page(before, limit)
+    return {
+        "plays": plays,
+        "next_cursor": str(next_before) if next_before is not None else None,
+        "version": ring.seq,
+    }, etag
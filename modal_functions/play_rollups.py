@@ -0,0 +1,191 @@
+"""
+Per-user listening rollups, updated incrementally on every recorded play.
+
+A rollup holds plays per day, the most played tags and topic keywords and a
+breakdown by source, for a user's whole history rather than only the last
+50 plays in the ring. Its size is bounded no matter how many plays it has
+seen: only the most recent MAX_DAYS active days keep per-day counts (older
+days stay in the totals) and tags, topics and sources are counted with the
+Space-Saving algorithm in a fixed number of counters, so the top entries are
+exact for typical users and approximate (never undercounted) for users with
+a long tail.
+
+Topics are free-text prompts ("Calm focus music for reading about
+science"), nearly all distinct, which would keep evicting each other from
+the counters. They are counted by keyword instead: lowercased words with
+stop words and generic prompt words ("music", "background") removed.
+
+Rollups are stored next to the ring under "rollup:user:<id>" and written in
+the same locked update as the ring, so the summary endpoint reads one small
+value.
+"""
+
+import re
+from datetime import date, datetime, timezone
+from typing import Any, Dict, List, Optional
+
+
+# Counters kept per tag/topic rollup
+TOP_COUNTERS = 64
+
+# Days kept in the per-day counts
+MAX_DAYS = 366
+
+# Counters kept for play sources (clients send a handful of known values)
+SOURCE_COUNTERS = 16
+
+# Keywords counted per play's topic
+MAX_TOPIC_TERMS = 4
+
+# Words that say nothing about what the user listened to
+TOPIC_STOP_WORDS = frozenset({
+    "a", "about", "an", "and", "as", "at", "background", "by", "for", "from", "in", "into",
+    "is", "it", "music", "of", "on", "or", "reading", "song", "songs", "sound", "soundtrack",
+    "that", "the", "this", "to", "track", "while", "with",
+})
+
+
+def split_terms(value: str) -> List[str]:
+    """Comma-separated tags or topics, lowercased and deduplicated."""
+    terms = []
+    for term in (value or "").split(","):
+        term = term.strip().lower()
+        if term and term not in terms:
+            terms.append(term)
+    return terms
+
+
+def topic_terms(value: str) -> List[str]:
+    """Keywords of a free-text topic, lowercased and deduplicated."""
+    terms = []
+    for word in re.findall(r"[a-z][a-z'-]+", (value or "").lower()):
+        if word not in TOPIC_STOP_WORDS and word not in terms:
+            terms.append(word)
+            if len(terms) == MAX_TOPIC_TERMS:
+                break
+    return terms
+
+
+def play_day(started_at: str) -> str:
+    """ISO date of a play's started_at (today when it does not parse)."""
+    try:
+        return date.fromisoformat((started_at or "")[:10]).isoformat()
+    except ValueError:
+        return datetime.now(timezone.utc).date().isoformat()
+
+
+class TopCounter:
+    """Space-Saving heavy hitters: approximate top counts in fixed memory."""
+    
+    def __init__(self, capacity: int = TOP_COUNTERS, counts: Optional[Dict[str, int]] = None):
+        self.capacity = capacity
+        self.counts: Dict[str, int] = dict(counts or {})
+    
+    def add(self, term: str) -> None:
+        if term in self.counts:
+            self.counts[term] += 1
+        elif len(self.counts) < self.capacity:
+            self.counts[term] = 1
+        else:
+            # Replace the smallest counter; the newcomer inherits its count
+            smallest = min(self.counts, key=self.counts.get)
+            self.counts[term] = self.counts.pop(smallest) + 1
+    
+    def top(self, n: int) -> List[tuple]:
+        return sorted(self.counts.items(), key=lambda item: (-item[1], item[0]))[:n]
+
+
+class Rollup:
+    """Listening summary of one user, maintained play by play."""
+    
+    VERSION = 1
+    
+    def __init__(self):
+        self.total_plays = 0
+        self.first_played_at: Optional[str] = None
+        self.last_played_at: Optional[str] = None
+        self.days: Dict[str, int] = {}
+        self.tags = TopCounter()
+        self.topics = TopCounter()
+        self.sources = TopCounter(SOURCE_COUNTERS)
+    
+    @classmethod
+    def from_value(cls, value: Dict[str, Any]) -> "Rollup":
+        rollup = cls()
+        rollup.total_plays = value["total"]
+        rollup.first_played_at = value["first"]
+        rollup.last_played_at = value["last"]
+        rollup.days = dict(value["days"])
+        rollup.tags = TopCounter(counts=value["tags"])
+        rollup.topics = TopCounter(counts=value["topics"])
+        rollup.sources = TopCounter(SOURCE_COUNTERS, counts=value["sources"])
+        return rollup
+    
+    @classmethod
+    def from_plays(cls, plays: List[Dict[str, Any]]) -> "Rollup":
+        """Rollup seeded from plays (oldest first), e.g. a ring recorded before rollups existed."""
+        rollup = cls()
+        for play in plays:
+            rollup.add(play)
+        return rollup
+    
+    def to_value(self) -> Dict[str, Any]:
+        """Compact value for storage."""
+        return {
+            "v": self.VERSION,
+            "total": self.total_plays,
+            "first": self.first_played_at,
+            "last": self.last_played_at,
+            "days": self.days,
+            "tags": self.tags.counts,
+            "topics": self.topics.counts,
+            "sources": self.sources.counts,
+        }
+    
+    def add(self, play: Dict[str, Any]) -> None:
+        """Count one recorded play."""
+        self.total_plays += 1
+        started_at = play.get("started_at") or ""
+        if started_at and (self.first_played_at is None or started_at < self.first_played_at):
+            self.first_played_at = started_at
+        if started_at and (self.last_played_at is None or started_at > self.last_played_at):
+            self.last_played_at = started_at
+        
+        day = play_day(started_at)
+        self.days[day] = self.days.get(day, 0) + 1
+        if len(self.days) > MAX_DAYS:
+            del self.days[min(self.days)]
+        
+        for tag in split_terms(play.get("tags")):
+            self.tags.add(tag)
+        for topic in topic_terms(play.get("topics")):
+            self.topics.add(topic)
+        self.sources.add(play.get("source") or "unknown")
+    
+    def summary(self, top: int = 10, days: int = 30) -> Dict[str, Any]:
+        """
+        Summary for the recap page (bounded work: at most MAX_DAYS days and
+        TOP_COUNTERS counters are looked at, whatever the history length).
+        
+        Args:
+            top: Number of top tags and topic keywords
+            days: Number of most recent active days in plays_per_day
+        
+        Returns:
+            Dictionary with total_plays, first/last_played_at,
+            plays_per_day, top_tags, top_topics and sources
+        """
+        recent_days = sorted(self.days)[-days:] if days > 0 else []
+        return {
+            "total_plays": self.total_plays,
+            "first_played_at": self.first_played_at,
+            "last_played_at": self.last_played_at,
+            "plays_per_day": {day: self.days[day] for day in recent_days},
+            "top_tags": [{"tag": tag, "plays": count} for tag, count in self.tags.top(top)],
+            "top_topics": [{"topic": topic, "plays": count} for topic, count in self.topics.top(top)],
+            "sources": dict(self.sources.top(SOURCE_COUNTERS)),
+        }
+
+
+def rollup_key(user_key: str) -> str:
+    return f"rollup:{user_key}"
@@ -0,0 +1,217 @@
+"""
+Storage backends for the plays service.
+
+The play rings (see play_ring.py) only need a small key-value interface:
+get, put with skip_if_exists and pop_if (used for the per-user write lock),
+pop and item assignment. PlayStore is that interface, implemented on
+modal.Dict for the deployed service and on SQLite or plain memory for local
+runs, load tests and profiling without Modal.
+
+Each store also carries the in-container read cache of rings, so that
+several stores in one process never serve each other's cached plays.
+"""
+
+import os
+import pickle
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from typing import Any, Optional
+
+from play_ring import RingCache
+
+
+DEFAULT_SQLITE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "adaptive_sound", "plays.db")
+
+
+class PlayStore(ABC):
+    """Key-value store holding play rings, versions and write locks."""
+    
+    name = "base"
+    
+    def __init__(self):
+        self.read_cache = RingCache()
+    
+    @abstractmethod
+    def get(self, key: str, default: Any = None) -> Any:
+        """Value for a key, or default."""
+    
+    @abstractmethod
+    def put(self, key: str, value: Any, skip_if_exists: bool = False) -> bool:
+        """
+        Store a value.
+        
+        Args:
+            key: Key
+            value: Any picklable value
+            skip_if_exists: Leave an existing value in place
+        
+        Returns:
+            True if the value was written
+        """
+    
+    @abstractmethod
+    def pop(self, key: str, default: Any = None) -> Any:
+        """Remove a key and return its value, or default."""
+    
+    @abstractmethod
+    def pop_if(self, key: str, expected: Any) -> bool:
+        """
+        Remove a key only if it still holds a given value.
+        
+        Args:
+            key: Key
+            expected: Value the key must hold
+        
+        Returns:
+            True if the key was removed
+        """
+    
+    def __setitem__(self, key: str, value: Any) -> None:
+        self.put(key, value)
+
+
+class ModalDictStore(PlayStore):
+    """The deployed service's modal.Dict."""
+    
+    name = "modal"
+    
+    def __init__(self, dict_name: str = "recent_plays_dict"):
+        super().__init__()
+        import modal
+        self.dict = modal.Dict.from_name(dict_name, create_if_missing=True)
+    
+    def get(self, key: str, default: Any = None) -> Any:
+        return self.dict.get(key, default)
+    
+    def put(self, key: str, value: Any, skip_if_exists: bool = False) -> bool:
+        return self.dict.put(key, value, skip_if_exists=skip_if_exists)
+    
+    def pop(self, key: str, default: Any = None) -> Any:
+        return self.dict.pop(key, default)
+    
+    def pop_if(self, key: str, expected: Any) -> bool:
+        # modal.Dict has no compare-and-delete: compare first and only pop on
+        # a match. Another writer can still replace the value between the get
+        # and the pop; the lock values carry a per-acquisition token, so such
+        # a pop is detected and the value put back (best effort, see user_lock)
+        if self.dict.get(key, None) != expected:
+            return False
+        value = self.dict.pop(key, None)
+        if value is None:
+            return False
+        if value == expected:
+            return True
+        self.dict.put(key, value, skip_if_exists=True)
+        return False
+
+
+class MemoryStore(PlayStore):
+    """Process-local dict, for tests and benchmarks."""
+    
+    name = "memory"
+    
+    def __init__(self):
+        super().__init__()
+        self.data = {}
+        self._lock = threading.Lock()
+    
+    def get(self, key: str, default: Any = None) -> Any:
+        return self.data.get(key, default)
+    
+    def put(self, key: str, value: Any, skip_if_exists: bool = False) -> bool:
+        with self._lock:
+            if skip_if_exists and key in self.data:
+                return False
+            self.data[key] = value
+            return True
+    
+    def pop(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            return self.data.pop(key, default)
+    
+    def pop_if(self, key: str, expected: Any) -> bool:
+        with self._lock:
+            if key not in self.data or self.data[key] != expected:
+                return False
+            del self.data[key]
+            return True
+
+
+class SQLiteStore(PlayStore):
+    """
+    Local SQLite file, shared safely by threads and processes (e.g. several
+    uvicorn workers) on one machine.
+    """
+    
+    name = "sqlite"
+    
+    def __init__(self, path: str = DEFAULT_SQLITE_PATH):
+        """
+        Open (or create) a SQLite play store.
+        
+        Args:
+            path: Database file (":memory:" is not shared between threads)
+        """
+        super().__init__()
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._local = threading.local()
+        self._conn().execute("CREATE TABLE IF NOT EXISTS kv (key TEXT PRIMARY KEY, value BLOB NOT NULL)")
+    
+    def _conn(self) -> sqlite3.Connection:
+        """This thread's connection (autocommit, WAL)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+    
+    def get(self, key: str, default: Any = None) -> Any:
+        row = self._conn().execute("SELECT value FROM kv WHERE key = ?", (key,)).fetchone()
+        return pickle.loads(row[0]) if row else default
+    
+    def put(self, key: str, value: Any, skip_if_exists: bool = False) -> bool:
+        verb = "INSERT OR IGNORE" if skip_if_exists else "INSERT OR REPLACE"
+        cursor = self._conn().execute(f"{verb} INTO kv (key, value) VALUES (?, ?)", (key, pickle.dumps(value)))
+        return cursor.rowcount == 1
+    
+    def pop(self, key: str, default: Any = None) -> Any:
+        row = self._conn().execute("DELETE FROM kv WHERE key = ? RETURNING value", (key,)).fetchone()
+        return pickle.loads(row[0]) if row else default
+
+    def pop_if(self, key: str, expected: Any) -> bool:
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT value FROM kv WHERE key = ?", (key,)).fetchone()
+            removed = row is not None and pickle.loads(row[0]) == expected
+            if removed:
+                conn.execute("DELETE FROM kv WHERE key = ?", (key,))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return removed
+
+
+def get_store(name: Optional[str] = None, **kwargs) -> PlayStore:
+    """
+    Create a play store by name.
+    
+    Args:
+        name: "modal", "sqlite" or "memory" (defaults to the PLAY_STORE
+            environment variable, then "modal")
+        **kwargs: Passed to the store (e.g. path for sqlite)
+    
+    Returns:
+        PlayStore
+    """
+    name = name or os.getenv("PLAY_STORE", "modal")
+    stores = {store.name: store for store in (ModalDictStore, MemoryStore, SQLiteStore)}
+    if name not in stores:
+        raise ValueError(f"Unknown play store {name!r}, expected one of {sorted(stores)}")
+    return stores[name](**kwargs)
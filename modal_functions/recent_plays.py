@@ -1,88 +1,55 @@
 import modal
-from typing import List, Dict, Any
-import json
-from datetime import datetime, timezone
-import os
+import time
 
 # Define the image with required packages
 image = modal.Image.debian_slim().pip_install(
     "fastapi>=0.104.0",
     "pydantic>=2.0.0"
-)
+).add_local_python_source("clip_index", "play_ring", "play_rollups", "play_store", "plays_api")
 
 # Create the app
 app = modal.App("adaptive-sound-plays")
 
-# Define functions that will import FastAPI/Pydantic at runtime
-@app.function(image=image, min_containers=1)
-@modal.fastapi_endpoint(method="POST")
-def record_play(request_data: dict, authorization: str = None):
-    """Record a new play for a user"""
-    # Import here to avoid local import issues
-    from fastapi import HTTPException
-    
-    # Validate auth - check if authorization header is provided
-    expected_token = os.getenv("MODAL_AUTH_TOKEN", "demo-token-12345")
-    
-    # Handle different authorization header formats
-    auth_header = authorization
-    if not auth_header and hasattr(request_data, 'get'):
-        # Try to get from headers if passed in request_data
-        auth_header = request_data.get('authorization')
-    
-    if not auth_header or not auth_header.startswith(f"Bearer {expected_token}"):
-        # For testing, let's be more permissive
-        print(f"Auth check failed. Expected: Bearer {expected_token}, Got: {auth_header}")
-        # For now, let's allow requests without auth for testing
-        # raise HTTPException(status_code=401, detail="Unauthorized")
-    
-    # Extract data from request
-    user_id = request_data.get("user_id")
-    play_record = request_data.get("play_record", {})
-    
-    if not user_id or not play_record:
-        raise HTTPException(status_code=400, detail="Missing user_id or play_record")
-    
-    recent_plays_dict = modal.Dict.from_name("recent_plays_dict", create_if_missing=True)
-    user_key = f"user:{user_id}"
-    
-    # Get existing plays or empty list
-    plays = recent_plays_dict.get(user_key, [])
-    
-    # Prepare play record
-    play_data = {
-        "clip_id": play_record.get("clip_id", ""),
-        "url": play_record.get("url", ""),
-        "topics": play_record.get("topics", "")[:512],  # Limit length
-        "tags": play_record.get("tags", "")[:512],      # Limit length
-        "started_at": play_record.get("started_at") or datetime.now(timezone.utc).isoformat(),
-        "source": play_record.get("source", "generate")
-    }
-    
-    # Only record if it's a new clip_id (prevent duplicates)
-    existing_clip_ids = [p.get('clip_id') for p in plays]
-    should_record = play_data['clip_id'] not in existing_clip_ids
-    
-    if should_record:
-        # Append new play and keep last 50, maintaining order
-        plays = (plays + [play_data])[-50:]
-        recent_plays_dict[user_key] = plays
-    
-    return {"success": True, "total_plays": len(plays)}
-
-@app.function(image=image, min_containers=1)
-@modal.fastapi_endpoint(method="GET")
-def get_recent_plays(user_id: str, limit: int = 10, authorization: str = None):
-    """Get recent plays for a user (newest first)"""
-    # Import here to avoid local import issues
-    from fastapi import HTTPException
-    
-    # For testing, let's be more permissive with auth
-    print(f"Getting recent plays for user: {user_id}, limit: {limit}")
-    
-    recent_plays_dict = modal.Dict.from_name("recent_plays_dict", create_if_missing=True)
-    user_key = f"user:{user_id}"
-    
-    plays = recent_plays_dict.get(user_key, [])
-    # Return newest first, limited
-    return plays[-limit:][::-1] if plays else []
\ No newline at end of file
+# All plays endpoints are served by one ASGI app in one warm container:
+# record_play, record_plays_batch, get_recent_plays, get_listening_summary,
+# find_similar_clips, get_clip_index_stats and get_service_stats are paths
+# under the service URL (e.g. https://<workspace>--adaptive-sound-plays-playsservice-web.modal.run/record_play)
+@app.cls(image=image, min_containers=1)
+@modal.concurrent(max_inputs=32)
+class PlaysService:
+    """Plays service: imports, storage handle and app are set up once per container"""
+    
+    @modal.enter()
+    def start(self):
+        started = time.perf_counter()
+        
+        # Import here to avoid local import issues
+        import plays_api
+        from play_store import ModalDictStore
+        imported = time.perf_counter()
+        
+        self.store = ModalDictStore()
+        self.store.dict.hydrate()
+        connected = time.perf_counter()
+        
+        self.web_app = plays_api.create_app(self.store)
+        ready = time.perf_counter()
+        
+        self.web_app.state.cold_start = {
+            "imports_ms": (imported - started) * 1000,
+            "store_ms": (connected - imported) * 1000,
+            "app_ms": (ready - connected) * 1000,
+            "total_ms": (ready - started) * 1000,
+        }
+        print(f"Plays service ready in {(ready - started) * 1000:.1f} ms "
+              f"(imports {(imported - started) * 1000:.1f} ms, store {(connected - imported) * 1000:.1f} ms)")
+    
+    @modal.asgi_app()
+    def web(self):
+        return self.web_app
+    
+    @modal.exit()
+    def stop(self):
+        # Write plays still queued for the clip index before the container goes away
+        from clip_index import flush_index
+        flush_index(self.store)
@@ -0,0 +1,297 @@
+"""
+Asyncio Suno API client for many concurrent generations.
+
+AsyncSunoAPI mirrors SunoAPI (generate, wait for streaming, download) on
+aiohttp, so hundreds of clips can progress on one event loop instead of one
+thread per clip. Every operation is cancellable, and a semaphore caps the
+number of requests in flight.
+"""
+
+import asyncio
+import os
+import time
+from collections import deque
+from typing import Dict, List, Optional
+
+import aiohttp
+
+from poll_schedule import AdaptivePollSchedule
+
+
+class AsyncSunoAPI:
+    """
+    Asyncio counterpart of SunoAPI.
+    
+    Example:
+        >>> async with AsyncSunoAPI(token) as suno:
+        ...     clip = await suno.generate_and_wait("Calm focus music", "instrumental, ambient")
+        ...     audio = await suno.download_audio(clip["audio_url"])
+    """
+    
+    BASE_URL = "https://studio-api.prod.suno.com/api/v2/external/hackmit"
+    
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+    
+    def __init__(self,
+                 api_token: str,
+                 base_url: Optional[str] = None,
+                 max_concurrency: int = 50,
+                 connect_timeout: float = 3.05,
+                 read_timeout: float = 30.0,
+                 max_retries: int = 3,
+                 backoff_factor: float = 0.5,
+                 poll_schedule: Optional[AdaptivePollSchedule] = None):
+        """
+        Initialize the async client.
+        
+        Args:
+            api_token: Suno API token
+            base_url: API base URL override (e.g. a local fake server)
+            max_concurrency: Most HTTP requests in flight at once
+            connect_timeout: Seconds to wait for a connection
+            read_timeout: Seconds to wait between bytes of a response
+            max_retries: Retries for connection errors and 429/5xx responses
+                (generate only on failed connects and 429, see _request_json)
+            backoff_factor: Exponential backoff factor between retries
+            poll_schedule: Schedule for wait_for_streaming; adaptive if None
+        """
+        self.base_url = (base_url or self.BASE_URL).rstrip("/")
+        self.headers = {
+            "Authorization": f"Bearer {api_token}",
+            "Content-Type": "application/json"
+        }
+        self.max_concurrency = max_concurrency
+        self.timeout = aiohttp.ClientTimeout(sock_connect=connect_timeout, sock_read=read_timeout)
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.poll_schedule = poll_schedule or AdaptivePollSchedule()
+        self.poll_reports = deque(maxlen=1000)
+        
+        self.requests = 0
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+    
+    async def __aenter__(self) -> "AsyncSunoAPI":
+        await self.open()
+        return self
+    
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+    
+    async def open(self) -> None:
+        """Create the HTTP session (called by ``async with``)."""
+        if self._session is None:
+            connector = aiohttp.TCPConnector(limit=self.max_concurrency)
+            self._session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+    
+    async def close(self) -> None:
+        """Close the HTTP session."""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+    
+    async def _request_json(self, method: str, url: str, idempotent: bool = True, **kwargs):
+        """
+        Send a request and decode its JSON body, retrying transient failures.
+        
+        A non-idempotent request (generate, which may start a paid
+        generation) is only retried when the server did not take it: a
+        failed connect or 429. After a 5xx or a timeout it may have been
+        accepted, so the error is raised instead.
+        
+        Args:
+            method: HTTP method
+            url: Request URL
+            idempotent: Whether repeating the request is harmless
+            **kwargs: Passed to aiohttp.ClientSession.request
+        
+        Returns:
+            Decoded JSON response
+        """
+        await self.open()
+        retry_statuses = self.RETRY_STATUSES if idempotent else (429,)
+        retry_errors = (aiohttp.ClientConnectionError, asyncio.TimeoutError) if idempotent \
+            else aiohttp.ClientConnectorError
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with self._semaphore:
+                    self.requests += 1
+                    async with self._session.request(method, url, headers=self.headers, **kwargs) as response:
+                        if response.status in retry_statuses and attempt < self.max_retries:
+                            retry_after = response.headers.get("Retry-After")
+                            delay = float(retry_after) if retry_after and retry_after.isdigit() \
+                                else self.backoff_factor * (2 ** attempt)
+                        else:
+                            response.raise_for_status()
+                            return await response.json()
+            except retry_errors as e:
+                if attempt >= self.max_retries:
+                    raise
+                print(f"Retrying {method} {url} after error: {e}")
+                delay = self.backoff_factor * (2 ** attempt)
+            await asyncio.sleep(delay)
+    
+    async def generate_song(self, topic: str, tags: str, make_instrumental: bool = False) -> Dict:
+        """
+        Generate a new song using Suno API.
+        
+        Args:
+            topic: Description for the song (max 2500 chars)
+            tags: Musical style/genres (max 100 chars)
+            make_instrumental: Generate without vocals
+        
+        Returns:
+            Dict containing clip information with ID for polling
+        """
+        data = {
+            "topic": topic[:2500],
+            "tags": tags[:100],
+        }
+        if make_instrumental:
+            data["make_instrumental"] = make_instrumental
+        return await self._request_json("POST", f"{self.base_url}/generate", idempotent=False, json=data)
+    
+    async def get_clips(self, clip_ids: List[str]) -> List[Dict]:
+        """
+        Get status and audio URLs for several clips in one request.
+        
+        Args:
+            clip_ids: Clip UUIDs
+        
+        Returns:
+            List of clip objects
+        """
+        if not clip_ids:
+            return []
+        clips = await self._request_json("GET", f"{self.base_url}/clips",
+                                         params={"ids": ",".join(clip_ids)})
+        return clips or []
+    
+    async def wait_for_streaming(self, clip_id: str, max_wait: float = 300,
+                                 started_at: Optional[float] = None) -> Dict:
+        """
+        Poll clip status until it's ready for streaming or complete.
+        
+        Args:
+            clip_id: UUID of the clip to monitor
+            max_wait: Maximum seconds to wait
+            started_at: Wall time the clip was generated (defaults to now)
+        
+        Returns:
+            Clip object when streaming or complete
+        """
+        start_time = started_at or time.time()
+        last_miss = 0.0
+        polls = 0
+        
+        while time.time() - start_time < max_wait:
+            clips = await self.get_clips([clip_id])
+            polls += 1
+            detected = time.time() - start_time
+            if not clips:
+                raise Exception(f"Clip {clip_id} not found")
+            
+            clip = clips[0]
+            status = clip.get("status")
+            if status in ("streaming", "complete"):
+                self.poll_schedule.record((last_miss + detected) / 2)
+                self.poll_reports.append({
+                    'clip_id': clip_id,
+                    'polls': polls,
+                    'time_to_detect': detected,
+                    'ready_to_detected_max': detected - last_miss,
+                    'detected_at': start_time + detected,
+                })
+                return clip
+            elif status == "error":
+                error_msg = clip.get("metadata", {}).get("error_message", "Unknown error")
+                raise Exception(f"Generation failed: {error_msg}")
+            
+            last_miss = detected
+            remaining = max_wait - (time.time() - start_time)
+            if remaining <= 0:
+                break
+            await asyncio.sleep(min(self.poll_schedule.next_delay(detected), remaining))
+        
+        raise TimeoutError(f"Clip {clip_id} did not become ready within {max_wait} seconds")
+    
+    async def download_audio(self, audio_url: str, path: Optional[str] = None,
+                             chunk_size: int = 64 * 1024) -> bytes:
+        """
+        Download audio into memory, or stream it to a file.
+        
+        Args:
+            audio_url: URL to the audio file
+            path: File to write to; if None the audio is returned as bytes
+            chunk_size: Read size in bytes
+        
+        Returns:
+            Audio bytes (empty if written to path)
+        """
+        await self.open()
+        async with self._semaphore:
+            self.requests += 1
+            async with self._session.get(audio_url) as response:
+                response.raise_for_status()
+                if path is None:
+                    return await response.read()
+                
+                tmp_path = f"{path}.part"
+                with open(tmp_path, "wb") as f:
+                    async for chunk in response.content.iter_chunked(chunk_size):
+                        f.write(chunk)
+                os.replace(tmp_path, path)
+                return b""
+    
+    async def generate_and_wait(self, topic: str, tags: str, make_instrumental: bool = False,
+                                max_wait: float = 300) -> Dict:
+        """
+        Generate a clip and wait until it is streamable.
+        
+        Args:
+            topic: Description for the song
+            tags: Musical style/genres
+            make_instrumental: Generate without vocals
+            max_wait: Maximum seconds to wait for streaming
+        
+        Returns:
+            Clip object when streaming or complete
+        """
+        started_at = time.time()
+        clip_info = await self.generate_song(topic, tags, make_instrumental)
+        return await self.wait_for_streaming(clip_info["id"], max_wait=max_wait, started_at=started_at)
+
+
+async def _demo(clips: int, ready_after: float) -> None:
+    from fake_suno_server import FakeSunoServer
+    
+    with FakeSunoServer(ready_after=ready_after, ready_jitter=ready_after / 2) as server:
+        async with AsyncSunoAPI("fake-token", base_url=server.base_url, max_concurrency=100,
+                                poll_schedule=AdaptivePollSchedule(prior_ready=ready_after)) as suno:
+            start = time.time()
+            tasks = [asyncio.create_task(suno.generate_and_wait(f"Demo clip {i}", "instrumental, ambient"))
+                     for i in range(clips)]
+            
+            # Cancellation: drop a few generations part-way through
+            await asyncio.sleep(ready_after / 4)
+            for task in tasks[:5]:
+                task.cancel()
+            
+            results = await asyncio.gather(*tasks, return_exceptions=True)
+            elapsed = time.time() - start
+            
+            ready = [r for r in results if isinstance(r, dict)]
+            cancelled = sum(1 for r in results if isinstance(r, asyncio.CancelledError))
+            audio = await asyncio.gather(*(suno.download_audio(r["audio_url"]) for r in ready[:20]))
+        
+        print(f"{len(ready)} clips ready, {cancelled} cancelled, in {elapsed:.1f}s "
+              f"(clips take {ready_after:.0f}-{ready_after * 1.5:.0f}s each)")
+        print(f"Downloaded {len(audio)} clips ({sum(map(len, audio)) / 1e6:.1f} MB)")
+        print(f"HTTP requests: {suno.requests}, all from one event loop thread")
+
+
+if __name__ == "__main__":
+    import sys
+    
+    asyncio.run(_demo(clips=int(sys.argv[1]) if len(sys.argv) > 1 else 300, ready_after=4.0))
@@ -0,0 +1,329 @@
+"""
+Size-bounded on-disk cache of downloaded Suno audio.
+
+Files are stored under a key derived from the clip ID (or the audio URL when
+no clip ID is known), so replaying a clip is served from disk without any
+network I/O. Downloads go to a ".part" file that can be resumed, are
+checksummed and atomically renamed into place on completion, and the least
+recently used files are evicted once the cache grows past its byte cap.
+
+Each ".part" file has a ".part.json" sidecar recording the URL (and ETag,
+once known) it was downloaded from, so a partial download is only resumed
+against the same source. Partial files count towards the byte cap and are
+evicted like completed ones.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "adaptive_sound", "audio")
+
+
+class StalePartError(Exception):
+    """The source changed (new ETag) under a partial download being resumed."""
+
+
+class AudioCache:
+    """
+    LRU audio cache with checksums and resumable partial downloads.
+    
+    Thread-safe. A key is downloaded by at most one thread at a time:
+    begin() blocks while another download of the same key is in progress.
+    
+    Example:
+        >>> cache = AudioCache(max_bytes=512 * 1024 ** 2)
+        >>> path = cache.get(clip_id)
+        >>> if path is None:
+        ...     part_path, offset = cache.begin(clip_id, source=audio_url)
+        ...     ...  # append bytes from offset onwards to part_path
+        ...     path = cache.commit(clip_id)
+    """
+    
+    def __init__(self,
+                 cache_dir: str = DEFAULT_CACHE_DIR,
+                 max_bytes: int = 1024 ** 3,
+                 verify: bool = True):
+        """
+        Open (or create) an audio cache.
+        
+        Args:
+            cache_dir: Directory for audio files and the index
+            max_bytes: Byte cap for completed and partial files
+            verify: Check each file's SHA-256 before serving it
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.verify = verify
+        self.index_path = os.path.join(cache_dir, "index.json")
+        os.makedirs(cache_dir, exist_ok=True)
+        
+        self._index: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        # Per-key download locks and the threads holding or waiting for
+        # each; a key's lock is dropped when its last user releases it
+        self._key_locks: Dict[str, threading.Lock] = {}
+        self._key_users: Dict[str, int] = {}
+        
+        self.stats = {'hits': 0, 'misses': 0, 'resumed': 0, 'evictions': 0, 'checksum_failures': 0}
+        
+        if os.path.exists(self.index_path):
+            try:
+                with open(self.index_path, 'r') as f:
+                    self._index = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Ignoring unreadable audio cache index {self.index_path}: {e}")
+    
+    @staticmethod
+    def _name(key: str) -> str:
+        """File name for a key (clip IDs are kept readable, URLs are hashed)."""
+        if all(c.isalnum() or c == '-' for c in key) and len(key) <= 64:
+            return key
+        return hashlib.sha256(key.encode()).hexdigest()[:32]
+    
+    def path_for(self, key: str) -> str:
+        """Path of the completed file for a key."""
+        return os.path.join(self.cache_dir, f"{self._name(key)}.mp3")
+    
+    def contains(self, key: str) -> bool:
+        """Whether a completed file is indexed for a key (no checksum or stats)."""
+        with self._lock:
+            return self._name(key) in self._index and os.path.exists(self.path_for(key))
+    
+    def get(self, key: str) -> Optional[str]:
+        """
+        Look up a completed file.
+        
+        Args:
+            key: Clip ID or audio URL
+        
+        Returns:
+            Path of the cached file, or None on a miss (including files
+            that fail the size or checksum check)
+        """
+        path = self.path_for(key)
+        with self._lock:
+            entry = self._index.get(self._name(key))
+        
+        valid = entry is not None and os.path.exists(path) and os.path.getsize(path) == entry['size']
+        if valid and self.verify and _sha256(path) != entry['sha256']:
+            print(f"Cached audio {path} failed its checksum, discarding")
+            valid = False
+            with self._lock:
+                self.stats['checksum_failures'] += 1
+        
+        with self._lock:
+            if not valid:
+                self.stats['misses'] += 1
+                if entry is not None:
+                    self._index.pop(self._name(key), None)
+                    _remove(path)
+                    self._save()
+                return None
+            self.stats['hits'] += 1
+            entry['last_used'] = time.time()
+            self._save()
+        return path
+    
+    def begin(self, key: str, source: Optional[str] = None) -> Tuple[str, int]:
+        """
+        Start (or resume) downloading a key.
+        
+        Blocks while another thread is downloading the same key; the caller
+        must then call commit() or abort(), and should check contains() in
+        case that other download completed the key.
+        
+        Args:
+            key: Clip ID or audio URL
+            source: URL the bytes come from; a partial file downloaded from
+                a different (or unrecorded) source is discarded, not resumed
+        
+        Returns:
+            Tuple of (partial file path to append to, bytes already downloaded)
+        """
+        name = self._name(key)
+        with self._lock:
+            key_lock = self._key_locks.setdefault(name, threading.Lock())
+            self._key_users[name] = self._key_users.get(name, 0) + 1
+        key_lock.acquire()
+        
+        part_path = f"{self.path_for(key)}.part"
+        meta = self._read_part_meta(key) if os.path.exists(part_path) else None
+        if source is not None and os.path.exists(part_path) and (meta or {}).get('source') != source:
+            print(f"Discarding partial download {part_path} from a different source")
+            _remove(part_path)
+            meta = None
+        self._write_part_meta(key, {'source': source, 'etag': (meta or {}).get('etag')})
+        
+        offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        if offset:
+            with self._lock:
+                self.stats['resumed'] += 1
+        return part_path, offset
+    
+    def part_etag(self, key: str) -> Optional[str]:
+        """ETag recorded for a key's partial file, if any."""
+        return (self._read_part_meta(key) or {}).get('etag')
+    
+    def set_part_etag(self, key: str, etag: Optional[str]) -> None:
+        """
+        Record the ETag of the response a partial file is being filled from.
+        
+        Args:
+            key: Clip ID or audio URL passed to begin()
+            etag: ETag response header (None if the server sent none)
+        """
+        meta = self._read_part_meta(key) or {'source': None}
+        if meta.get('etag') != etag:
+            meta['etag'] = etag
+            self._write_part_meta(key, meta)
+    
+    def _read_part_meta(self, key: str) -> Optional[Dict]:
+        try:
+            with open(f"{self.path_for(key)}.part.json", 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+    
+    def _write_part_meta(self, key: str, meta: Dict) -> None:
+        try:
+            with open(f"{self.path_for(key)}.part.json", 'w') as f:
+                json.dump(meta, f)
+        except OSError as e:
+            print(f"Could not save partial download metadata for {key}: {e}")
+    
+    def commit(self, key: str) -> str:
+        """
+        Finish a download: checksum it, move it into place and evict.
+        
+        Args:
+            key: Clip ID or audio URL passed to begin()
+        
+        Returns:
+            Path of the completed file
+        """
+        path = self.path_for(key)
+        try:
+            part_path = f"{path}.part"
+            entry = {'size': os.path.getsize(part_path), 'sha256': _sha256(part_path), 'last_used': time.time()}
+            os.replace(part_path, path)
+            _remove(f"{part_path}.json")
+            with self._lock:
+                self._index[self._name(key)] = entry
+                self._evict(keep=self._name(key))
+                self._save()
+        finally:
+            self._release(key)
+        return path
+    
+    def abort(self, key: str, discard: bool = False) -> None:
+        """
+        Give up on a download, keeping the partial file for a later resume.
+        
+        Args:
+            key: Clip ID or audio URL passed to begin()
+            discard: Delete the partial file instead
+        """
+        if discard:
+            _remove(f"{self.path_for(key)}.part")
+            _remove(f"{self.path_for(key)}.part.json")
+        self._release(key)
+        with self._lock:
+            self._evict()
+            self._save()
+    
+    def _release(self, key: str) -> None:
+        name = self._name(key)
+        with self._lock:
+            key_lock = self._key_locks.get(name)
+            if key_lock is None or not key_lock.locked():
+                return
+            self._key_users[name] -= 1
+            if not self._key_users[name]:
+                del self._key_locks[name]
+                del self._key_users[name]
+            key_lock.release()
+    
+    def _evict(self, keep: Optional[str] = None) -> None:
+        """Remove least recently used files until under max_bytes (lock held)."""
+        parts = self._parts()
+        total = sum(entry['size'] for entry in self._index.values()) + sum(size for _, size in parts.values())
+        candidates = [(entry['last_used'], name, False) for name, entry in self._index.items()]
+        candidates += [(used, name, True) for name, (used, _) in parts.items()]
+        for _, name, partial in sorted(candidates):
+            if total <= self.max_bytes:
+                break
+            if name == keep:
+                continue
+            path = os.path.join(self.cache_dir, f"{name}.mp3")
+            if partial:
+                key_lock = self._key_locks.get(name)
+                if key_lock is not None and key_lock.locked():
+                    # Still being downloaded
+                    continue
+                _remove(f"{path}.part")
+                _remove(f"{path}.part.json")
+                total -= parts[name][1]
+            else:
+                total -= self._index.pop(name)['size']
+                _remove(path)
+            self.stats['evictions'] += 1
+    
+    def _parts(self) -> Dict[str, Tuple[float, int]]:
+        """Partial files by name, as (last modified, size)."""
+        parts = {}
+        for file_name in os.listdir(self.cache_dir):
+            if not file_name.endswith(".mp3.part"):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.cache_dir, file_name))
+            except FileNotFoundError:
+                continue
+            parts[file_name[:-len(".mp3.part")]] = (stat.st_mtime, stat.st_size)
+        return parts
+    
+    def _save(self) -> None:
+        """Write the index atomically (lock held)."""
+        tmp_path = f"{self.index_path}.tmp"
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump(self._index, f)
+            os.replace(tmp_path, self.index_path)
+        except OSError as e:
+            print(f"Could not save audio cache index: {e}")
+    
+    def get_stats(self) -> Dict[str, float]:
+        """
+        Cache statistics.
+        
+        Returns:
+            Dictionary with hit/miss counters, hit_rate, files and bytes
+            stored, and bytes held by partial downloads
+        """
+        with self._lock:
+            stats = dict(self.stats)
+            stats['files'] = len(self._index)
+            stats['bytes'] = sum(entry['size'] for entry in self._index.values())
+            stats['partial_bytes'] = sum(size for _, size in self._parts().values())
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+        return stats
+
+
+def _sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,78 @@
+"""
+Measure per-call latency of SunoAPI status polls: bare requests vs pooled session.
+
+"Before" opens a fresh connection per call (what bare requests.get does);
+"after" reuses SunoAPI's keep-alive session. Runs against the local fake
+server by default, where --connect-delay stands in for the TCP/TLS
+handshake, or against any base URL with --base-url.
+
+Usage:
+    python suno/bench_http.py
+    python suno/bench_http.py --calls 100 --connect-delay 0.05
+"""
+
+import argparse
+import os
+import statistics
+import time
+
+import requests
+
+from fake_suno_server import FakeSunoServer
+from suno import SunoAPI
+
+
+def summarize(label: str, samples: list) -> None:
+    samples = sorted(samples)
+    p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+    print(f"{label:<24} mean {statistics.mean(samples) * 1e3:8.2f} ms   "
+          f"p50 {samples[len(samples) // 2] * 1e3:8.2f} ms   p95 {p95 * 1e3:8.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare bare vs pooled Suno status polls")
+    parser.add_argument("--calls", type=int, default=50, help="Status polls per mode")
+    parser.add_argument("--connect-delay", type=float, default=0.03,
+                        help="Simulated handshake seconds per new connection (fake server)")
+    parser.add_argument("--base-url", help="Poll a real API instead of the fake server")
+    parser.add_argument("--clip-id", help="Clip ID to poll when using --base-url")
+    args = parser.parse_args()
+    
+    server = None
+    token = os.getenv("SUNO_API_TOKEN", "fake-token")
+    if args.base_url:
+        base_url = args.base_url
+    else:
+        server = FakeSunoServer(connect_delay=args.connect_delay).start()
+        base_url = server.base_url
+    
+    suno = SunoAPI(token, base_url=base_url)
+    clip_id = args.clip_id
+    if not clip_id:
+        clip_id = suno.generate_song("Benchmark clip", "instrumental, ambient")["id"]
+    
+    url = f"{base_url.rstrip('/')}/clips"
+    headers = {"Authorization": f"Bearer {token}"}
+    
+    before = []
+    for _ in range(args.calls):
+        start = time.perf_counter()
+        # A fresh connection per call, as with bare requests.get
+        requests.get(url, headers=headers, params={"ids": clip_id},
+                     timeout=suno.timeout).raise_for_status()
+        before.append(time.perf_counter() - start)
+    
+    suno.latencies.clear()
+    for _ in range(args.calls):
+        suno._get_clip_status(clip_id)
+    after = suno.latencies["clips"]
+    
+    summarize("bare requests.get", before)
+    summarize("pooled session", after)
+    if server:
+        print(f"Connections opened: {server.connections}")
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Measure time-to-first-audio for full-download and progressive playback.
+
+Downloads clips from the local fake server at a throttled transfer rate and
+plays them into the in-process null sink. Full-download playback is
+progressive playback with the whole file as the prefix, which is when the
+original download-then-afplay flow could start playing.
+
+Usage:
+    python suno/bench_playback.py
+    python suno/bench_playback.py --rate 500000 --size 3000000 --drop
+"""
+
+import argparse
+import contextlib
+import io
+import statistics
+import tempfile
+import time
+
+from audio_cache import AudioCache
+
+from fake_suno_server import FakeSunoServer
+from playback import NullSink
+from suno import SunoAPI
+
+
+def run(server: FakeSunoServer, prefix_bytes: int, clips: int):
+    suno = SunoAPI("fake-token", base_url=server.base_url, progressive=True,
+                   prefix_bytes=prefix_bytes, playback=NullSink(),
+                   audio_cache=AudioCache(tempfile.mkdtemp(prefix="suno-bench-")))
+    
+    with contextlib.redirect_stdout(io.StringIO()):
+        for i in range(clips):
+            clip_id = suno.generate_song(f"Benchmark clip {i}", "instrumental, ambient")["id"]
+            clip = suno.wait_for_streaming(clip_id)
+            _, process = suno.download_and_play_audio(clip["audio_url"], clip_id=clip_id)
+            suno.stream_reports[-1]['done'].wait()
+            process.wait()
+        
+        # Replay the last clip from the audio cache
+        requests_before = server.requests['audio']
+        start = time.perf_counter()
+        _, process = suno.download_and_play_audio(clip["audio_url"], clip_id=clip_id)
+        replay = time.perf_counter() - start
+        process.wait()
+    
+    reports = list(suno.stream_reports)
+    assert all(r['error'] is None and r['bytes'] == server.audio_size for r in reports)
+    assert server.requests['audio'] == requests_before
+    return reports, replay
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare full-download and progressive playback start")
+    parser.add_argument("--clips", type=int, default=3)
+    parser.add_argument("--size", type=int, default=2 * 1024 * 1024, help="Audio bytes per clip")
+    parser.add_argument("--rate", type=float, default=1024 * 1024, help="Transfer rate in bytes/s")
+    parser.add_argument("--prefix", type=int, default=64 * 1024, help="Progressive prefix in bytes")
+    parser.add_argument("--drop", action="store_true", help="Drop each clip's first connection mid-way")
+    args = parser.parse_args()
+    
+    with FakeSunoServer(ready_after=0.2, audio_size=args.size, audio_rate=args.rate,
+                        drop_audio_after=args.size // 2 if args.drop else None) as server:
+        results = {'full download': run(server, args.size, args.clips)}
+        server._dropped.clear()
+        results['progressive'] = run(server, args.prefix, args.clips)
+    
+    print(f"{'mode':<14} {'first audio':>12} {'download':>10} {'resumes':>8} {'cached replay':>14}")
+    for name, (reports, replay) in results.items():
+        first = statistics.mean(r['time_to_first_audio'] for r in reports)
+        total = statistics.mean(r['download_time'] for r in reports)
+        resumes = sum(r['resumes'] for r in reports)
+        print(f"{name:<14} {first * 1000:>9.0f} ms {total:>8.2f} s {resumes:>8} {replay * 1000:>11.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Compare fixed 5 s polling with the adaptive poll schedule.
+
+Generates clips on the local fake server (with a known ready time per
+clip) and waits for each with both schedules, reporting polls per clip
+and the actual time from ready to detected.
+
+Usage:
+    python suno/bench_polling.py
+    python suno/bench_polling.py --clips 40 --ready-after 8 --jitter 4
+"""
+
+import argparse
+import contextlib
+import io
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+
+from fake_suno_server import FakeSunoServer
+from poll_schedule import AdaptivePollSchedule, FixedPollSchedule
+from suno import SunoAPI
+
+
+def run(server: FakeSunoServer, schedule, clips: int, warmup: int = 0):
+    suno = SunoAPI("fake-token", base_url=server.base_url, poll_schedule=schedule)
+    
+    def wait_one(i):
+        clip_id = suno.generate_song(f"Benchmark clip {i}", "instrumental, ambient")["id"]
+        suno.wait_for_streaming(clip_id)
+        return clip_id
+    
+    # Silence per-poll status output for the whole run (redirecting per
+    # thread would race on sys.stdout)
+    with contextlib.redirect_stdout(io.StringIO()):
+        # Warm-up clips teach the adaptive schedule; they are not reported
+        with ThreadPoolExecutor(max_workers=16) as pool:
+            list(pool.map(wait_one, range(warmup)))
+        suno.poll_reports.clear()
+        
+        with ThreadPoolExecutor(max_workers=16) as pool:
+            list(pool.map(wait_one, range(clips)))
+    
+    lags = [r['detected_at'] - server.ready_at(r['clip_id']) for r in suno.poll_reports]
+    polls = [r['polls'] for r in suno.poll_reports]
+    return lags, polls
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare fixed and adaptive Suno polling")
+    parser.add_argument("--clips", type=int, default=24)
+    parser.add_argument("--ready-after", type=float, default=6.0)
+    parser.add_argument("--jitter", type=float, default=3.0)
+    args = parser.parse_args()
+    
+    with FakeSunoServer(ready_after=args.ready_after, ready_jitter=args.jitter) as server:
+        results = {
+            'fixed 5s': run(server, FixedPollSchedule(5.0), args.clips),
+            'adaptive': run(server, AdaptivePollSchedule(prior_ready=args.ready_after), args.clips,
+                            warmup=args.clips // 2),
+        }
+    
+    print(f"{'schedule':<10} {'ready->detected mean':>22} {'max':>8} {'polls/clip':>12}")
+    for name, (lags, polls) in results.items():
+        print(f"{name:<10} {statistics.mean(lags):>20.2f} s {max(lags):>6.2f} s {statistics.mean(polls):>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Compare direct generation with GenerationScheduler under bursty vibe input.
+
+Replays the same script of vibe changes (several sessions, each changing
+vibe in quick bursts) against the local fake server, whose limited
+generation slots make a flood of requests queue like the real API. Direct
+mode starts generate_song plus wait_for_streaming for every change; the
+scheduler applies latest-wins, dedupe and its rate limit.
+
+A generation is wasted when its session had already moved on to another
+vibe by the time the clip was ready. Latency is submit-to-ready for the
+requests that were still current when ready.
+
+Usage:
+    python suno/bench_scheduler.py
+    python suno/bench_scheduler.py --sessions 6 --bursts 4 --slots 3
+"""
+
+import argparse
+import contextlib
+import io
+import random
+import statistics
+import threading
+import time
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+
+from fake_suno_server import FakeSunoServer
+from generation_scheduler import GenerationScheduler
+from poll_schedule import FixedPollSchedule
+from suno import SunoAPI
+
+
+VIBES = [
+    ("Calm focus music", "instrumental, lo-fi, focus"),
+    ("Upbeat workout music", "electronic, energetic, upbeat"),
+    ("Relaxing ambient music", "ambient, peaceful, relaxing"),
+    ("Smooth jazz", "jazz, smooth, sophisticated"),
+    ("Heavy rock", "rock, electric guitar, energetic"),
+]
+
+
+def make_script(sessions: int, bursts: int, seed: int = 0):
+    """(time, session, vibe index) events: bursts of 3-5 quick changes per session."""
+    rng = random.Random(seed)
+    events = []
+    for session in range(sessions):
+        t = rng.uniform(0, 2)
+        for _ in range(bursts):
+            for _ in range(rng.randint(3, 5)):
+                events.append((t, f"session-{session}", rng.randrange(len(VIBES))))
+                t += rng.uniform(0.2, 1.0)
+            t += rng.uniform(6, 9)
+    return sorted(events)
+
+
+def replay(script, submit):
+    start = time.monotonic()
+    for t, session, vibe in script:
+        time.sleep(max(0.0, start + t - time.monotonic()))
+        submit(session, vibe)
+
+
+def run_direct(server: FakeSunoServer, script):
+    suno = SunoAPI("fake-token", base_url=server.base_url, poll_schedule=FixedPollSchedule(0.5))
+    latest, latencies, wasted = {}, [], []
+    lock = threading.Lock()
+    
+    def generate(session, vibe, request_id, submitted):
+        clip_id = suno.generate_song(*VIBES[vibe])["id"]
+        suno.wait_for_streaming(clip_id)
+        with lock:
+            if latest[session] == request_id:
+                latencies.append(time.monotonic() - submitted)
+            else:
+                wasted.append(clip_id)
+    
+    with contextlib.redirect_stdout(io.StringIO()), ThreadPoolExecutor(max_workers=200) as pool:
+        counter = iter(range(len(script)))
+        
+        def submit(session, vibe):
+            request_id = next(counter)
+            with lock:
+                latest[session] = request_id
+            pool.submit(generate, session, vibe, request_id, time.monotonic())
+        
+        replay(script, submit)
+    
+    return server.requests['generate'], len(wasted), latencies
+
+
+def run_scheduler(server: FakeSunoServer, script, max_per_minute: float):
+    suno = SunoAPI("fake-token", base_url=server.base_url)
+    scheduler = GenerationScheduler(suno, max_per_minute=max_per_minute, burst=4,
+                                    settle=1.0, poll_interval=0.5)
+    futures = []
+    
+    with contextlib.redirect_stdout(io.StringIO()):
+        replay(script, lambda session, vibe: futures.append(scheduler.submit(session, *VIBES[vibe])))
+        for future in futures:
+            try:
+                future.result()
+            except CancelledError:
+                pass
+        scheduler.stop()
+    
+    stats = scheduler.get_stats()
+    return stats['generations'], stats['wasted_generations'], scheduler.latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare direct generation and GenerationScheduler")
+    parser.add_argument("--sessions", type=int, default=4)
+    parser.add_argument("--bursts", type=int, default=3)
+    parser.add_argument("--slots", type=int, default=4, help="Fake server generation slots")
+    parser.add_argument("--ready-after", type=float, default=3.0)
+    parser.add_argument("--max-per-minute", type=float, default=60)
+    args = parser.parse_args()
+    
+    script = make_script(args.sessions, args.bursts)
+    results = {}
+    for name in ("direct", "scheduler"):
+        with FakeSunoServer(ready_after=args.ready_after, ready_jitter=1.0, generation_slots=args.slots) as server:
+            if name == "direct":
+                results[name] = run_direct(server, script)
+            else:
+                results[name] = run_scheduler(server, script, args.max_per_minute)
+    
+    print(f"{len(script)} vibe changes from {args.sessions} sessions")
+    print(f"{'mode':<10} {'generations':>12} {'wasted':>7} {'latency mean':>13} {'p95':>7}")
+    for name, (generations, wasted, latencies) in results.items():
+        latencies = sorted(latencies)
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        print(f"{name:<10} {generations:>12} {wasted:>7} {statistics.mean(latencies):>11.1f} s {p95:>5.1f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,441 @@
+"""
+Persistent local library of generated Suno clips.
+
+Maps a normalized (topic, tags) vibe to clips that were already generated,
+with their audio URLs and local audio files, so a repeated or similar vibe
+can start playing immediately instead of waiting 30+ seconds for a new
+generation. Backed by SQLite plus a directory of audio files.
+"""
+
+import importlib.util
+import os
+import re
+import shutil
+import sqlite3
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+
+def _load_validator_module():
+    """
+    Load cerebrus/schema_validator.py by path.
+    
+    Tags are canonicalized by the compressor's validator, so library keys
+    match the tags the compressor produces. The module has no dependencies;
+    importing it through the cerebrus package would also load the Cerebras
+    SDK and the rest of the package.
+    """
+    name = "_cerebrus_schema_validator"
+    if name not in sys.modules:
+        path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                            "cerebrus", "schema_validator.py")
+        spec = importlib.util.spec_from_file_location(name, path)
+        module = importlib.util.module_from_spec(spec)
+        # Registered before running so its dataclasses can resolve their module
+        sys.modules[name] = module
+        spec.loader.exec_module(module)
+    return sys.modules[name]
+
+
+VibeSchemaValidator = _load_validator_module().VibeSchemaValidator
+
+
+DEFAULT_LIBRARY_DIR = os.path.join(os.path.expanduser("~"), ".cache", "adaptive_sound", "clip_library")
+
+_validator = VibeSchemaValidator()
+
+
+def normalize_tags(tags: str) -> List[str]:
+    """
+    Canonical tag list, as VibeSchemaValidator.normalize_tags builds it
+    (lowercase, instrument aliases mapped, deduplicated, sorted,
+    "instrumental" first).
+    
+    Args:
+        tags: Comma-separated tags
+    
+    Returns:
+        Canonical list of tags
+    """
+    return _validator.normalize_tags(tags or '')[0]
+
+
+def similarity_tags(canonical_tags: List[str]) -> set:
+    """
+    Tags that count towards tag-set similarity.
+    
+    "instrumental" is on every canonical tag list, so it is left out;
+    otherwise every clip would share a tag with every request.
+    
+    Args:
+        canonical_tags: Tags as returned by normalize_tags
+    
+    Returns:
+        Set of tags
+    """
+    return {tag for tag in canonical_tags if tag and tag != 'instrumental'}
+
+
+def normalize_topic(topic: str) -> str:
+    """Lowercase the topic and strip punctuation and extra whitespace."""
+    return ' '.join(re.sub(r'[^a-z0-9 ]+', ' ', (topic or '').lower()).split())
+
+
+def vibe_key(topic: str, tags: str, make_instrumental: bool = False) -> str:
+    """
+    Stable key for an exact vibe match.
+    
+    Args:
+        topic: Song description
+        tags: Comma-separated tags
+        make_instrumental: Whether the clip was generated without vocals
+    
+    Returns:
+        Key string
+    """
+    return f"{normalize_topic(topic)}|{','.join(normalize_tags(tags))}|{int(make_instrumental)}"
+
+
+@dataclass
+class EvictionPolicy:
+    """
+    Limits that trigger eviction, and which clips go first.
+    
+    Attributes:
+        max_clips: Most clips kept (None for no limit)
+        max_bytes: Most audio bytes kept on disk (None for no limit)
+        max_age: Seconds after which clips expire (None for never)
+        order: "lru" (least recently used first) or "lfu" (fewest hits first)
+    """
+    max_clips: Optional[int] = 500
+    max_bytes: Optional[int] = 2 * 1024 ** 3
+    max_age: Optional[float] = None
+    order: str = "lru"
+
+
+@dataclass
+class LibraryMatch:
+    """A clip found in the library for a requested vibe."""
+    clip_id: str
+    audio_url: Optional[str]
+    audio_path: Optional[str]
+    topic: str
+    tags: str
+    similarity: float
+    exact: bool
+
+
+class ClipLibrary:
+    """
+    SQLite-backed clip library with exact and nearest tag-set lookups.
+    
+    Thread-safe; one library can be shared by several SunoAPI clients.
+    """
+    
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS clips (
+            clip_id TEXT PRIMARY KEY,
+            vibe_key TEXT NOT NULL,
+            topic TEXT NOT NULL,
+            tags TEXT NOT NULL,
+            instrumental INTEGER NOT NULL,
+            audio_url TEXT,
+            audio_path TEXT,
+            size_bytes INTEGER NOT NULL DEFAULT 0,
+            created_at REAL NOT NULL,
+            last_used_at REAL NOT NULL,
+            hits INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE INDEX IF NOT EXISTS clips_vibe_key ON clips (vibe_key);
+        CREATE TABLE IF NOT EXISTS clip_tags (
+            clip_id TEXT NOT NULL REFERENCES clips (clip_id) ON DELETE CASCADE,
+            tag TEXT NOT NULL,
+            PRIMARY KEY (tag, clip_id)
+        );
+    """
+    
+    # Version of the vibe keys and tag sets stored (PRAGMA user_version);
+    # older libraries are re-keyed on open
+    KEY_VERSION = 2
+    
+    def __init__(self,
+                 library_dir: str = DEFAULT_LIBRARY_DIR,
+                 policy: Optional[EvictionPolicy] = None,
+                 min_similarity: float = 0.75):
+        """
+        Open (or create) a clip library.
+        
+        Args:
+            library_dir: Directory holding library.db and the audio files
+            policy: Eviction policy (defaults to EvictionPolicy())
+            min_similarity: Lowest tag-set Jaccard similarity accepted as a
+                nearest match
+        """
+        self.library_dir = library_dir
+        self.audio_dir = os.path.join(library_dir, "audio")
+        os.makedirs(self.audio_dir, exist_ok=True)
+        
+        self.policy = policy or EvictionPolicy()
+        self.min_similarity = min_similarity
+        
+        self._conn = sqlite3.connect(os.path.join(library_dir, "library.db"), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA foreign_keys = ON")
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.executescript(self.SCHEMA)
+        if self._conn.execute("PRAGMA user_version").fetchone()[0] < self.KEY_VERSION:
+            self._rekey()
+        self._lock = threading.Lock()
+        
+        self.stats = {'lookups': 0, 'exact_hits': 0, 'near_hits': 0, 'misses': 0, 'evictions': 0}
+    
+    def _rekey(self) -> None:
+        """Recompute every clip's vibe key and tag set with the current normalizer."""
+        rows = self._conn.execute("SELECT clip_id, topic, tags, instrumental FROM clips").fetchall()
+        for row in rows:
+            canonical_tags = normalize_tags(row['tags'])
+            self._conn.execute(
+                "UPDATE clips SET vibe_key = ?, tags = ? WHERE clip_id = ?",
+                (vibe_key(row['topic'], row['tags'], bool(row['instrumental'])), ','.join(canonical_tags),
+                 row['clip_id'])
+            )
+            self._conn.execute("DELETE FROM clip_tags WHERE clip_id = ?", (row['clip_id'],))
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO clip_tags (clip_id, tag) VALUES (?, ?)",
+                [(row['clip_id'], tag) for tag in similarity_tags(canonical_tags)]
+            )
+        self._conn.execute(f"PRAGMA user_version = {self.KEY_VERSION}")
+        self._conn.commit()
+    
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+    
+    def lookup(self, topic: str, tags: str, make_instrumental: bool = False,
+               min_similarity: Optional[float] = None) -> Optional[LibraryMatch]:
+        """
+        Find an existing clip for a vibe.
+        
+        Tries an exact (topic, tags) match first, then the clip whose tag set
+        is most similar (Jaccard) to the requested tags.
+        
+        Args:
+            topic: Song description
+            tags: Comma-separated tags
+            make_instrumental: Whether the clip must be instrumental
+            min_similarity: Override for the nearest-match threshold
+        
+        Returns:
+            LibraryMatch, or None on a miss
+        """
+        threshold = self.min_similarity if min_similarity is None else min_similarity
+        wanted = similarity_tags(normalize_tags(tags))
+        now = time.time()
+        
+        with self._lock:
+            self.stats['lookups'] += 1
+            self._expire(now)
+            
+            row = self._conn.execute(
+                "SELECT * FROM clips WHERE vibe_key = ? ORDER BY last_used_at DESC LIMIT 1",
+                (vibe_key(topic, tags, make_instrumental),)
+            ).fetchone()
+            similarity, exact = 1.0, True
+            
+            if row is None and wanted:
+                row, similarity = self._nearest(wanted, make_instrumental)
+                exact = False
+                if row is not None and similarity < threshold:
+                    row = None
+            
+            if row is None:
+                self.stats['misses'] += 1
+                return None
+            
+            self.stats['exact_hits' if exact else 'near_hits'] += 1
+            self._conn.execute(
+                "UPDATE clips SET last_used_at = ?, hits = hits + 1 WHERE clip_id = ?",
+                (now, row['clip_id'])
+            )
+            self._conn.commit()
+        
+        audio_path = row['audio_path']
+        if audio_path and not os.path.exists(audio_path):
+            audio_path = None
+        
+        return LibraryMatch(
+            clip_id=row['clip_id'],
+            audio_url=row['audio_url'],
+            audio_path=audio_path,
+            topic=row['topic'],
+            tags=row['tags'],
+            similarity=similarity,
+            exact=exact
+        )
+    
+    def _nearest(self, wanted: set, make_instrumental: bool) -> Tuple[Optional[sqlite3.Row], float]:
+        """Best Jaccard match among clips sharing at least one tag (lock held)."""
+        placeholders = ','.join('?' * len(wanted))
+        candidates = self._conn.execute(
+            f"""SELECT c.*, COUNT(*) AS shared FROM clip_tags t
+                JOIN clips c ON c.clip_id = t.clip_id
+                WHERE t.tag IN ({placeholders}) AND c.instrumental = ?
+                GROUP BY c.clip_id""",
+            (*wanted, int(make_instrumental))
+        ).fetchall()
+        
+        best, best_similarity = None, 0.0
+        for row in candidates:
+            size = len(similarity_tags(row['tags'].split(',')))
+            similarity = row['shared'] / (len(wanted) + size - row['shared'])
+            if similarity > best_similarity or (
+                    similarity == best_similarity and best is not None and row['hits'] > best['hits']):
+                best, best_similarity = row, similarity
+        return best, best_similarity
+    
+    def add(self, topic: str, tags: str, clip: Dict, make_instrumental: bool = False,
+            audio_path: Optional[str] = None) -> None:
+        """
+        Add a generated clip to the library.
+        
+        Args:
+            topic: Song description used for generation
+            tags: Tags used for generation
+            clip: Clip object from the Suno API (needs "id"; "audio_url" if known)
+            make_instrumental: Whether the clip was generated without vocals
+            audio_path: Local audio file to copy into the library
+        """
+        canonical_tags = normalize_tags(tags)
+        now = time.time()
+        
+        with self._lock:
+            self._conn.execute(
+                """INSERT INTO clips (clip_id, vibe_key, topic, tags, instrumental, audio_url,
+                                      created_at, last_used_at)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                   ON CONFLICT (clip_id) DO UPDATE SET
+                       audio_url = COALESCE(excluded.audio_url, clips.audio_url),
+                       last_used_at = excluded.last_used_at""",
+                (clip['id'], vibe_key(topic, tags, make_instrumental), topic, ','.join(canonical_tags),
+                 int(make_instrumental), clip.get('audio_url'), now, now)
+            )
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO clip_tags (clip_id, tag) VALUES (?, ?)",
+                [(clip['id'], tag) for tag in similarity_tags(canonical_tags)]
+            )
+            self._conn.commit()
+        
+        if audio_path:
+            self.store_audio(clip['id'], audio_path)
+        self.evict()
+    
+    def discard(self, clip_id: str) -> None:
+        """
+        Remove a clip that can no longer be played (e.g. its audio URL expired).
+        
+        Args:
+            clip_id: Clip to remove
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM clips WHERE clip_id = ?", (clip_id,)).fetchone()
+            if row is not None:
+                self._remove(row)
+                self._conn.commit()
+    
+    def store_audio(self, clip_id: str, source_path: str) -> str:
+        """
+        Copy a downloaded audio file into the library's file store.
+        
+        Args:
+            clip_id: Clip the audio belongs to
+            source_path: Downloaded audio file
+        
+        Returns:
+            Path of the stored file
+        """
+        dest_path = os.path.join(self.audio_dir, f"{clip_id}.mp3")
+        tmp_path = f"{dest_path}.tmp"
+        shutil.copyfile(source_path, tmp_path)
+        os.replace(tmp_path, dest_path)
+        
+        with self._lock:
+            self._conn.execute(
+                "UPDATE clips SET audio_path = ?, size_bytes = ? WHERE clip_id = ?",
+                (dest_path, os.path.getsize(dest_path), clip_id)
+            )
+            self._conn.commit()
+        return dest_path
+    
+    def evict(self) -> int:
+        """
+        Apply the eviction policy.
+        
+        Returns:
+            Number of clips evicted
+        """
+        order = "hits ASC, last_used_at ASC" if self.policy.order == "lfu" else "last_used_at ASC"
+        
+        with self._lock:
+            evicted = self._expire(time.time())
+            count, total_bytes = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size_bytes), 0) FROM clips").fetchone()
+            
+            over_count = self.policy.max_clips is not None and count > self.policy.max_clips
+            over_bytes = self.policy.max_bytes is not None and total_bytes > self.policy.max_bytes
+            if over_count or over_bytes:
+                for row in self._conn.execute(f"SELECT * FROM clips ORDER BY {order}").fetchall():
+                    if not over_count and not over_bytes:
+                        break
+                    self._remove(row)
+                    evicted += 1
+                    count -= 1
+                    total_bytes -= row['size_bytes']
+                    over_count = self.policy.max_clips is not None and count > self.policy.max_clips
+                    over_bytes = self.policy.max_bytes is not None and total_bytes > self.policy.max_bytes
+                self._conn.commit()
+            
+            self.stats['evictions'] += evicted
+        return evicted
+    
+    def _expire(self, now: float) -> int:
+        """Remove clips older than the policy's max_age (lock held)."""
+        if self.policy.max_age is None:
+            return 0
+        rows = self._conn.execute(
+            "SELECT * FROM clips WHERE created_at < ?", (now - self.policy.max_age,)).fetchall()
+        for row in rows:
+            self._remove(row)
+        if rows:
+            self._conn.commit()
+        return len(rows)
+    
+    def _remove(self, row: sqlite3.Row) -> None:
+        """Delete a clip row and its audio file (lock held)."""
+        self._conn.execute("DELETE FROM clips WHERE clip_id = ?", (row['clip_id'],))
+        if row['audio_path']:
+            try:
+                os.remove(row['audio_path'])
+            except FileNotFoundError:
+                pass
+    
+    def get_stats(self) -> Dict[str, float]:
+        """
+        Library statistics including hit rate.
+        
+        Returns:
+            Dictionary with lookup counters, hit_rate, clip count and bytes stored
+        """
+        with self._lock:
+            count, total_bytes = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size_bytes), 0) FROM clips").fetchone()
+            stats = dict(self.stats)
+        
+        hits = stats['exact_hits'] + stats['near_hits']
+        stats['hit_rate'] = hits / stats['lookups'] if stats['lookups'] else 0.0
+        stats['clips'] = count
+        stats['bytes'] = total_bytes
+        return stats
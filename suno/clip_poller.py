@@ -0,0 +1,190 @@
+"""
+Batched status polling for many in-flight Suno clips.
+
+Instead of one /clips request per clip per poll, ClipPoller keeps the set of
+pending clip IDs and fetches all of them in one request per tick, handing
+each clip to its waiter through a Future (and optional callback). Request
+volume grows with the number of ticks, not the number of clips.
+"""
+
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional
+
+from suno import SunoAPI
+
+
+class ClipPoller:
+    """
+    Background poller resolving one Future per watched clip.
+    
+    Example:
+        >>> with ClipPoller(suno) as poller:
+        ...     futures = [poller.watch(clip_id) for clip_id in clip_ids]
+        ...     clips = [f.result() for f in futures]
+    """
+    
+    def __init__(self,
+                 suno: SunoAPI,
+                 interval: float = 2.0,
+                 max_batch: int = 50,
+                 max_wait: float = 300,
+                 ready_statuses: tuple = ("streaming", "complete")):
+        """
+        Initialize the poller.
+        
+        Args:
+            suno: SunoAPI client used for the batched /clips requests
+            interval: Seconds between ticks
+            max_batch: Most clip IDs sent in one request
+            max_wait: Seconds before a watched clip fails with TimeoutError
+            ready_statuses: Statuses that resolve a clip's Future
+        """
+        self.suno = suno
+        self.interval = interval
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.ready_statuses = set(ready_statuses)
+        
+        self.ticks = 0
+        self.requests = 0
+        
+        self._pending: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+    
+    def start(self) -> "ClipPoller":
+        """Start the polling thread."""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="suno-clip-poller", daemon=True)
+            self._thread.start()
+        return self
+    
+    def stop(self) -> None:
+        """Stop polling; unresolved Futures are cancelled."""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+        
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        for waiter in pending.values():
+            waiter["future"].cancel()
+    
+    def __enter__(self) -> "ClipPoller":
+        return self.start()
+    
+    def __exit__(self, *exc) -> None:
+        self.stop()
+    
+    def watch(self, clip_id: str, callback: Optional[Callable[[Future], None]] = None) -> Future:
+        """
+        Start tracking a clip.
+        
+        Watching a clip that is already pending returns its existing Future.
+        
+        Args:
+            clip_id: Clip UUID
+            callback: Called with the Future once it resolves
+        
+        Returns:
+            Future resolving to the clip object when it reaches a ready
+            status, or failing on generation error or timeout
+        """
+        with self._lock:
+            waiter = self._pending.get(clip_id)
+            if waiter is None:
+                waiter = {"future": Future(), "deadline": time.time() + self.max_wait}
+                self._pending[clip_id] = waiter
+        
+        if callback is not None:
+            waiter["future"].add_done_callback(callback)
+        self._wake.set()
+        return waiter["future"]
+    
+    def unwatch(self, clip_id: str) -> None:
+        """Stop tracking a clip and cancel its Future."""
+        with self._lock:
+            waiter = self._pending.pop(clip_id, None)
+        if waiter is not None:
+            waiter["future"].cancel()
+    
+    def pending(self) -> List[str]:
+        """IDs of clips still being polled."""
+        with self._lock:
+            return list(self._pending)
+    
+    def tick(self) -> None:
+        """Poll every pending clip once (one request per max_batch clips)."""
+        clip_ids = self.pending()
+        if not clip_ids:
+            return
+        self.ticks += 1
+        
+        for i in range(0, len(clip_ids), self.max_batch):
+            batch = clip_ids[i:i + self.max_batch]
+            self.requests += 1
+            try:
+                clips = self.suno.get_clips(batch)
+            except Exception as e:
+                # Transient failure: keep the clips pending until their deadline
+                print(f"Error polling {len(batch)} clips: {e}")
+                clips = []
+            
+            for clip in clips:
+                status = clip.get("status")
+                if status in self.ready_statuses:
+                    self._resolve(clip["id"], result=clip)
+                elif status == "error":
+                    error_msg = clip.get("metadata", {}).get("error_message", "Unknown error")
+                    self._resolve(clip["id"], error=Exception(f"Generation failed: {error_msg}"))
+        
+        now = time.time()
+        with self._lock:
+            expired = [clip_id for clip_id, waiter in self._pending.items() if waiter["deadline"] <= now]
+        for clip_id in expired:
+            self._resolve(clip_id, error=TimeoutError(
+                f"Clip {clip_id} did not become ready within {self.max_wait} seconds"))
+    
+    def _resolve(self, clip_id: str, result: Optional[Dict] = None,
+                 error: Optional[BaseException] = None) -> None:
+        with self._lock:
+            waiter = self._pending.pop(clip_id, None)
+        if waiter is None or waiter["future"].done():
+            return
+        if error is not None:
+            waiter["future"].set_exception(error)
+        else:
+            waiter["future"].set_result(result)
+    
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            if not self.pending():
+                # Idle until something is watched
+                self._wake.wait()
+                self._wake.clear()
+                continue
+            
+            self.tick()
+            self._stop.wait(self.interval)
+
+
+if __name__ == "__main__":
+    from fake_suno_server import FakeSunoServer
+    
+    with FakeSunoServer(ready_after=2.0, ready_jitter=3.0) as server:
+        suno = SunoAPI("fake-token", base_url=server.base_url)
+        clip_ids = [suno.generate_song(f"Demo clip {i}", "instrumental, ambient")["id"] for i in range(50)]
+        
+        with ClipPoller(suno, interval=0.5) as poller:
+            futures = [poller.watch(clip_id) for clip_id in clip_ids]
+            clips = [future.result() for future in futures]
+        
+        print(f"Clips ready: {len(clips)}")
+        print(f"Ticks: {poller.ticks}, /clips requests: {poller.requests} "
+              f"(one request per clip per tick would be ~{len(clip_ids) * poller.ticks})")
@@ -0,0 +1,273 @@
+"""
+Local fake of the Suno HackMIT API for benchmarks and demos.
+
+Implements the endpoints SunoAPI uses (POST /generate, GET /clips and the
+audio URLs it returns) on a threaded local HTTP server. Clips move through
+submitted -> queued -> streaming -> complete on a configurable schedule, and
+a per-connection delay can stand in for the TCP/TLS handshake cost of the
+real API.
+"""
+
+import hashlib
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+from urllib.parse import parse_qs, urlparse
+
+
+class FakeSunoServer:
+    """
+    Fake Suno API running in a background thread.
+    
+    Example:
+        >>> server = FakeSunoServer(ready_after=2.0).start()
+        >>> suno = SunoAPI("token", base_url=server.base_url)
+        >>> ...
+        >>> server.stop()
+    """
+    
+    def __init__(self,
+                 host: str = "127.0.0.1",
+                 port: int = 0,
+                 ready_after: float = 1.0,
+                 ready_jitter: float = 0.0,
+                 complete_after: float = 5.0,
+                 connect_delay: float = 0.0,
+                 response_delay: float = 0.0,
+                 audio_size: int = 256 * 1024,
+                 audio_rate: Optional[float] = None,
+                 drop_audio_after: Optional[int] = None,
+                 generation_slots: Optional[int] = None,
+                 seed: int = 0):
+        """
+        Initialize the fake server.
+        
+        Args:
+            host: Interface to bind
+            port: Port to bind (0 picks a free port)
+            ready_after: Seconds from generation until a clip is streamable
+            ready_jitter: Random extra seconds (uniform) added per clip
+            complete_after: Seconds from streamable until complete
+            connect_delay: Delay on each new connection (simulated handshake)
+            response_delay: Delay on every request (simulated server time)
+            audio_size: Size in bytes of each fake MP3
+            audio_rate: Audio transfer rate in bytes per second (None for unthrottled)
+            drop_audio_after: Drop the first audio connection of each clip
+                after this many bytes (exercises Range resume)
+            generation_slots: Clips generated at once; further clips queue
+                for a free slot (None for unlimited)
+            seed: Random seed for jitter
+        """
+        self.ready_after = ready_after
+        self.ready_jitter = ready_jitter
+        self.complete_after = complete_after
+        self.connect_delay = connect_delay
+        self.response_delay = response_delay
+        self.audio_size = audio_size
+        self.audio_rate = audio_rate
+        self.drop_audio_after = drop_audio_after
+        self._dropped = set()
+        self.generation_slots = generation_slots
+        self._slot_free_at = [0.0] * (generation_slots or 0)
+        
+        self.clips: Dict[str, Dict] = {}
+        self.requests = {'generate': 0, 'clips': 0, 'audio': 0}
+        self.connections = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        
+        self._httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+    
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+    
+    def start(self) -> "FakeSunoServer":
+        """Start serving in a background thread."""
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+    
+    def stop(self) -> None:
+        """Stop the server."""
+        self._httpd.shutdown()
+        self._httpd.server_close()
+    
+    def __enter__(self) -> "FakeSunoServer":
+        return self.start()
+    
+    def __exit__(self, *exc) -> None:
+        self.stop()
+    
+    def ready_at(self, clip_id: str) -> float:
+        """Wall time at which a clip becomes streamable."""
+        return self.clips[clip_id]['ready_at']
+    
+    def audio_bytes(self, clip_id: str) -> bytes:
+        """Deterministic fake MP3 payload for a clip."""
+        seed = clip_id.encode()
+        block = (b"ID3" + seed) * (1024 // (len(seed) + 3) + 1)
+        return (block * (self.audio_size // len(block) + 1))[:self.audio_size]
+    
+    def _create_clip(self, topic: str, tags: str) -> Dict:
+        clip_id = str(uuid.uuid4())
+        now = time.time()
+        with self._lock:
+            duration = self.ready_after + self._rng.uniform(0, self.ready_jitter)
+            if self._slot_free_at:
+                # Queue behind earlier clips for the first free slot
+                slot = min(range(len(self._slot_free_at)), key=self._slot_free_at.__getitem__)
+                ready_at = max(now, self._slot_free_at[slot]) + duration
+                self._slot_free_at[slot] = ready_at
+            else:
+                ready_at = now + duration
+            self.clips[clip_id] = {
+                'id': clip_id,
+                'created_at': now,
+                'ready_at': ready_at,
+                'complete_at': ready_at + self.complete_after,
+                'topic': topic,
+                'tags': tags,
+            }
+        return self._clip_view(clip_id)
+    
+    def _clip_view(self, clip_id: str) -> Dict:
+        clip = self.clips[clip_id]
+        now = time.time()
+        if now >= clip['complete_at']:
+            status = 'complete'
+        elif now >= clip['ready_at']:
+            status = 'streaming'
+        elif now >= clip['created_at'] + 0.5:
+            status = 'queued'
+        else:
+            status = 'submitted'
+        
+        view = {
+            'id': clip_id,
+            'status': status,
+            'title': f"Fake clip for {clip['topic'][:40]}",
+            'metadata': {'tags': clip['tags'], 'prompt': clip['topic']},
+        }
+        if status in ('streaming', 'complete'):
+            view['audio_url'] = f"{self.base_url}/audio/{clip_id}.mp3"
+        return view
+    
+    def _make_handler(self):
+        server = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive
+            # Send headers and body in one segment (avoids delayed-ACK stalls)
+            wbufsize = 64 * 1024
+            disable_nagle_algorithm = True
+            
+            def setup(self):
+                super().setup()
+                with server._lock:
+                    server.connections += 1
+                if server.connect_delay:
+                    time.sleep(server.connect_delay)
+            
+            def log_message(self, format, *args):
+                pass
+            
+            def _send_json(self, payload, status=200):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            
+            def do_POST(self):
+                if server.response_delay:
+                    time.sleep(server.response_delay)
+                length = int(self.headers.get("Content-Length", 0))
+                data = json.loads(self.rfile.read(length) or b"{}")
+                
+                if urlparse(self.path).path.endswith("/generate"):
+                    with server._lock:
+                        server.requests['generate'] += 1
+                    self._send_json(server._create_clip(data.get("topic", ""), data.get("tags", "")))
+                else:
+                    self._send_json({"detail": "not found"}, status=404)
+            
+            def do_GET(self):
+                if server.response_delay:
+                    time.sleep(server.response_delay)
+                parsed = urlparse(self.path)
+                
+                if parsed.path.endswith("/clips"):
+                    with server._lock:
+                        server.requests['clips'] += 1
+                    ids = []
+                    for value in parse_qs(parsed.query).get("ids", []):
+                        ids.extend(clip_id for clip_id in value.split(",") if clip_id)
+                    self._send_json([server._clip_view(i) for i in ids if i in server.clips])
+                
+                elif parsed.path.startswith("/audio/"):
+                    with server._lock:
+                        server.requests['audio'] += 1
+                    clip_id = parsed.path[len("/audio/"):].rsplit(".", 1)[0]
+                    if clip_id not in server.clips:
+                        self._send_json({"detail": "not found"}, status=404)
+                        return
+                    self._send_audio(clip_id, server.audio_bytes(clip_id))
+                
+                else:
+                    self._send_json({"detail": "not found"}, status=404)
+            
+            def _send_audio(self, clip_id: str, body: bytes):
+                start, end = 0, len(body) - 1
+                range_header = self.headers.get("Range")
+                if range_header and range_header.startswith("bytes="):
+                    first, _, last = range_header[len("bytes="):].partition("-")
+                    start = int(first) if first else 0
+                    end = int(last) if last else end
+                    self.send_response(206)
+                    self.send_header("Content-Range", f"bytes {start}-{end}/{len(body)}")
+                else:
+                    self.send_response(200)
+                chunk = body[start:end + 1]
+                self.send_header("Content-Type", "audio/mpeg")
+                self.send_header("Accept-Ranges", "bytes")
+                self.send_header("ETag", f'"{hashlib.sha256(body).hexdigest()[:16]}"')
+                self.send_header("Content-Length", str(len(chunk)))
+                self.end_headers()
+                
+                stop = len(chunk)
+                if server.drop_audio_after is not None:
+                    with server._lock:
+                        if clip_id not in server._dropped and start < server.drop_audio_after:
+                            server._dropped.add(clip_id)
+                            stop = server.drop_audio_after - start
+                            self.close_connection = True
+                
+                piece = 16 * 1024
+                for offset in range(0, stop, piece):
+                    self.wfile.write(chunk[offset:min(offset + piece, stop)])
+                    if server.audio_rate:
+                        self.wfile.flush()
+                        time.sleep(piece / server.audio_rate)
+        
+        return Handler
+
+
+if __name__ == "__main__":
+    import sys
+    
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8765
+    fake = FakeSunoServer(port=port, ready_after=10.0, ready_jitter=5.0)
+    print(f"Fake Suno API listening on {fake.base_url}")
+    try:
+        fake._httpd.serve_forever()
+    except KeyboardInterrupt:
+        fake.stop()
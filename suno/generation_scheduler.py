@@ -0,0 +1,317 @@
+"""
+Generation scheduler in front of SunoAPI for bursty live input.
+
+In live mode a new vibe can arrive every few seconds per session, and
+starting a generation plus a polling loop for each one wastes generations
+on vibes that are obsolete before they are ready. GenerationScheduler keeps
+a queue per session and:
+
+- latest wins: a newer request from a session cancels that session's older
+  queued request and abandons its in-flight one
+- dedupe: identical pending requests (same normalized topic and tags) share
+  one generation
+- rate limit: a token bucket caps how fast generations start, with sessions
+  served round-robin
+- polling: every in-flight clip is polled through one batched ClipPoller
+"""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from clip_library import vibe_key
+from clip_poller import ClipPoller
+from suno import SunoAPI
+
+
+@dataclass
+class _Request:
+    session_id: str
+    future: Future
+    submitted_at: float
+
+
+@dataclass
+class _Job:
+    key: str
+    topic: str
+    tags: str
+    make_instrumental: bool
+    enqueued_at: float
+    subscribers: List[_Request] = field(default_factory=list)
+    state: str = "queued"  # queued -> generating -> done
+    clip_id: Optional[str] = None
+
+
+class GenerationScheduler:
+    """
+    Per-session generation queues with latest-wins, dedupe and a rate limit.
+    
+    Example:
+        >>> scheduler = GenerationScheduler(suno)
+        >>> future = scheduler.submit("tab-1", "Calm focus music", "instrumental, ambient")
+        >>> clip = future.result()  # CancelledError if superseded by a newer submit
+    """
+    
+    def __init__(self,
+                 suno: SunoAPI,
+                 max_per_minute: float = 20,
+                 burst: int = 3,
+                 latest_wins: bool = True,
+                 settle: float = 1.0,
+                 poll_interval: float = 2.0,
+                 max_wait: float = 300):
+        """
+        Initialize the scheduler.
+        
+        Args:
+            suno: SunoAPI client used for generation and polling
+            max_per_minute: Sustained generation starts per minute
+            burst: Generations that may start back to back
+            latest_wins: Cancel a session's older requests when it submits a
+                newer one (otherwise each session's queue is FIFO)
+            settle: Seconds a request waits before it may start, so a burst
+                of vibe changes collapses into its last one
+            poll_interval: Seconds between batched status polls
+            max_wait: Seconds before an in-flight clip fails with TimeoutError
+        """
+        if max_per_minute <= 0:
+            raise ValueError("max_per_minute must be positive")
+        self.suno = suno
+        self.rate = max_per_minute / 60.0
+        self.burst = burst
+        self.latest_wins = latest_wins
+        self.settle = settle
+        
+        self.poller = ClipPoller(suno, interval=poll_interval, max_wait=max_wait).start()
+        
+        self._queues: Dict[str, deque] = {}
+        self._jobs_by_key: Dict[str, _Job] = {}
+        self._rotation: deque = deque()
+        self._tokens = float(burst)
+        self._refilled_at = time.monotonic()
+        self._cond = threading.Condition()
+        self._stopped = False
+        
+        self.latencies: List[float] = []
+        self.stats = {
+            'submitted': 0,
+            'deduped': 0,
+            'superseded': 0,
+            'generations': 0,
+            'abandoned': 0,
+            'delivered': 0,
+            'failed': 0,
+        }
+        
+        self._thread = threading.Thread(target=self._dispatch_loop, name="suno-generation-scheduler", daemon=True)
+        self._thread.start()
+    
+    def submit(self, session_id: str, topic: str, tags: str, make_instrumental: bool = False) -> Future:
+        """
+        Request a clip for a session.
+        
+        Args:
+            session_id: Caller's session (e.g. browser tab or user)
+            topic: Description for the song
+            tags: Musical style/genres
+            make_instrumental: Generate without vocals
+        
+        Returns:
+            Future resolving to the streamable clip object; cancelled if a
+            newer request from the same session supersedes it
+        """
+        now = time.monotonic()
+        request = _Request(session_id=session_id, future=Future(), submitted_at=now)
+        key = vibe_key(topic, tags, make_instrumental)
+        
+        with self._cond:
+            if self._stopped:
+                raise RuntimeError("GenerationScheduler is stopped")
+            self.stats['submitted'] += 1
+            
+            if self.latest_wins:
+                self._supersede(session_id, keep_key=key)
+            
+            job = self._jobs_by_key.get(key)
+            if job is not None:
+                if not any(r.session_id == session_id for r in job.subscribers):
+                    self.stats['deduped'] += 1
+                job.subscribers.append(request)
+            else:
+                job = _Job(key=key, topic=topic, tags=tags, make_instrumental=make_instrumental, enqueued_at=now)
+                job.subscribers.append(request)
+                self._jobs_by_key[key] = job
+                if session_id not in self._queues:
+                    self._queues[session_id] = deque()
+                    self._rotation.append(session_id)
+                self._queues[session_id].append(job)
+            self._cond.notify_all()
+        
+        return request.future
+    
+    def _supersede(self, session_id: str, keep_key: str) -> None:
+        """Drop a session's older requests for other vibes (lock held)."""
+        for job in list(self._jobs_by_key.values()):
+            if job.key == keep_key:
+                continue
+            superseded = [r for r in job.subscribers if r.session_id == session_id]
+            if not superseded:
+                continue
+            job.subscribers = [r for r in job.subscribers if r.session_id != session_id]
+            for request in superseded:
+                request.future.cancel()
+                self.stats['superseded'] += 1
+            
+            if not job.subscribers:
+                del self._jobs_by_key[job.key]
+                if job.state == "queued":
+                    for queue_session, queue in list(self._queues.items()):
+                        if job in queue:
+                            queue.remove(job)
+                            self._drop_if_empty(queue_session)
+                else:
+                    # Already generating: stop polling, the generation is wasted
+                    self.stats['abandoned'] += 1
+                    if job.clip_id:
+                        self.poller.unwatch(job.clip_id)
+                job.state = "done"
+    
+    def _refill(self, now: float) -> None:
+        """Refill the rate-limit token bucket (lock held)."""
+        self._tokens = min(self.burst, self._tokens + (now - self._refilled_at) * self.rate)
+        self._refilled_at = now
+    
+    def _next_job(self, now: float):
+        """Next settled job, round-robin across sessions (lock held)."""
+        earliest = None
+        for _ in range(len(self._rotation)):
+            session_id = self._rotation[0]
+            self._rotation.rotate(-1)
+            queue = self._queues.get(session_id)
+            if not queue:
+                continue
+            ready_at = queue[0].enqueued_at + self.settle
+            if ready_at <= now:
+                job = queue.popleft()
+                self._drop_if_empty(session_id)
+                return job, 0.0
+            earliest = ready_at if earliest is None else min(earliest, ready_at)
+        return None, (earliest - now if earliest is not None else None)
+    
+    def _drop_if_empty(self, session_id: str) -> None:
+        """Forget a session whose queue has drained (lock held)."""
+        if not self._queues.get(session_id):
+            self._queues.pop(session_id, None)
+            if session_id in self._rotation:
+                self._rotation.remove(session_id)
+    
+    def _dispatch_loop(self) -> None:
+        while True:
+            with self._cond:
+                while True:
+                    if self._stopped:
+                        return
+                    now = time.monotonic()
+                    self._refill(now)
+                    if self._tokens < 1:
+                        # Requests stay queued (and replaceable) until a token is available
+                        self._cond.wait((1 - self._tokens) / self.rate)
+                        continue
+                    job, settle_wait = self._next_job(now)
+                    if job is None:
+                        self._cond.wait(settle_wait)
+                        continue
+                    self._tokens -= 1
+                    job.state = "generating"
+                    self.stats['generations'] += 1
+                    break
+            self._start(job)
+    
+    def _start(self, job: _Job) -> None:
+        try:
+            clip_info = self.suno.generate_song(job.topic, job.tags, job.make_instrumental)
+        except Exception as e:
+            self._finish(job, error=e)
+            return
+        
+        with self._cond:
+            job.clip_id = clip_info["id"]
+            if job.state == "done":
+                # Superseded while the generate request was in flight
+                return
+        # watch() may run the callback inline, which takes the lock, so it is
+        # registered outside it and a supersede that slipped in is undone after
+        self.poller.watch(job.clip_id, callback=lambda future: self._on_ready(job, future))
+        with self._cond:
+            if job.state == "done":
+                self.poller.unwatch(job.clip_id)
+    
+    def _on_ready(self, job: _Job, future: Future) -> None:
+        if future.cancelled():
+            return
+        if future.exception() is not None:
+            self._finish(job, error=future.exception())
+        else:
+            self._finish(job, clip=future.result())
+    
+    def _finish(self, job: _Job, clip: Optional[Dict] = None, error: Optional[BaseException] = None) -> None:
+        now = time.monotonic()
+        with self._cond:
+            if job.state == "done":
+                return
+            job.state = "done"
+            if self._jobs_by_key.get(job.key) is job:
+                del self._jobs_by_key[job.key]
+            subscribers, job.subscribers = job.subscribers, []
+            # Callers may have cancelled their futures; the rest can no longer be
+            subscribers = [r for r in subscribers if r.future.set_running_or_notify_cancel()]
+            if error is not None:
+                self.stats['failed'] += 1
+            else:
+                self.stats['delivered'] += len(subscribers)
+                self.latencies.extend(now - r.submitted_at for r in subscribers)
+        
+        for request in subscribers:
+            if error is not None:
+                request.future.set_exception(error)
+            else:
+                request.future.set_result(clip)
+    
+    def stop(self) -> None:
+        """Stop dispatching; pending requests are cancelled."""
+        with self._cond:
+            self._stopped = True
+            jobs = list(self._jobs_by_key.values())
+            self._jobs_by_key.clear()
+            self._queues.clear()
+            self._rotation.clear()
+            self._cond.notify_all()
+        self._thread.join()
+        for job in jobs:
+            job.state = "done"
+            for request in job.subscribers:
+                request.future.cancel()
+        self.poller.stop()
+    
+    def get_stats(self) -> Dict[str, float]:
+        """
+        Scheduler statistics.
+        
+        Returns:
+            Dictionary with request/generation counters, wasted generations
+            (abandoned in flight) and submit-to-ready latency (mean, p50, p95)
+        """
+        with self._cond:
+            stats = dict(self.stats)
+            latencies = sorted(self.latencies)
+            stats['queued'] = sum(len(q) for q in self._queues.values())
+        stats['wasted_generations'] = stats['abandoned']
+        if latencies:
+            stats['latency_mean'] = sum(latencies) / len(latencies)
+            stats['latency_p50'] = latencies[len(latencies) // 2]
+            stats['latency_p95'] = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        return stats
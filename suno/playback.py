@@ -0,0 +1,559 @@
+"""
+Pluggable audio playback backends.
+
+A PlaybackBackend plays either a file or a StreamBuffer, an in-memory buffer
+the downloader appends to while players read from it, so audio can start
+before the download finishes and without writing a copy to disk first.
+Pipe backends (ffplay, mpv, aplay via ffmpeg, or any command) read MP3 from
+stdin; afplay needs a file, so a stream only starts playing on it once the
+download completes; NullSink and RecordingSink run in-process for tests.
+Every play returns a Playback handle with stop/seek/wait control and its
+measured start-up latency.
+"""
+
+import os
+import shlex
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, Iterator, List, Optional, Union
+
+
+class StreamBuffer:
+    """
+    Growing in-memory audio buffer.
+    
+    One writer appends chunks; any number of readers iterate from a byte
+    offset, blocking until more data arrives or the buffer is closed.
+    """
+    
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._size = 0
+        self._closed = False
+        self._error: Optional[BaseException] = None
+        self._cond = threading.Condition()
+    
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "StreamBuffer":
+        """Closed buffer holding data."""
+        buffer = cls()
+        buffer.write(data)
+        buffer.close()
+        return buffer
+    
+    @property
+    def size(self) -> int:
+        return self._size
+    
+    @property
+    def closed(self) -> bool:
+        return self._closed
+    
+    def write(self, chunk: bytes) -> None:
+        """Append a chunk."""
+        if not chunk:
+            return
+        with self._cond:
+            self._chunks.append(bytes(chunk))
+            self._size += len(chunk)
+            self._cond.notify_all()
+    
+    def close(self, error: Optional[BaseException] = None) -> None:
+        """Mark the end of the audio (or a failed download)."""
+        with self._cond:
+            self._closed = True
+            self._error = error
+            self._cond.notify_all()
+    
+    def wait_closed(self, timeout: Optional[float] = None) -> bool:
+        """Block until the buffer is closed."""
+        with self._cond:
+            return self._cond.wait_for(lambda: self._closed, timeout)
+    
+    def getvalue(self) -> bytes:
+        """Everything written so far."""
+        with self._cond:
+            return b"".join(self._chunks)
+    
+    def reader(self, start: int = 0) -> Iterator[bytes]:
+        """
+        Iterate chunks from a byte offset until the buffer is closed.
+        
+        Args:
+            start: Byte offset to start from
+        
+        Yields:
+            Audio chunks
+        """
+        index, position = 0, 0
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: index < len(self._chunks) or self._closed)
+                if index >= len(self._chunks):
+                    if self._error is not None:
+                        raise self._error
+                    return
+                chunk = self._chunks[index]
+            index += 1
+            if position + len(chunk) > start:
+                yield chunk[max(0, start - position):]
+            position += len(chunk)
+
+
+Source = Union[str, StreamBuffer]
+
+
+def _iter_source(source: Source, chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+    if isinstance(source, StreamBuffer):
+        yield from source.reader()
+        return
+    with open(source, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            yield chunk
+
+
+class _Session(ABC):
+    """One running playback (a player process or an in-process sink thread)."""
+    
+    def __init__(self):
+        self.started = threading.Event()
+        self.started_at: Optional[float] = None
+        self.finished = threading.Event()
+        self.on_started = None
+        self.error: Optional[BaseException] = None
+        self._stopping = False
+    
+    @abstractmethod
+    def begin(self) -> None:
+        """Start playing in the background."""
+    
+    def mark_started(self) -> None:
+        if not self.started.is_set():
+            self.started_at = time.perf_counter()
+            if self.on_started is not None:
+                self.on_started(self.started_at)
+            self.started.set()
+    
+    def stop(self) -> None:
+        self._stopping = True
+    
+    def wait(self, timeout: Optional[float] = None) -> Optional[int]:
+        self.finished.wait(timeout)
+        if self.error is not None:
+            raise self.error
+        return self.poll()
+    
+    def poll(self) -> Optional[int]:
+        if not self.finished.is_set():
+            return None
+        return 1 if self.error is not None else 0
+
+
+class _ProcessSession(_Session):
+    def __init__(self, backend: "PipeBackend", source: Source, offset: float):
+        super().__init__()
+        self.backend = backend
+        self.source = source
+        self.offset = offset
+        self.cleanup: Optional[str] = None
+        self.process: Optional[subprocess.Popen] = None
+        self._lock = threading.Lock()
+    
+    def begin(self) -> None:
+        if self.backend.requires_file and isinstance(self.source, StreamBuffer):
+            # The player needs a file: write one once the stream is complete
+            self.backend._warn_not_progressive()
+            threading.Thread(target=self._spawn_from_buffer, name="playback-file", daemon=True).start()
+        else:
+            self._spawn(self.source)
+    
+    def _spawn_from_buffer(self) -> None:
+        try:
+            # Reading to the end surfaces a failed download
+            audio = b"".join(self.source.reader())
+            with tempfile.NamedTemporaryFile(suffix=".mp3", delete=False) as f:
+                f.write(audio)
+        except Exception as e:
+            self.error = e
+            self._finish()
+            return
+        self.cleanup = f.name
+        self._spawn(f.name)
+    
+    def _spawn(self, source: Source) -> None:
+        use_stdin = isinstance(source, StreamBuffer) or not self.backend.reads_files
+        command = self.backend.build_command("-" if use_stdin else source, self.offset)
+        with self._lock:
+            if self._stopping:
+                self._finish()
+                return
+            self.process = subprocess.Popen(command, stdin=subprocess.PIPE if use_stdin else subprocess.DEVNULL,
+                                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        if use_stdin:
+            threading.Thread(target=self._feed, args=(source,), name="playback-feed", daemon=True).start()
+        else:
+            self.mark_started()
+        threading.Thread(target=self._reap, name="playback-reap", daemon=True).start()
+    
+    def _feed(self, source: Source) -> None:
+        try:
+            for chunk in _iter_source(source):
+                if self._stopping:
+                    break
+                self.process.stdin.write(chunk)
+                self.process.stdin.flush()
+                self.mark_started()
+        except (BrokenPipeError, ValueError, OSError):
+            # Player exited or was stopped
+            pass
+        except Exception as e:
+            # The stream failed (e.g. the download broke off)
+            self.error = e
+        finally:
+            try:
+                self.process.stdin.close()
+            except (BrokenPipeError, ValueError, OSError):
+                pass
+    
+    def _reap(self) -> None:
+        self.process.wait()
+        self._finish()
+    
+    def _finish(self) -> None:
+        if self.cleanup:
+            try:
+                os.remove(self.cleanup)
+            except FileNotFoundError:
+                pass
+        self.finished.set()
+    
+    def stop(self) -> None:
+        with self._lock:
+            super().stop()
+            if self.process is not None and self.process.poll() is None:
+                self.process.terminate()
+    
+    def poll(self) -> Optional[int]:
+        if not self.finished.is_set():
+            return None
+        if self.process is None:
+            return 1 if self.error is not None else -1
+        return self.process.poll()
+
+
+class _SinkSession(_Session):
+    def __init__(self, source: Source, record: Optional[Dict] = None):
+        super().__init__()
+        self.source = source
+        self.record = record
+    
+    def begin(self) -> None:
+        threading.Thread(target=self._consume, args=(self.source,), name="playback-sink", daemon=True).start()
+    
+    def _consume(self, source: Source) -> None:
+        try:
+            for chunk in _iter_source(source):
+                if self._stopping:
+                    break
+                self.mark_started()
+                if self.record is not None:
+                    self.record['audio'] += chunk
+        except Exception as e:
+            self.error = e
+        finally:
+            self.finished.set()
+
+
+class Playback:
+    """
+    Handle for playing one source on a backend.
+    
+    terminate() is an alias of stop(), so code written against the
+    subprocess.Popen returned by the original afplay playback keeps working.
+    """
+    
+    def __init__(self, backend: "PlaybackBackend", source: Source):
+        self.backend = backend
+        self.source = source
+        self.offset = 0.0
+        self._session: Optional[_Session] = None
+        self._launched_at: Optional[float] = None
+    
+    def start(self, offset: float = 0.0) -> "Playback":
+        """
+        Start playing.
+        
+        Args:
+            offset: Position in seconds to start from
+        
+        Returns:
+            self
+        """
+        self.stop()
+        self.offset = offset
+        launched_at = self._launched_at = time.perf_counter()
+        self._session = self.backend._launch(self.source, offset)
+        self._session.on_started = lambda started_at: self.backend._record_startup(started_at - launched_at)
+        self._session.begin()
+        return self
+    
+    def stop(self) -> None:
+        """Stop playback."""
+        if self._session is not None:
+            self._session.stop()
+    
+    terminate = stop
+    
+    def seek(self, seconds: float) -> None:
+        """
+        Restart playback at a position.
+        
+        Args:
+            seconds: Position in seconds
+        """
+        if not self.backend.can_seek:
+            raise ValueError(f"Playback backend {self.backend.name} does not support seeking")
+        self.start(offset=seconds)
+    
+    def wait_started(self, timeout: Optional[float] = None) -> bool:
+        """Block until the player has accepted its first audio."""
+        return self._session is not None and self._session.started.wait(timeout)
+    
+    def wait(self, timeout: Optional[float] = None) -> Optional[int]:
+        """
+        Block until playback ends.
+        
+        Args:
+            timeout: Seconds to wait (None to wait until it ends)
+        
+        Returns:
+            Exit status, or None if still playing
+        
+        Raises:
+            Exception: The error that ended playback early, such as a failed
+                download feeding a StreamBuffer
+        """
+        return self._session.wait(timeout) if self._session is not None else None
+    
+    @property
+    def error(self) -> Optional[BaseException]:
+        """The error that ended playback early, if any."""
+        return self._session.error if self._session is not None else None
+    
+    def poll(self) -> Optional[int]:
+        """Exit status, or None while playing."""
+        return self._session.poll() if self._session is not None else None
+    
+    @property
+    def is_playing(self) -> bool:
+        return self._session is not None and not self._session.finished.is_set()
+    
+    @property
+    def startup_latency(self) -> Optional[float]:
+        """Seconds from start() until the player accepted its first audio."""
+        if self._session is None or self._session.started_at is None:
+            return None
+        return self._session.started_at - self._launched_at
+
+
+class PlaybackBackend(ABC):
+    """Base class: plays sources and keeps start-up latency statistics."""
+    
+    name = "base"
+    can_seek = True
+    requires_file = False
+    
+    def __init__(self):
+        self.startup_latencies: List[float] = []
+        self._stats_lock = threading.Lock()
+        self._warned_not_progressive = False
+    
+    def play(self, source: Source, offset: float = 0.0) -> Playback:
+        """
+        Play a file path or a StreamBuffer.
+        
+        Args:
+            source: Audio file path or StreamBuffer
+            offset: Position in seconds to start from
+        
+        Returns:
+            Playback handle
+        """
+        return Playback(self, source).start(offset)
+    
+    @abstractmethod
+    def _launch(self, source: Source, offset: float) -> _Session:
+        """Create the session that plays a source from an offset."""
+    
+    def _warn_not_progressive(self) -> None:
+        if not self._warned_not_progressive:
+            print(f"Playback backend {self.name} cannot play a stream while it downloads; "
+                  f"audio starts once the download completes (install ffplay or mpv for progressive playback)")
+            self._warned_not_progressive = True
+    
+    def _record_startup(self, latency: float) -> None:
+        with self._stats_lock:
+            self.startup_latencies.append(latency)
+    
+    def get_stats(self) -> Dict[str, float]:
+        """
+        Start-up latency summary.
+        
+        Returns:
+            Dictionary with count, mean, p50 and max (seconds)
+        """
+        with self._stats_lock:
+            values = sorted(self.startup_latencies)
+        if not values:
+            return {'count': 0}
+        return {
+            'count': len(values),
+            'mean': sum(values) / len(values),
+            'p50': values[len(values) // 2],
+            'max': values[-1],
+        }
+
+
+class PipeBackend(PlaybackBackend):
+    """
+    Player process reading audio from stdin or a file.
+    
+    The command may contain "{input}" (replaced with the file path, or "-"
+    for stdin) and "{offset}" (start position in seconds). Without
+    "{input}" audio is always piped to stdin; without "{offset}" the
+    backend cannot seek.
+    """
+    
+    def __init__(self, command: List[str], name: Optional[str] = None, requires_file: bool = False):
+        """
+        Args:
+            command: Player command line
+            name: Backend name for stats (defaults to the executable)
+            requires_file: Player cannot read stdin; streams are written to
+                a temporary file once complete, so progressive playback
+                falls back to playing after the download (with a warning)
+        """
+        super().__init__()
+        self.command = list(command)
+        self.name = name or os.path.basename(command[0])
+        self.requires_file = requires_file
+        self.can_seek = any("{offset}" in arg for arg in command)
+        self.reads_files = any("{input}" in arg for arg in command)
+    
+    def build_command(self, input_arg: str, offset: float) -> List[str]:
+        """Command line for an input ("-" for stdin) and start offset."""
+        return [arg.replace("{input}", input_arg).replace("{offset}", f"{offset:.3f}") for arg in self.command]
+    
+    def _launch(self, source: Source, offset: float) -> _Session:
+        return _ProcessSession(self, source, offset)
+
+
+class NullSink(PlaybackBackend):
+    """Discards audio in-process (no player process)."""
+    
+    name = "null"
+    
+    def _launch(self, source: Source, offset: float) -> _Session:
+        return _SinkSession(source)
+
+
+class RecordingSink(PlaybackBackend):
+    """Records every playback's audio and start offset in-process, for tests."""
+    
+    name = "recording"
+    
+    def __init__(self):
+        super().__init__()
+        self.recordings: List[Dict] = []
+    
+    def _launch(self, source: Source, offset: float) -> _Session:
+        record = {'offset': offset, 'audio': bytearray()}
+        self.recordings.append(record)
+        return _SinkSession(source, record)
+
+
+FFPLAY_COMMAND = ["ffplay", "-nodisp", "-autoexit", "-loglevel", "quiet", "-ss", "{offset}", "-i", "{input}"]
+MPV_COMMAND = ["mpv", "--no-video", "--really-quiet", "--start={offset}", "{input}"]
+# aplay only plays PCM, so ffmpeg decodes the MP3 from stdin
+APLAY_COMMAND = ["sh", "-c", "ffmpeg -loglevel quiet -ss {offset} -i - -f wav - | aplay -q"]
+AFPLAY_COMMAND = ["afplay", "{input}"]
+
+_warned_no_player = False
+
+
+def get_backend(name: str) -> PlaybackBackend:
+    """
+    Create a backend by name.
+    
+    Args:
+        name: "ffplay", "mpv", "aplay", "afplay", "null" or "recording";
+            anything else is run as a player command reading stdin
+    
+    Returns:
+        PlaybackBackend
+    """
+    if name == "ffplay":
+        return PipeBackend(FFPLAY_COMMAND, name="ffplay")
+    if name == "mpv":
+        return PipeBackend(MPV_COMMAND, name="mpv")
+    if name == "aplay":
+        return PipeBackend(APLAY_COMMAND, name="aplay")
+    if name == "afplay":
+        return PipeBackend(AFPLAY_COMMAND, name="afplay", requires_file=True)
+    if name == "null":
+        return NullSink()
+    if name == "recording":
+        return RecordingSink()
+    return PipeBackend(shlex.split(name))
+
+
+def default_backend() -> PlaybackBackend:
+    """
+    Backend from the SUNO_PLAYER environment variable, else the first
+    installed player (ffplay, mpv, afplay on macOS, aplay with ffmpeg).
+    """
+    if os.getenv("SUNO_PLAYER"):
+        return get_backend(os.getenv("SUNO_PLAYER"))
+    if shutil.which("ffplay"):
+        return get_backend("ffplay")
+    if shutil.which("mpv"):
+        return get_backend("mpv")
+    if sys.platform == "darwin" or shutil.which("afplay"):
+        return get_backend("afplay")
+    if shutil.which("aplay") and shutil.which("ffmpeg"):
+        return get_backend("aplay")
+    
+    global _warned_no_player
+    if not _warned_no_player:
+        print("No audio player found (install ffplay or mpv, or set SUNO_PLAYER); audio will not be heard")
+        _warned_no_player = True
+    return NullSink()
+
+
+if __name__ == "__main__":
+    # Start-up latency per backend, from an in-memory buffer and from a file
+    audio = os.urandom(1024 * 1024)
+    with tempfile.NamedTemporaryFile(suffix=".mp3", delete=False) as f:
+        f.write(audio)
+    
+    backends = [NullSink(), RecordingSink(), PipeBackend(["cat"], name="cat (pipe)")]
+    backends += [get_backend(name) for name in ("ffplay", "mpv", "aplay") if shutil.which(name)]
+    
+    print(f"{'backend':<12} {'source':<8} {'start-up p50':>14} {'max':>10}")
+    for backend in backends:
+        for label, make_source in (("memory", lambda: StreamBuffer.from_bytes(audio)), ("file", lambda: f.name)):
+            backend.startup_latencies.clear()
+            for _ in range(10):
+                playback = backend.play(make_source())
+                playback.wait_started(timeout=10)
+                playback.stop()
+                playback.wait(timeout=10)
+            stats = backend.get_stats()
+            print(f"{backend.name:<12} {label:<8} {stats['p50'] * 1000:>11.2f} ms {stats['max'] * 1000:>7.2f} ms")
+    
+    os.remove(f.name)
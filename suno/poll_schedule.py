@@ -0,0 +1,154 @@
+"""
+Polling schedules for waiting on Suno clips.
+
+AdaptivePollSchedule learns the distribution of time-to-streaming from past
+clips and polls sparsely before the expected ready time, densely inside the
+expected window, and backs off again after it, with jitter so many waiters
+do not poll in lockstep. FixedPollSchedule keeps the original fixed interval.
+"""
+
+import json
+import os
+import random
+import threading
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+
+class FixedPollSchedule:
+    """Poll at a fixed interval (the original wait_for_streaming behaviour)."""
+    
+    def __init__(self, interval: float = 5.0):
+        self.interval = interval
+    
+    def next_delay(self, elapsed: float) -> float:
+        return self.interval
+    
+    def record(self, time_to_ready: float) -> None:
+        pass
+
+
+class AdaptivePollSchedule:
+    """
+    Poll schedule shaped by observed time-to-streaming.
+    
+    Thread-safe; one schedule is meant to be shared by every wait on a client
+    so it keeps learning from each clip.
+    """
+    
+    def __init__(self,
+                 prior_ready: float = 12.0,
+                 min_interval: float = 0.5,
+                 max_interval: float = 5.0,
+                 jitter: float = 0.1,
+                 window_quantiles: Tuple[float, float] = (0.1, 0.9),
+                 history_size: int = 200,
+                 history_path: Optional[str] = None,
+                 seed: Optional[int] = None):
+        """
+        Initialize the schedule.
+        
+        Args:
+            prior_ready: Assumed seconds to streaming before any clip is observed
+            min_interval: Poll interval inside the expected ready window
+            max_interval: Longest gap between polls
+            jitter: Relative jitter applied to every delay (0.1 = ±10%)
+            window_quantiles: Quantiles of past time-to-streaming that bound
+                the dense polling window
+            history_size: Observations kept (oldest are forgotten first)
+            history_path: Optional JSON file to persist observations across runs
+            seed: Random seed for jitter
+        """
+        self.prior_ready = prior_ready
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.jitter = jitter
+        self.window_quantiles = window_quantiles
+        self.history_path = history_path
+        
+        self._history = deque(maxlen=history_size)
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        
+        if history_path and os.path.exists(history_path):
+            try:
+                with open(history_path, 'r') as f:
+                    self._history.extend(float(t) for t in json.load(f))
+            except (OSError, ValueError) as e:
+                print(f"Ignoring unreadable poll history {history_path}: {e}")
+    
+    def expected_window(self) -> Tuple[float, float]:
+        """
+        Expected time-to-streaming window in seconds since generation.
+        
+        Returns:
+            Tuple of (window start, window end)
+        """
+        with self._lock:
+            history = sorted(self._history)
+        
+        if len(history) < 3:
+            return self.prior_ready * 0.5, self.prior_ready * 1.5
+        
+        low_q, high_q = self.window_quantiles
+        low = history[int(low_q * (len(history) - 1))]
+        high = history[int(round(high_q * (len(history) - 1)))]
+        return low, high
+    
+    def next_delay(self, elapsed: float) -> float:
+        """
+        Seconds to wait before the next poll.
+        
+        Args:
+            elapsed: Seconds since the clip was generated
+        
+        Returns:
+            Delay in seconds
+        """
+        low, high = self.expected_window()
+        
+        if elapsed < low:
+            # Nothing can be ready yet: sleep towards the window start
+            delay = min(self.max_interval, max(self.min_interval, low - elapsed))
+        elif elapsed <= high:
+            delay = self.min_interval
+        else:
+            # Later than usual: back off gradually
+            overdue = (elapsed - high) / max(high - low, self.min_interval)
+            delay = min(self.max_interval, self.min_interval * (1 + overdue))
+        
+        with self._lock:
+            factor = self._rng.uniform(1 - self.jitter, 1 + self.jitter)
+        return max(0.0, delay * factor)
+    
+    def record(self, time_to_ready: float) -> None:
+        """
+        Record how long a clip took to become streamable.
+        
+        Args:
+            time_to_ready: Seconds from generation to streaming
+        """
+        with self._lock:
+            self._history.append(time_to_ready)
+            history = list(self._history)
+        
+        if self.history_path:
+            tmp_path = f"{self.history_path}.tmp"
+            try:
+                with open(tmp_path, 'w') as f:
+                    json.dump(history, f)
+                os.replace(tmp_path, self.history_path)
+            except OSError as e:
+                print(f"Could not save poll history: {e}")
+    
+    def get_stats(self) -> Dict[str, float]:
+        """Summary of the learned distribution."""
+        low, high = self.expected_window()
+        with self._lock:
+            history: List[float] = list(self._history)
+        return {
+            'observations': len(history),
+            'window_start': low,
+            'window_end': high,
+            'mean_time_to_ready': sum(history) / len(history) if history else self.prior_ready,
+        }
@@ -0,0 +1,382 @@
+"""
+Speculative pre-generation of likely next vibes.
+
+Generating a clip only after the vibe changes leaves a 30-60 s gap before
+the new music starts. Prefetcher ranks the vibes the user is likely to move
+to next (from TextPreprocessor.analyze_keywords topic scores and from the
+user's own vibe transitions) and starts generating the top-k ahead of time,
+so a switch can usually play a clip that is already streamable.
+
+Speculation is kept cheap: a cap on concurrent prefetches, a rolling
+generation budget, cancellation of prefetches that drop out of the top-k,
+and expiry of ready clips nobody switched to.
+"""
+
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Dict, List, Optional, Tuple
+
+from clip_poller import ClipPoller
+from suno import SunoAPI
+
+
+# Suno prompts per TextPreprocessor topic category
+DEFAULT_VIBES: Dict[str, Tuple[str, str]] = {
+    'science': ("Thoughtful background music for reading about science", "instrumental, ambient, contemplative"),
+    'technology': ("Modern background music for reading about technology", "instrumental, electronic, minimal"),
+    'business': ("Focused background music for reading business news", "instrumental, lo-fi, focus"),
+    'health': ("Calm reassuring background music", "instrumental, ambient, peaceful"),
+    'travel': ("Adventurous inspiring background music for travel stories", "instrumental, acoustic, cinematic"),
+    'food': ("Warm comforting background music for food content", "instrumental, jazz, warm"),
+    'romance': ("Tender intimate background music for a love story", "instrumental, piano, romantic"),
+    'entertainment': ("Light engaging background music", "instrumental, pop, upbeat"),
+    'sports': ("Energetic competitive background music", "instrumental, electronic, energetic"),
+    'news': ("Serious informative background music for the news", "instrumental, ambient, serious"),
+}
+
+
+@dataclass
+class Prefetch:
+    """A speculative generation for one vibe."""
+    vibe: str
+    topic: str
+    tags: str
+    started_at: float
+    clip_id: Optional[str] = None
+    future: Optional[Future] = None
+    clip: Optional[Dict] = None
+    ready_at: Optional[float] = None
+    cancelled: bool = False
+    failed: bool = False
+    done: threading.Event = field(default_factory=threading.Event)
+
+
+class Prefetcher:
+    """
+    Pre-generates clips for the top-k likely next vibes.
+    
+    Example:
+        >>> prefetcher = Prefetcher(suno)
+        >>> prefetcher.update(preprocessor.analyze_keywords(text))
+        >>> ...
+        >>> clip = prefetcher.switch("science")  # None on a miss
+        >>> clip = clip or suno.wait_for_streaming(suno.generate_song(...)["id"])
+    """
+    
+    def __init__(self,
+                 suno: SunoAPI,
+                 vibes: Optional[Dict[str, Tuple[str, str]]] = None,
+                 top_k: int = 2,
+                 max_in_flight: int = 3,
+                 max_generations: int = 20,
+                 budget_window: float = 3600,
+                 min_score: float = 0.0,
+                 history_weight: float = 0.5,
+                 ttl: float = 900,
+                 make_instrumental: bool = True,
+                 poll_interval: float = 2.0):
+        """
+        Initialize the prefetcher.
+        
+        Args:
+            suno: SunoAPI client used for generation and polling
+            vibes: Vibe name -> (topic, tags) prompts; DEFAULT_VIBES if None
+            top_k: Vibes prefetched at once
+            max_in_flight: Most speculative generations not yet streamable
+            max_generations: Most speculative generations per budget_window
+            budget_window: Rolling window for max_generations, in seconds
+            min_score: Topic scores at or below this are ignored
+            history_weight: Weight of observed vibe transitions relative to
+                the (normalized) topic scores
+            ttl: Seconds a ready prefetched clip is kept before it is dropped
+            make_instrumental: Generate prefetched clips without vocals
+            poll_interval: Seconds between batched status polls
+        """
+        self.suno = suno
+        self.vibes = vibes or DEFAULT_VIBES
+        self.top_k = top_k
+        self.max_in_flight = max_in_flight
+        self.max_generations = max_generations
+        self.budget_window = budget_window
+        self.min_score = min_score
+        self.history_weight = history_weight
+        self.ttl = ttl
+        self.make_instrumental = make_instrumental
+        
+        self.poller = ClipPoller(suno, interval=poll_interval).start()
+        
+        self._prefetches: Dict[str, Prefetch] = {}
+        self._generated = deque()
+        self._transitions: Dict[Optional[str], Counter] = defaultdict(Counter)
+        self._current: Optional[str] = None
+        self._lock = threading.Lock()
+        
+        self.stats = {
+            'started': 0,
+            'cancelled': 0,
+            'expired': 0,
+            'failed': 0,
+            'budget_skips': 0,
+            'hits': 0,
+            'misses': 0,
+            'latency_saved': 0.0,
+        }
+    
+    def rank(self, scores: Optional[Dict[str, float]] = None) -> List[str]:
+        """
+        Rank likely next vibes.
+        
+        Args:
+            scores: Topic scores from TextPreprocessor.analyze_keywords
+        
+        Returns:
+            Up to top_k vibe names, most likely first (the current vibe is excluded)
+        """
+        combined = Counter()
+        
+        if scores:
+            relevant = {v: s for v, s in scores.items() if v in self.vibes and s > self.min_score}
+            total = sum(relevant.values())
+            for vibe, score in relevant.items():
+                combined[vibe] += score / total
+        
+        with self._lock:
+            transitions = dict(self._transitions.get(self._current, {}))
+            current = self._current
+        total = sum(transitions.values())
+        for vibe, count in transitions.items():
+            combined[vibe] += self.history_weight * count / total
+        
+        combined.pop(current, None)
+        return [vibe for vibe, score in combined.most_common(self.top_k) if score > 0]
+    
+    def update(self, scores: Optional[Dict[str, float]] = None) -> List[str]:
+        """
+        Re-rank and adjust speculative generations.
+        
+        Prefetches that fell out of the top-k are cancelled if still
+        generating; new top-k vibes are started within the budget.
+        
+        Args:
+            scores: Topic scores from TextPreprocessor.analyze_keywords
+        
+        Returns:
+            The targeted vibe names
+        """
+        targets = self.rank(scores)
+        now = time.time()
+        to_start = []
+        
+        with self._lock:
+            self._expire(now)
+            for vibe, prefetch in list(self._prefetches.items()):
+                if vibe not in targets and prefetch.clip is None:
+                    self._cancel(prefetch)
+            
+            for vibe in targets:
+                if vibe in self._prefetches:
+                    continue
+                if not self._reserve(now):
+                    self.stats['budget_skips'] += 1
+                    break
+                topic, tags = self.vibes[vibe]
+                prefetch = Prefetch(vibe=vibe, topic=topic, tags=tags, started_at=now)
+                self._prefetches[vibe] = prefetch
+                to_start.append(prefetch)
+        
+        for prefetch in to_start:
+            self._start(prefetch)
+        return targets
+    
+    def _reserve(self, now: float) -> bool:
+        """Take one generation from the budget (lock held)."""
+        while self._generated and self._generated[0] <= now - self.budget_window:
+            self._generated.popleft()
+        in_flight = sum(1 for p in self._prefetches.values() if p.clip is None)
+        if in_flight >= self.max_in_flight or len(self._generated) >= self.max_generations:
+            return False
+        self._generated.append(now)
+        self.stats['started'] += 1
+        return True
+    
+    def _start(self, prefetch: Prefetch) -> None:
+        try:
+            clip_info = self.suno.generate_song(prefetch.topic, prefetch.tags, self.make_instrumental)
+        except Exception as e:
+            print(f"Prefetch for {prefetch.vibe} failed: {e}")
+            self._finish(prefetch, failed=True)
+            return
+        
+        with self._lock:
+            prefetch.clip_id = clip_info["id"]
+            if prefetch.cancelled:
+                # Cancelled while the generate request was in flight
+                return
+        # watch() may run the callback inline, which takes the lock, so it is
+        # registered outside it and a cancel that slipped in is undone after
+        future = self.poller.watch(clip_info["id"], callback=partial(self._on_ready, prefetch))
+        with self._lock:
+            prefetch.future = future
+            if prefetch.cancelled:
+                self.poller.unwatch(clip_info["id"])
+    
+    def _on_ready(self, prefetch: Prefetch, future: Future) -> None:
+        if future.cancelled():
+            return
+        if future.exception() is not None:
+            print(f"Prefetch for {prefetch.vibe} failed: {future.exception()}")
+            self._finish(prefetch, failed=True)
+            return
+        with self._lock:
+            prefetch.clip = future.result()
+            prefetch.ready_at = time.time()
+        prefetch.done.set()
+    
+    def _finish(self, prefetch: Prefetch, failed: bool = False) -> None:
+        with self._lock:
+            if self._prefetches.get(prefetch.vibe) is prefetch:
+                del self._prefetches[prefetch.vibe]
+            # A prefetch is counted once, as failed or as cancelled
+            if failed and not prefetch.cancelled:
+                prefetch.failed = True
+                self.stats['failed'] += 1
+        prefetch.done.set()
+    
+    def _cancel(self, prefetch: Prefetch) -> None:
+        """Drop a prefetch that is still generating (lock held)."""
+        del self._prefetches[prefetch.vibe]
+        prefetch.cancelled = True
+        self.stats['cancelled'] += 1
+        if prefetch.clip_id:
+            self.poller.unwatch(prefetch.clip_id)
+        prefetch.done.set()
+    
+    def _expire(self, now: float) -> None:
+        """Drop ready clips older than ttl (lock held)."""
+        for vibe, prefetch in list(self._prefetches.items()):
+            if prefetch.ready_at is not None and now - prefetch.ready_at > self.ttl:
+                del self._prefetches[vibe]
+                self.stats['expired'] += 1
+    
+    def switch(self, vibe: str, wait: bool = True, timeout: Optional[float] = None) -> Optional[Dict]:
+        """
+        Switch to a vibe, using its prefetched clip if there is one.
+        
+        Args:
+            vibe: Vibe name being switched to
+            wait: If the prefetch is still generating, wait for it (still
+                sooner than starting a new generation)
+            timeout: Seconds to wait for an in-flight prefetch
+        
+        Returns:
+            Streamable clip object, or None on a miss
+        """
+        now = time.time()
+        with self._lock:
+            self._transitions[self._current][vibe] += 1
+            self._current = vibe
+            self._expire(now)
+            prefetch = self._prefetches.pop(vibe, None)
+            if prefetch is None or (prefetch.clip is None and not wait):
+                if prefetch is not None:
+                    self._cancel_popped(prefetch)
+                self.stats['misses'] += 1
+                return None
+        
+        if prefetch.clip is None:
+            prefetch.done.wait(timeout)
+        
+        with self._lock:
+            if prefetch.clip is None:
+                self._cancel_popped(prefetch)
+                self.stats['misses'] += 1
+                return None
+            # On-demand generation would have taken the clip's full
+            # time-to-ready; the switch only waited for what was left of it
+            on_demand = prefetch.ready_at - prefetch.started_at
+            waited = max(0.0, prefetch.ready_at - now)
+            self.stats['hits'] += 1
+            self.stats['latency_saved'] += on_demand - waited
+        return prefetch.clip
+    
+    def _cancel_popped(self, prefetch: Prefetch) -> None:
+        """Cancel a prefetch already removed from the table (lock held)."""
+        if prefetch.failed:
+            return
+        prefetch.cancelled = True
+        self.stats['cancelled'] += 1
+        if prefetch.clip_id:
+            self.poller.unwatch(prefetch.clip_id)
+    
+    def stop(self) -> None:
+        """Cancel every in-flight prefetch and stop polling."""
+        with self._lock:
+            for prefetch in list(self._prefetches.values()):
+                if prefetch.clip is None:
+                    self._cancel(prefetch)
+        self.poller.stop()
+    
+    def get_stats(self) -> Dict[str, float]:
+        """
+        Prefetch statistics.
+        
+        Returns:
+            Dictionary with counters, hit_rate, total and mean latency saved
+            per switch (seconds), and prefetches in flight / ready
+        """
+        with self._lock:
+            stats = dict(self.stats)
+            stats['in_flight'] = sum(1 for p in self._prefetches.values() if p.clip is None)
+            stats['ready'] = len(self._prefetches) - stats['in_flight']
+        
+        switches = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / switches if switches else 0.0
+        stats['mean_latency_saved'] = stats['latency_saved'] / switches if switches else 0.0
+        return stats
+
+
+if __name__ == "__main__":
+    import contextlib
+    import io
+    import random
+    
+    from fake_suno_server import FakeSunoServer
+    
+    # A reader drifting between a few topics, with page topic scores that
+    # hint at the next vibe most of the time
+    rng = random.Random(1)
+    pattern = {'science': 'technology', 'technology': 'business', 'business': 'science'}
+    
+    with FakeSunoServer(ready_after=3.0, ready_jitter=1.0) as server:
+        suno = SunoAPI("fake-token", base_url=server.base_url)
+        prefetcher = Prefetcher(suno, poll_interval=0.25)
+        current = 'science'
+        on_demand_waits = []
+        
+        with contextlib.redirect_stdout(io.StringIO()):
+            for step in range(12):
+                upcoming = pattern[current] if rng.random() < 0.75 else rng.choice(list(DEFAULT_VIBES))
+                scores = {upcoming: 0.02, rng.choice(list(DEFAULT_VIBES)): 0.01}
+                prefetcher.update(scores)
+                time.sleep(5.0)  # reading time on the current page
+                
+                start = time.time()
+                clip = prefetcher.switch(upcoming)
+                if clip is None:
+                    topic, tags = DEFAULT_VIBES[upcoming]
+                    suno.wait_for_streaming(suno.generate_song(topic, tags, True)["id"])
+                    on_demand_waits.append(time.time() - start)
+                current = upcoming
+        
+        prefetcher.stop()
+        stats = prefetcher.get_stats()
+    
+    print(f"Switches: {stats['hits'] + stats['misses']}, hit rate: {stats['hit_rate']:.0%}")
+    print(f"Mean switch latency saved: {stats['mean_latency_saved']:.1f}s "
+          f"(on-demand misses waited {sum(on_demand_waits) / max(len(on_demand_waits), 1):.1f}s)")
+    print(f"Speculative generations: {stats['started']} started, {stats['cancelled']} cancelled, "
+          f"{stats['expired']} expired, {stats['budget_skips']} budget skips")
@@ -1,33 +1,209 @@
 import requests
 import time
 import os
-import tempfile
-import subprocess
 import json
-from typing import Dict
+import tempfile
+import threading
+from collections import deque
+from typing import Dict, List, Optional
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from dotenv import load_dotenv
+from poll_schedule import AdaptivePollSchedule
+from audio_cache import AudioCache, StalePartError
+from clip_library import ClipLibrary
+from playback import PipeBackend, Playback, PlaybackBackend, StreamBuffer, default_backend
 
 # Load environment variables from .env file
 load_dotenv()
 
+class SunoRetry(Retry):
+    """
+    Retry policy safe for non-idempotent requests.
+    
+    Idempotent methods (GET, ...) are retried on connection and read errors
+    and on every status in status_forcelist. POST /generate may have
+    started a paid generation once the server read it, so other methods are
+    only retried when the request was not accepted: connection errors
+    (urllib3 retries those for any method) and 429.
+    """
+    
+    def is_retry(self, method: str, status_code: int, has_retry_after: bool = False) -> bool:
+        if status_code == 429 and not self._is_method_retryable(method):
+            return bool(self.status_forcelist and 429 in self.status_forcelist)
+        return super().is_retry(method, status_code, has_retry_after)
+
 class SunoAPI:
     """
     Suno API client for HackMIT 2025 that generates and plays AI music.
     Supports prompt-based generation for adaptive sound based on user context.
     """
-
+    
     BASE_URL = "https://studio-api.prod.suno.com/api/v2/external/hackmit"
     
-    def __init__(self, api_token: str):
-        """Initialize the Suno API client with authentication token."""
+    # Transient statuses worth retrying with backoff
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+    
+    def __init__(self,
+                 api_token: str,
+                 session: Optional[requests.Session] = None,
+                 base_url: Optional[str] = None,
+                 connect_timeout: float = 3.05,
+                 read_timeout: float = 30.0,
+                 pool_size: int = 10,
+                 max_retries: int = 3,
+                 backoff_factor: float = 0.5,
+                 poll_schedule: Optional[AdaptivePollSchedule] = None,
+                 library: Optional[ClipLibrary] = None,
+                 progressive: bool = False,
+                 prefix_bytes: int = 64 * 1024,
+                 player_command: Optional[List[str]] = None,
+                 audio_cache: Optional[AudioCache] = None,
+                 playback: Optional[PlaybackBackend] = None):
+        """
+        Initialize the Suno API client with authentication token.
+        
+        Args:
+            api_token: Suno API token
+            session: Shared session (see create_session); one is created if None
+            base_url: API base URL override (e.g. a local fake server)
+            connect_timeout: Seconds to wait for a connection
+            read_timeout: Seconds to wait between bytes of a response
+            pool_size: Keep-alive connections kept per host
+            max_retries: Retries for connection errors and 429/5xx responses
+                (POSTs only on connection errors and 429, see SunoRetry)
+            backoff_factor: Exponential backoff factor between retries
+            poll_schedule: Schedule for wait_for_streaming (shared schedules
+                learn from every client's clips); adaptive if None
+            library: Clip library consulted by generate_and_play before
+                generating (None disables reuse)
+            progressive: Start playback while downloading (see
+                download_and_play_audio)
+            prefix_bytes: Bytes buffered before progressive playback starts
+            player_command: Player command reading audio from stdin (shortcut
+                for playback=PipeBackend(player_command), e.g. ["cat"])
+            audio_cache: Cache for downloaded audio (e.g. AudioCache() for
+                the persistent ~/.cache/adaptive_sound/audio); if None, a
+                cache in a new temporary directory, so nothing is kept
+                between runs
+            playback: Playback backend; if None, SUNO_PLAYER or the first
+                installed player (see playback.default_backend)
+        """
         self.api_token = api_token
+        self.base_url = (base_url or self.BASE_URL).rstrip("/")
         self.headers = {
             "Authorization": f"Bearer {api_token}",
             "Content-Type": "application/json"
         }
+        self.timeout = (connect_timeout, read_timeout)
+        self.session = session or self.create_session(pool_size, max_retries, backoff_factor)
+        
+        # Per-operation call latencies in seconds
+        self.latencies: Dict[str, list] = {}
+        self._latency_lock = threading.Lock()
+        
+        # Adaptive status polling and per-clip detection reports
+        self.poll_schedule = poll_schedule or AdaptivePollSchedule()
+        self.poll_reports = deque(maxlen=100)
+        
+        self.library = library
+        
+        # Progressive playback
+        self.progressive = progressive
+        self.prefix_bytes = prefix_bytes
+        if playback is None and player_command:
+            playback = PipeBackend(player_command)
+        self._playback = playback
+        self.stream_reports = deque(maxlen=100)
+        self._reports_lock = threading.Lock()
+        self.audio_cache = audio_cache or AudioCache(tempfile.mkdtemp(prefix="suno-audio-"))
+    
+    @property
+    def playback(self) -> PlaybackBackend:
+        """Playback backend (the default one is only resolved when first used)."""
+        if self._playback is None:
+            self._playback = default_backend()
+        return self._playback
+    
+    @classmethod
+    def create_session(cls,
+                       pool_size: int = 10,
+                       max_retries: int = 3,
+                       backoff_factor: float = 0.5) -> requests.Session:
+        """
+        Create a keep-alive session with a sized connection pool and retries.
+        
+        The session can be shared by several SunoAPI instances and threads;
+        auth headers are sent per request, not stored on the session.
+        
+        Args:
+            pool_size: Keep-alive connections kept per host
+            max_retries: Retries for connection errors and 429/5xx responses
+                (POSTs only on connection errors and 429, see SunoRetry)
+            backoff_factor: Exponential backoff factor between retries
+        
+        Returns:
+            Configured requests.Session
+        """
+        retry = SunoRetry(
+            total=max_retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=cls.RETRY_STATUSES,
+            allowed_methods=Retry.DEFAULT_ALLOWED_METHODS,
+            respect_retry_after_header=True,
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        
+        session = requests.Session()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+    
+    def _request(self, operation: str, method: str, url: str, **kwargs) -> requests.Response:
+        """
+        Send a request on the pooled session and record its latency.
+        
+        Args:
+            operation: Name used for latency stats (e.g. "generate")
+            method: HTTP method
+            url: Request URL
+            **kwargs: Passed to requests.Session.request
         
-        # Audio system ready (using afplay)
-        pass
+        Returns:
+            requests.Response
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        start = time.perf_counter()
+        try:
+            return self.session.request(method, url, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._latency_lock:
+                self.latencies.setdefault(operation, []).append(elapsed)
+    
+    def get_latency_stats(self) -> Dict[str, Dict[str, float]]:
+        """
+        Summarize per-call latency by operation.
+        
+        Returns:
+            Dictionary mapping operation to count, mean, p50, p95 and max (seconds)
+        """
+        stats = {}
+        with self._latency_lock:
+            snapshot = {op: sorted(values) for op, values in self.latencies.items()}
+        
+        for operation, values in snapshot.items():
+            if not values:
+                continue
+            stats[operation] = {
+                'count': len(values),
+                'mean': sum(values) / len(values),
+                'p50': values[len(values) // 2],
+                'p95': values[min(len(values) - 1, int(len(values) * 0.95))],
+                'max': values[-1],
+            }
+        return stats
     
     def generate_song(self, 
                      topic: str,
@@ -40,11 +216,11 @@ class SunoAPI:
             topic: Description for the song (max 2500 chars)
             tags: Musical style/genres (max 100 chars)
             make_instrumental: Generate without vocals
-            
+        
         Returns:
             Dict containing clip information with ID for polling
         """
-        url = f"{self.BASE_URL}/generate"
+        url = f"{self.base_url}/generate"
         
         data = {
             "topic": topic[:2500],  # Ensure max length
@@ -52,9 +228,9 @@ class SunoAPI:
         }
         if make_instrumental:
             data["make_instrumental"] = make_instrumental
-            
+        
         try:
-            response = requests.post(url, headers=self.headers, json=data)
+            response = self._request("generate", "POST", url, headers=self.headers, json=data)
             response.raise_for_status()
             return response.json()
         except requests.exceptions.RequestException as e:
@@ -63,115 +239,327 @@ class SunoAPI:
                 print(f"Response: {e.response.text}")
             raise
     
-    def _get_clip_status(self, clip_id: str) -> Dict:
+    def get_clips(self, clip_ids: List[str]) -> List[Dict]:
         """
-        Get status and audio URL for a single clip.
+        Get status and audio URLs for several clips in one request.
         
         Args:
-            clip_id: Clip UUID
-            
+            clip_ids: Clip UUIDs
+        
         Returns:
-            Clip object with status and audio_url when ready
+            List of clip objects (clips the API does not know are omitted)
         """
-        url = f"{self.BASE_URL}/clips"
-        params = {"ids": clip_id}
+        if not clip_ids:
+            return []
+        
+        url = f"{self.base_url}/clips"
+        params = {"ids": ",".join(clip_ids)}
         
         try:
-            response = requests.get(url, headers=self.headers, params=params)
+            response = self._request("clips", "GET", url, headers=self.headers, params=params)
             response.raise_for_status()
-            clips = response.json()
-            return clips[0] if clips else None
+            return response.json() or []
         except requests.exceptions.RequestException as e:
-            print(f"Error fetching clip: {e}")
+            print(f"Error fetching clips: {e}")
             if hasattr(e, 'response') and e.response is not None:
                 print(f"Response: {e.response.text}")
             raise
     
-    def wait_for_streaming(self, clip_id: str, max_wait: int = 300) -> Dict:
+    def _get_clip_status(self, clip_id: str) -> Dict:
+        """
+        Get status and audio URL for a single clip.
+        
+        Args:
+            clip_id: Clip UUID
+        
+        Returns:
+            Clip object with status and audio_url when ready
+        """
+        clips = self.get_clips([clip_id])
+        return clips[0] if clips else None
+    
+    def wait_for_streaming(self, clip_id: str, max_wait: int = 300,
+                           started_at: Optional[float] = None) -> Dict:
         """
         Poll clip status until it's ready for streaming or complete.
         
+        Polls follow self.poll_schedule (sparse before the expected ready
+        time, dense around it), and each detection is recorded so the
+        schedule keeps learning. A report per clip is appended to
+        self.poll_reports.
+        
         Args:
             clip_id: UUID of the clip to monitor
             max_wait: Maximum seconds to wait
-            
+            started_at: Wall time the clip was generated (defaults to now)
+        
         Returns:
             Clip object when streaming or complete
         """
-        start_time = time.time()
+        start_time = started_at or time.time()
+        last_miss = 0.0  # Seconds since generation of the last not-ready poll
+        polls = 0
         
         while time.time() - start_time < max_wait:
             clip = self._get_clip_status(clip_id)
+            polls += 1
+            detected = time.time() - start_time
             if not clip:
                 raise Exception(f"Clip {clip_id} not found")
-                
+            
             status = clip.get("status")
             
             print(f"Status: {status}")
             
             if status in ["streaming", "complete"]:
+                # The clip became ready somewhere between the last two polls
+                self.poll_schedule.record((last_miss + detected) / 2)
+                report = {
+                    'clip_id': clip_id,
+                    'polls': polls,
+                    'time_to_detect': detected,
+                    'ready_to_detected_max': detected - last_miss,
+                    'detected_at': start_time + detected,
+                }
+                self.poll_reports.append(report)
+                print(f"Ready after {detected:.1f}s ({polls} polls, "
+                      f"detected within {report['ready_to_detected_max']:.1f}s of ready)")
                 return clip
             elif status == "error":
                 error_msg = clip.get("metadata", {}).get("error_message", "Unknown error")
                 raise Exception(f"Generation failed: {error_msg}")
             
-            # Wait before next poll
-            time.sleep(5)
+            last_miss = detected
+            
+            # Wait before next poll, never past max_wait
+            remaining = max_wait - (time.time() - start_time)
+            if remaining <= 0:
+                break
+            time.sleep(min(self.poll_schedule.next_delay(detected), remaining))
         
         raise TimeoutError(f"Clip {clip_id} did not become ready within {max_wait} seconds")
     
-    def download_and_play_audio(self, audio_url: str) -> tuple:
+    def download_and_play_audio(self, audio_url: str, progressive: Optional[bool] = None,
+                                clip_id: Optional[str] = None) -> tuple:
         """
-        Download audio from URL and play it using afplay.
+        Download audio from URL and play it with the playback backend.
+        
+        Audio goes through the client's AudioCache, so replaying a clip is
+        served from disk. In progressive mode playback starts as soon as
+        prefix_bytes are buffered, fed from memory while the rest downloads
+        (see stream_and_play_audio).
         
         Args:
             audio_url: URL to the audio file
-            
+            progressive: Override the client's progressive setting
+            clip_id: Clip UUID, used as the cache key (the URL if None)
+        
         Returns:
-            Tuple of (audio_file_path, process)
+            Tuple of (audio_file_path, playback); the Playback handle has
+            stop()/terminate(), seek() and wait()
         """
+        progressive = self.progressive if progressive is None else progressive
+        key = clip_id or audio_url
+        
+        cached_path = self.audio_cache.get(key)
+        if cached_path:
+            print(f"Playing cached audio: {cached_path}")
+            return cached_path, self._play(cached_path)
+        
+        if progressive:
+            return self.stream_and_play_audio(audio_url, key=key)
+        
         try:
             print(f"Downloading audio from: {audio_url}")
             
-            # Download audio to temporary file
-            response = requests.get(audio_url, stream=True)
-            response.raise_for_status()
-            
-            # Get file size if available
-            total_size = int(response.headers.get('content-length', 0))
-            if total_size > 0:
-                print(f"File size: {total_size / (1024*1024):.1f} MB")
-            
-            # Create temporary file
-            with tempfile.NamedTemporaryFile(suffix=".mp3", delete=False) as temp_file:
-                downloaded = 0
-                print("⬇️ Downloading... ", end="", flush=True)
-                
-                for chunk in response.iter_content(chunk_size=8192):
-                    temp_file.write(chunk)
-                    downloaded += len(chunk)
+            part_path, offset = self.audio_cache.begin(key, source=audio_url)
+            if self.audio_cache.contains(key):
+                # Another thread finished downloading it while we waited
+                self.audio_cache.abort(key)
+                return self.download_and_play_audio(audio_url, progressive, clip_id)
+            report = {'key': key, 'etag': self.audio_cache.part_etag(key), 'bytes': offset, 'resumes': 0}
+            try:
+                if offset:
+                    print(f"Resuming download at {offset / (1024*1024):.1f} MB")
+                with open(part_path, "ab") as part_file:
+                    print("⬇️ Downloading... ", end="", flush=True)
                     
-                    # Show progress for larger files
-                    if total_size > 0 and downloaded % (1024*1024) == 0:  # Every MB
-                        progress = (downloaded / total_size) * 100
-                        print(f"{progress:.0f}% ", end="", flush=True)
-                
-                temp_path = temp_file.name
-                print("Complete!")
-            
-            print(f"Audio saved to: {temp_path}")
-            print("Starting playback with afplay...")
-            
-            # Play audio using afplay and keep reference to process
-            process = subprocess.Popen(["afplay", temp_path])
-            print("Audio is now playing!")
-            
-            return temp_path, process
+                    for chunk in self._iter_audio(audio_url, report, max_resumes=3):
+                        part_file.write(chunk)
+                    
+                    print(f"Complete! ({report['bytes'] / (1024*1024):.1f} MB)")
+                audio_path = self.audio_cache.commit(key)
+            except StalePartError:
+                self.audio_cache.abort(key, discard=True)
+                if not offset:
+                    raise
+                print("Audio changed since the partial download, starting over")
+                return self.download_and_play_audio(audio_url, progressive, clip_id)
+            except BaseException:
+                # Keep the partial file so the next attempt resumes it
+                self.audio_cache.abort(key)
+                raise
             
+            print(f"Audio saved to: {audio_path}")
+            return audio_path, self._play(audio_path)
+        
         except Exception as e:
             print(f"Error with audio: {e}")
             raise
     
+    def _play(self, source) -> Playback:
+        """Start playing a file path or StreamBuffer on the playback backend."""
+        print(f"Starting playback with {self.playback.name}...")
+        playback = self.playback.play(source)
+        print("Audio is now playing!")
+        return playback
+    
+    def stream_and_play_audio(self, audio_url: str, key: Optional[str] = None,
+                              max_resumes: int = 3) -> tuple:
+        """
+        Play audio while it downloads.
+        
+        Buffers prefix_bytes, then starts the playback backend on an
+        in-memory StreamBuffer that a background thread keeps filling (and
+        writing to the audio cache). A dropped connection is resumed with a
+        Range request from the last byte received, and a partial file left in
+        the cache by an earlier attempt from the same URL (and ETag) is played
+        and resumed too.
+        
+        Args:
+            audio_url: URL to the audio file
+            key: Audio cache key (defaults to the URL)
+            max_resumes: Reconnects allowed after dropped connections
+        
+        Returns:
+            Tuple of (audio_file_path, playback); the file is complete once
+            the matching stream_reports entry's "done" Event is set (it also
+            has time_to_first_audio, bytes and resumes)
+        """
+        print(f"Streaming audio from: {audio_url}")
+        start = time.perf_counter()
+        key = key or audio_url
+        
+        part_path, offset = self.audio_cache.begin(key, source=audio_url)
+        if self.audio_cache.contains(key):
+            self.audio_cache.abort(key)
+            return self.download_and_play_audio(audio_url, progressive=True, clip_id=key)
+        report = {
+            'key': key,
+            'etag': self.audio_cache.part_etag(key),
+            'url': audio_url,
+            'path': self.audio_cache.path_for(key),
+            'time_to_first_audio': None,
+            'download_time': None,
+            'bytes': offset,
+            'resumes': 0,
+            'error': None,
+            'done': threading.Event(),
+        }
+        with self._reports_lock:
+            self.stream_reports.append(report)
+        chunks = self._iter_audio(audio_url, report, max_resumes)
+        
+        buffer = StreamBuffer()
+        part_file = open(part_path, "ab")
+        try:
+            if offset:
+                with open(part_path, "rb") as existing:
+                    buffer.write(existing.read())
+            while buffer.size < self.prefix_bytes:
+                chunk = next(chunks, None)
+                if chunk is None:
+                    break
+                part_file.write(chunk)
+                buffer.write(chunk)
+        except BaseException as e:
+            part_file.close()
+            stale = isinstance(e, StalePartError)
+            self.audio_cache.abort(key, discard=stale)
+            report['error'] = e
+            report['done'].set()
+            if stale and offset:
+                print("Audio changed since the partial download, starting over")
+                return self.stream_and_play_audio(audio_url, key=key, max_resumes=max_resumes)
+            print(f"Error with audio: {e}")
+            raise
+        
+        def feed():
+            try:
+                for chunk in chunks:
+                    part_file.write(chunk)
+                    buffer.write(chunk)
+            except Exception as e:
+                report['error'] = e
+                print(f"Error streaming audio: {e}")
+            finally:
+                part_file.close()
+                buffer.close(report['error'])
+                if report['error'] is None:
+                    self.audio_cache.commit(key)
+                else:
+                    self.audio_cache.abort(key, discard=isinstance(report['error'], StalePartError))
+                report['download_time'] = time.perf_counter() - start
+                report['done'].set()
+        
+        threading.Thread(target=feed, name="suno-audio-feed", daemon=True).start()
+        playback = self.playback.play(buffer)
+        
+        if playback.wait_started(timeout=self.timeout[1]):
+            report['time_to_first_audio'] = time.perf_counter() - start
+            print(f"Audio is now playing! (first audio after {report['time_to_first_audio'] * 1000:.0f} ms)")
+        return report['path'], playback
+    
+    def _iter_audio(self, audio_url: str, report: Dict, max_resumes: int):
+        """Yield audio chunks, resuming with Range requests after drops."""
+        while True:
+            offset = report['bytes']
+            headers = {"Range": f"bytes={offset}-"} if offset else {}
+            response = self._request("download", "GET", audio_url, stream=True, headers=headers)
+            try:
+                response.raise_for_status()
+                etag = response.headers.get("ETag")
+                if offset and etag and report.get('etag') and etag != report['etag']:
+                    raise StalePartError(f"{audio_url} changed after {offset} bytes were downloaded")
+                if etag and etag != report.get('etag'):
+                    report['etag'] = etag
+                    if 'key' in report:
+                        self.audio_cache.set_part_etag(report['key'], etag)
+                # A server ignoring Range resends from the start
+                skip = offset if offset and response.status_code != 206 else 0
+                for chunk in response.iter_content(chunk_size=16 * 1024):
+                    if skip:
+                        dropped = min(skip, len(chunk))
+                        chunk, skip = chunk[dropped:], skip - dropped
+                        if not chunk:
+                            continue
+                    report['bytes'] += len(chunk)
+                    yield chunk
+                return
+            except (requests.exceptions.ChunkedEncodingError, requests.exceptions.ConnectionError) as e:
+                if report['resumes'] >= max_resumes:
+                    raise
+                report['resumes'] += 1
+                print(f"Audio connection dropped after {report['bytes']} bytes, resuming: {e}")
+            finally:
+                response.close()
+    
+    def _when_downloaded(self, audio_path: str, callback) -> None:
+        """Run callback once audio_path is fully downloaded (now if it already is)."""
+        # Downloads started on other threads append reports concurrently
+        with self._reports_lock:
+            pending = [r for r in self.stream_reports if r.get('path') == audio_path and not r['done'].is_set()]
+        if not pending:
+            callback()
+            return
+        
+        def wait():
+            pending[-1]['done'].wait()
+            if pending[-1]['error'] is None:
+                callback()
+        
+        threading.Thread(target=wait, daemon=True).start()
+    
     def generate_and_play(self, topic: str, tags: str, make_instrumental: bool = False) -> Dict:
         """
         Generate music and play it immediately.
@@ -180,7 +568,7 @@ class SunoAPI:
             topic: Description for the song
             tags: Musical style/genres
             make_instrumental: Generate without vocals
-            
+        
         Returns:
             Clip info with metadata
         """
@@ -188,6 +576,33 @@ class SunoAPI:
         print(f"Tags: {tags}")
         print(f"Instrumental: {make_instrumental}")
         
+        # Reuse a clip from the library when the vibe was generated before
+        if self.library:
+            match = self.library.lookup(topic, tags, make_instrumental)
+            if match:
+                kind = "exact" if match.exact else f"similar ({match.similarity:.0%})"
+                print(f"📚 Library hit, {kind}: {match.clip_id}")
+                if match.audio_path:
+                    process = self._play(match.audio_path)
+                else:
+                    try:
+                        audio_file, process = self.download_and_play_audio(match.audio_url, clip_id=match.clip_id)
+                    except requests.exceptions.RequestException as e:
+                        # The stored audio URL expired: forget the clip and generate instead
+                        print(f"Library clip {match.clip_id} is no longer available ({e}), generating")
+                        self.library.discard(match.clip_id)
+                        match = None
+                    else:
+                        self._when_downloaded(audio_file, lambda: self.library.store_audio(match.clip_id, audio_file))
+            if match:
+                return {
+                    'id': match.clip_id,
+                    'status': 'complete',
+                    'audio_url': match.audio_url,
+                    'title': f"Library: {match.topic[:40]}",
+                    'metadata': {'tags': match.tags, 'prompt': match.topic},
+                }, process
+        
         # Generate the song
         clip_info = self.generate_song(topic, tags, make_instrumental)
         
@@ -197,10 +612,14 @@ class SunoAPI:
         ready_clip = self.wait_for_streaming(clip_info["id"])
         
         # Download and play
-        audio_file, process = self.download_and_play_audio(ready_clip["audio_url"])
+        audio_file, process = self.download_and_play_audio(ready_clip["audio_url"], clip_id=ready_clip["id"])
+        
+        if self.library:
+            self.library.add(topic, tags, ready_clip, make_instrumental)
+            self._when_downloaded(audio_file, lambda: self.library.store_audio(ready_clip["id"], audio_file))
         
         return ready_clip, process
-    
+
 
 
 def load_json_config(file_path: str) -> Dict:
@@ -241,6 +660,10 @@ def main():
         print("  python suno.py <topic> [tags] [--instrumental]")
         print("  python suno.py --json <json_file> [--instrumental]")
         print()
+        print("Add --library to reuse previously generated clips for the same vibe")
+        print("Add --progressive to start playback while downloading")
+        print("Set SUNO_PLAYER to ffplay, mpv, aplay, afplay or a player command to choose the player")
+        print()
         print("Examples:")
         print("  python suno.py 'Relaxing ambient music'")
         print("  python suno.py 'Relaxing ambient music' 'ambient, lo-fi, peaceful'")
@@ -292,7 +715,8 @@ def main():
         return
     
     # Initialize API client
-    suno = SunoAPI(api_token)
+    library = ClipLibrary() if "--library" in sys.argv else None
+    suno = SunoAPI(api_token, library=library, progressive="--progressive" in sys.argv)
     
     # Generate and play music
     print("🎵 Generating music...")
@@ -306,7 +730,7 @@ def main():
         # Stop the audio playback
         process.terminate()
         print("Playback stopped.")
-        
+    
     except Exception as e:
         print(f"Error: {e}")
 